@@ -1,18 +1,38 @@
+import codecs
 import csv
+import functools
+import gzip
 import io
 import re
+import shutil
 try:
     import fitz  # PyMuPDF
 except Exception:
     fitz = None
+import hashlib
+import html
 import json
+import mmap
+import multiprocessing
+import os
+import random
 import sqlite3
+import tempfile
 import textwrap
+import threading
+import time
+import unicodedata
 import base64
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Tuple, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Tuple, Optional
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 import streamlit.components.v1 as components
 
@@ -25,6 +45,12 @@ DB_PATH = "charlot.sqlite3"
 DICTAPI_BASE = "https://api.dictionaryapi.dev/api/v2/entries"
 WIKTIONARY_BASE = {"fr": "https://fr.wiktionary.org", "en": "https://en.wiktionary.org"}
 
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_STATIC_DIR = os.path.join(APP_DIR, "static")      # served at /app/static/ (see .streamlit/config.toml)
+PDF_VIEWER_DIR = os.path.join(APP_DIR, "pdf_viewer")  # PDF.js custom component
+PDFJS_DIR = os.path.join(PDF_VIEWER_DIR, "pdfjs")      # vendored PDF.js build (pdf_viewer/vendor_pdfjs.py)
+STATIC_MAX_BYTES = 200 * 1024 * 1024                  # Streamlit's static file size limit
+
 HTTP_HEADERS = {
     "User-Agent": "Charlot/9.0 (Streamlit; educational app)",
     "Accept": "application/json,text/plain;q=0.9,*/*;q=0.8",
@@ -108,6 +134,8 @@ def init_session_state() -> None:
     ss.setdefault("streak", 1)
     ss.setdefault("last_xp_date", iso_date(today_utc_date()))
     ss.setdefault("review_idx", 0)
+    ss.setdefault("review_queue", None)
+    ss.setdefault("review_cards", {})
     ss.setdefault("edit_card_id", None)
     ss.setdefault("selected_card_id", None)
     ss.setdefault("scroll_to_selected_card", False)
@@ -115,6 +143,7 @@ def init_session_state() -> None:
     ss.setdefault("delete_confirm_id", None)
     ss.setdefault("cards_page", 1)
     ss.setdefault("cards_page_size", 18)
+    ss.setdefault("cards_page_cursors", [None])
     ss.setdefault("global_query", "")
     ss.setdefault("nb_pdf_book_id", None)
     ss.setdefault("nb_pdf_page", 1)
@@ -474,6 +503,17 @@ def norm_text(s: str) -> str:
 def norm_word(s: str) -> str:
     return (s or "").strip().lower()
 
+def split_tags(s: str) -> List[str]:
+    """Split a comma-separated tag string; strips parts and drops empties / case-insensitive repeats."""
+    out: List[str] = []
+    seen = set()
+    for part in (s or "").split(","):
+        part = part.strip()
+        if part and part.lower() not in seen:
+            seen.add(part.lower())
+            out.append(part)
+    return out
+
 def safe_json(obj: Any) -> str:
     return json.dumps(obj, ensure_ascii=False, indent=2)
 
@@ -588,117 +628,535 @@ def cigarettes_from_xp(xp: int):
 # =========================
 # DB Layer
 # =========================
-def db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=10)
+DB_POOL_MAX_IDLE = 8
+
+def db_connect(path: str) -> sqlite3.Connection:
+    """Open a new connection and apply the per-connection PRAGMAs (once)."""
+    # isolation_level=None: autocommit by default, transactions are explicit (see db_tx).
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA foreign_keys=ON;")
     return conn
 
+class DBPool:
+    """Process-wide pool of SQLite connections shared by every Streamlit session.
+
+    A connection is borrowed by one thread at a time (via db_conn / db_tx) and
+    returned to the pool afterwards, so reruns no longer pay for connect + PRAGMAs.
+    """
+
+    def __init__(self, path: str, max_idle: int = DB_POOL_MAX_IDLE) -> None:
+        self.path = path
+        self.max_idle = max(1, int(max_idle))
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                self.hits += 1
+                return self._idle.pop()
+            self.misses += 1
+        return db_connect(self.path)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "idle": len(self._idle)}
+
+@st.cache_resource(show_spinner=False)
+def db_pool(path: str) -> DBPool:
+    return DBPool(path)
+
+_DB_LOCAL = threading.local()
+
+@contextmanager
+def db_conn() -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled connection for the block. Re-entrant within a thread."""
+    held = getattr(_DB_LOCAL, "conn", None)
+    if held is not None:
+        yield held
+        return
+    pool = db_pool(DB_PATH)
+    conn = pool.acquire()
+    _DB_LOCAL.conn = conn
+    try:
+        yield conn
+    finally:
+        _DB_LOCAL.conn = None
+        pool.release(conn)
+
+@contextmanager
+def db_tx() -> Iterator[sqlite3.Connection]:
+    """Run the block as one write transaction; nested scopes join the outer one."""
+    with db_conn() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        invalidate_read_cache()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            invalidate_read_cache()
+        conn.commit()
+
+# Per-rerun read cache: repeated reads within one script run are served from memory.
+# Only active on the script thread between begin_read_cache() calls; any db_tx clears it.
+_READ_CACHE = threading.local()
+READ_CACHE_STATS = {"hits": 0, "misses": 0}
+_READ_CACHE_STATS_LOCK = threading.Lock()
+
+def begin_read_cache() -> None:
+    """Start a fresh read cache for the current script run (called from main)."""
+    _READ_CACHE.store = {}
+
+def invalidate_read_cache() -> None:
+    if getattr(_READ_CACHE, "store", None) is not None:
+        _READ_CACHE.store = {}
+
+def _read_cache_count(field: str) -> None:
+    with _READ_CACHE_STATS_LOCK:
+        READ_CACHE_STATS[field] += 1
+
+class FrozenRow(dict):
+    """Read-only dict shared by every caller of a rerun_cached read; use dict(row) for a changeable copy."""
+
+    __slots__ = ()
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("cached rows are shared; copy with dict(row) before changing them")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return FrozenRow, (dict(self),)
+
+def freeze(val: Any) -> Any:
+    """Read-only form of a cached read: lists/tuples become tuples, dicts FrozenRows (already-frozen rows are kept)."""
+    if isinstance(val, FrozenRow):
+        return val
+    if isinstance(val, dict):
+        return FrozenRow({k: freeze(v) for k, v in val.items()})
+    if isinstance(val, (list, tuple)):
+        return tuple(map(freeze, val))
+    return val
+
+def row_dicts(cur: sqlite3.Cursor, rows: Optional[List[Tuple[Any, ...]]] = None) -> List[Dict[str, Any]]:
+    """Cursor rows as FrozenRows keyed by column name; a trailing `sort_key` column is left out."""
+    cols = [d[0] for d in cur.description]
+    if cols[-1] == "sort_key":
+        cols = cols[:-1]  # zip stops at the shorter side
+    return [FrozenRow(zip(cols, r)) for r in (cur.fetchall() if rows is None else rows)]
+
+def rerun_cached(fn):
+    """Memoize a DB read for the rest of the current rerun.
+
+    The result is frozen (see freeze) and shared: a hit returns the same object and costs no copy.
+    Callers that need to change it take a copy first.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        store = getattr(_READ_CACHE, "store", None)
+        if store is None:
+            return fn(*args, **kwargs)
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        if key in store:
+            _read_cache_count("hits")
+            return store[key]
+        _read_cache_count("misses")
+        val = store[key] = freeze(fn(*args, **kwargs))
+        return val
+    return wrapper
+
 def init_db() -> None:
-    conn = db()
-    cur = conn.cursor()
+    with db_tx() as conn:
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cards (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                language TEXT NOT NULL DEFAULT 'fr',
+                front TEXT NOT NULL,
+                back TEXT NOT NULL,
+                tags TEXT NOT NULL DEFAULT '',
+                example TEXT NOT NULL DEFAULT '',
+                notes TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            """
+        )
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reviews (
+                card_id INTEGER PRIMARY KEY,
+                due_date TEXT NOT NULL,
+                interval_days INTEGER NOT NULL DEFAULT 0,
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                ease REAL NOT NULL DEFAULT 2.5,
+                last_reviewed_at TEXT,
+                last_quality INTEGER,
+                FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
+            );
+            """
+        )
 
+        # Migration safety (older DB)
+        try:
+            cur.execute("PRAGMA table_info(reviews);")
+            cols = [r[1] for r in cur.fetchall()]
+            if "last_quality" not in cols:
+                cur.execute("ALTER TABLE reviews ADD COLUMN last_quality INTEGER;")
+        except Exception:
+            pass
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                xp INTEGER NOT NULL DEFAULT 0,
+                streak INTEGER NOT NULL DEFAULT 1,
+                last_xp_date TEXT NOT NULL
+            );
+            """
+        )
+        cur.execute("SELECT id FROM user_state WHERE id = 1;")
+        if cur.fetchone() is None:
+            cur.execute(
+                "INSERT INTO user_state(id, xp, streak, last_xp_date) VALUES(1, 0, 1, ?);",
+                (iso_date(today_utc_date()),),
+            )
+
+    
+        # =========================
+
+
+        # =========================
+        # Notebook PDF + Vocab
+        # =========================
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pdf_books (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                data BLOB NOT NULL,
+                uploaded_at TEXT NOT NULL
+            );
+            """
+        )
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pdf_vocab (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                book_id INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                meaning TEXT NOT NULL DEFAULT '',
+                context TEXT NOT NULL DEFAULT '',
+                page INTEGER,
+                created_at TEXT NOT NULL,
+                FOREIGN KEY(book_id) REFERENCES pdf_books(id) ON DELETE CASCADE
+            );
+            """
+        )
+
+        run_migrations(cur)
+
+# =========================
+# Schema migrations (PRAGMA user_version)
+# =========================
+def _migrate_v1_due_indexes(cur: sqlite3.Cursor) -> None:
+    # Store due dates as plain 'YYYY-MM-DD' so range predicates compare the raw column (sargable).
+    cur.execute("UPDATE reviews SET due_date = date(due_date) WHERE due_date <> date(due_date) AND date(due_date) IS NOT NULL;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reviews_due ON reviews(due_date, card_id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_created ON cards(created_at, id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_updated ON cards(updated_at, id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_front_lower ON cards(LOWER(front), id);")
+
+# FTS5 indexes store text with French ligatures folded (œ -> oe, æ -> ae); the unicode61
+# tokenizer then removes diacritics (é -> e) and case on both the index and query side.
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+FTS_FOLD = str.maketrans({"œ": "oe", "Œ": "OE", "æ": "ae", "Æ": "AE"})
+
+def _fts_fold_sql(expr: str) -> str:
+    for src, dst in FTS_FOLD.items():
+        expr = f"replace({expr}, '{chr(src)}', '{dst}')"
+    return expr
+
+def _create_fts_index(cur: sqlite3.Cursor, table: str, columns: List[str]) -> None:
+    """Create `<table>_fts` (rowid = table id) plus triggers keeping it in sync, and backfill it."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_vals = ", ".join(_fts_fold_sql(f"new.{c}") for c in columns)
+    cur.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, tokenize='{FTS_TOKENIZE}');")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES(new.id, {new_vals}); END;")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"DELETE FROM {fts} WHERE rowid = old.id; END;")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+                f"DELETE FROM {fts} WHERE rowid = old.id; "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES(new.id, {new_vals}); END;")
+    cur.execute(f"DELETE FROM {fts};")
+    cur.execute(f"INSERT INTO {fts}(rowid, {cols}) SELECT id, {', '.join(_fts_fold_sql(c) for c in columns)} FROM {table};")
+
+def _migrate_v2_fts(cur: sqlite3.Cursor) -> None:
+    _create_fts_index(cur, "cards", ["front", "back", "example", "notes"])
+    _create_fts_index(cur, "pdf_vocab", ["word", "meaning", "context"])
+
+def _migrate_v3_card_tags(cur: sqlite3.Cursor) -> None:
+    # cards.tags stays the user-facing string (editor / CSV); card_tags is the indexed copy.
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS cards (
+        CREATE TABLE IF NOT EXISTS card_tags (
+            card_id INTEGER NOT NULL,
+            tag TEXT NOT NULL COLLATE NOCASE,
+            PRIMARY KEY(card_id, tag),
+            FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_card_tags_tag ON card_tags(tag, card_id);")
+    rows = cur.execute("SELECT id, tags FROM cards WHERE tags <> '';").fetchall()
+    cur.executemany(
+        "INSERT OR IGNORE INTO card_tags(card_id, tag) VALUES(?, ?);",
+        [(int(cid), t) for cid, tags in rows for t in split_tags(tags)],
+    )
+
+def _migrate_v4_pdf_blob_store(cur: sqlite3.Cursor) -> None:
+    # PDFs move to the on-disk blob store; pdf_books keeps metadata + sha256 and an empty `data`.
+    cols = [r[1] for r in cur.execute("PRAGMA table_info(pdf_books);").fetchall()]
+    if "sha256" not in cols:
+        cur.execute("ALTER TABLE pdf_books ADD COLUMN sha256 TEXT NOT NULL DEFAULT '';")
+    if "size" not in cols:
+        cur.execute("ALTER TABLE pdf_books ADD COLUMN size INTEGER NOT NULL DEFAULT 0;")
+    ids = [int(r[0]) for r in cur.execute("SELECT id FROM pdf_books WHERE length(data) > 0;").fetchall()]
+    for book_id in ids:
+        data = cur.execute("SELECT data FROM pdf_books WHERE id=?;", (book_id,)).fetchone()[0]
+        sha = pdf_blob_put(data)
+        cur.execute("UPDATE pdf_books SET sha256=?, size=?, data=x'' WHERE id=?;", (sha, len(data), book_id))
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pdf_books_sha ON pdf_books(sha256);")
+
+def _migrate_v5_pdf_pages(cur: sqlite3.Cursor) -> None:
+    # Whole-book page text, keyed by PDF content hash (filled by pdf_text_ingest).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pdf_pages (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            language TEXT NOT NULL DEFAULT 'fr',
-            front TEXT NOT NULL,
-            back TEXT NOT NULL,
-            tags TEXT NOT NULL DEFAULT '',
-            example TEXT NOT NULL DEFAULT '',
-            notes TEXT NOT NULL DEFAULT '',
-            created_at TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            text TEXT NOT NULL DEFAULT '',
+            UNIQUE(sha256, page)
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pdf_text_status (
+            sha256 TEXT PRIMARY KEY,
+            page_count INTEGER NOT NULL DEFAULT 0,
+            pages_done INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',
             updated_at TEXT NOT NULL
         );
         """
     )
+    _create_fts_index(cur, "pdf_pages", ["text"])
 
+def _migrate_v6_review_log(cur: sqlite3.Cursor) -> None:
+    # Append-only history behind `reviews`: one row per grade (quality = review-page scale)
+    # or per state snapshot (quality NULL: imports, pre-log progress). Columns hold the state after the event.
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS reviews (
-            card_id INTEGER PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS review_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            card_id INTEGER NOT NULL,
+            ts TEXT NOT NULL,
+            quality INTEGER,
             due_date TEXT NOT NULL,
-            interval_days INTEGER NOT NULL DEFAULT 0,
-            repetitions INTEGER NOT NULL DEFAULT 0,
-            ease REAL NOT NULL DEFAULT 2.5,
-            last_reviewed_at TEXT,
-            last_quality INTEGER,
+            interval_days INTEGER NOT NULL,
+            repetitions INTEGER NOT NULL,
+            ease REAL NOT NULL,
             FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
         );
         """
     )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_review_log_card_ts ON review_log(card_id, ts);")
+    # Seed snapshots so a replay keeps progress made before the log existed.
+    cur.execute(
+        """
+        INSERT INTO review_log(card_id, ts, quality, due_date, interval_days, repetitions, ease)
+        SELECT card_id, COALESCE(last_reviewed_at, ?), NULL, due_date, interval_days, repetitions, ease
+        FROM reviews
+        WHERE repetitions > 0 OR interval_days > 0 OR last_reviewed_at IS NOT NULL;
+        """,
+        (datetime.utcnow().isoformat(timespec="seconds"),),
+    )
 
-    # Migration safety (older DB)
-    try:
-        cur.execute("PRAGMA table_info(reviews);")
-        cols = [r[1] for r in cur.fetchall()]
-        if "last_quality" not in cols:
-            cur.execute("ALTER TABLE reviews ADD COLUMN last_quality INTEGER;")
-    except Exception:
-        pass
+def _migrate_v7_review_quality_index(cur: sqlite3.Cursor) -> None:
+    # Review bucket counts / lists filter and group on last_quality.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reviews_quality ON reviews(last_quality, card_id);")
 
+def _migrate_v8_lookup_cache(cur: sqlite3.Cursor) -> None:
+    # Dictionary / translation responses shared by every process (see lookup_cached). Times are epoch seconds.
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS user_state (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            xp INTEGER NOT NULL DEFAULT 0,
-            streak INTEGER NOT NULL DEFAULT 1,
-            last_xp_date TEXT NOT NULL
+        CREATE TABLE IF NOT EXISTS lookup_cache (
+            backend TEXT NOT NULL,
+            lang TEXT NOT NULL,
+            key TEXT NOT NULL,
+            ok INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL,
+            PRIMARY KEY(backend, lang, key)
         );
         """
     )
-    cur.execute("SELECT id FROM user_state WHERE id = 1;")
-    if cur.fetchone() is None:
-        cur.execute(
-            "INSERT INTO user_state(id, xp, streak, last_xp_date) VALUES(1, 0, 1, ?);",
-            (iso_date(today_utc_date()),),
-        )
-
-    
-    # =========================
-
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_lookup_cache_last_hit ON lookup_cache(last_hit_at);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_lookup_cache_expires ON lookup_cache(expires_at);")
 
-    # =========================
-    # Notebook PDF + Vocab
-    # =========================
+def _migrate_v9_offline_dictionary(cur: sqlite3.Cursor) -> None:
+    # Local dictionary loaded from Kaikki JSONL (dict_ingest_jsonl): entries by normalized headword,
+    # plus inflected form -> entry links. senses is JSON [{"gloss", "examples"}].
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS pdf_books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            data BLOB NOT NULL,
-            uploaded_at TEXT NOT NULL
+        CREATE TABLE IF NOT EXISTS dict_entries (
+            id INTEGER PRIMARY KEY,
+            lang TEXT NOT NULL,
+            word TEXT NOT NULL,
+            word_key TEXT NOT NULL,
+            pos TEXT NOT NULL DEFAULT '',
+            ipa TEXT NOT NULL DEFAULT '',
+            senses TEXT NOT NULL DEFAULT '[]'
         );
         """
     )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_dict_entries_key ON dict_entries(lang, word_key);")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dict_forms (
+            lang TEXT NOT NULL,
+            form_key TEXT NOT NULL,
+            entry_id INTEGER NOT NULL,
+            PRIMARY KEY(lang, form_key, entry_id),
+            FOREIGN KEY(entry_id) REFERENCES dict_entries(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+        """
+    )
 
+def _migrate_v10_review_rows(cur: sqlite3.Cursor) -> None:
+    # Every card gets a reviews row (new cards already do, see upsert_review_defaults) so the
+    # due-ordered card list can be driven from idx_reviews_due. Legacy cards fall due on their creation day.
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS pdf_vocab (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            book_id INTEGER NOT NULL,
-            word TEXT NOT NULL,
-            meaning TEXT NOT NULL DEFAULT '',
-            context TEXT NOT NULL DEFAULT '',
-            page INTEGER,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(book_id) REFERENCES pdf_books(id) ON DELETE CASCADE
-        );
+        INSERT OR IGNORE INTO reviews(card_id, due_date, interval_days, repetitions, ease, last_reviewed_at)
+        SELECT id, substr(created_at, 1, 10), 0, 0, 2.5, NULL FROM cards
+        WHERE id NOT IN (SELECT card_id FROM reviews);
         """
     )
 
-    conn.commit()
-    conn.close()
+def _migrate_v11_card_front_key(cur: sqlite3.Cursor) -> None:
+    # norm_word(front), kept by the card writers, so "do I already have this word?" is an index
+    # lookup. Folded in Python: SQLite's LOWER() only folds ASCII, so "État" would miss "état".
+    if "front_key" not in [r[1] for r in cur.execute("PRAGMA table_info(cards);").fetchall()]:
+        cur.execute("ALTER TABLE cards ADD COLUMN front_key TEXT NOT NULL DEFAULT '';")
+    rows = cur.execute("SELECT id, front FROM cards;").fetchall()
+    cur.executemany("UPDATE cards SET front_key=? WHERE id=?;", [(norm_word(front), cid) for cid, front in rows])
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_front_key ON cards(language, front_key);")
+
+SCHEMA_MIGRATIONS: List[Tuple[int, Any]] = [
+    (1, _migrate_v1_due_indexes),
+    (2, _migrate_v2_fts),
+    (3, _migrate_v3_card_tags),
+    (4, _migrate_v4_pdf_blob_store),
+    (5, _migrate_v5_pdf_pages),
+    (6, _migrate_v6_review_log),
+    (7, _migrate_v7_review_quality_index),
+    (8, _migrate_v8_lookup_cache),
+    (9, _migrate_v9_offline_dictionary),
+    (10, _migrate_v10_review_rows),
+    (11, _migrate_v11_card_front_key),
+]
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression: every word as a prefix term, ANDed."""
+    words = re.findall(r"\w+", norm_text(text).translate(FTS_FOLD))
+    return " ".join(f'"{w}"*' for w in words)
+
+def run_migrations(cur: sqlite3.Cursor) -> None:
+    """Apply pending migrations in order; the applied version lives in PRAGMA user_version."""
+    version = int(cur.execute("PRAGMA user_version;").fetchone()[0] or 0)
+    for target, migrate in SCHEMA_MIGRATIONS:
+        if version < target:
+            migrate(cur)
+            cur.execute(f"PRAGMA user_version = {int(target)};")
+            version = target
+
+# Hot queries whose plans must stay index-driven (checked by explain_hot_queries and tests/test_query_plans.py).
+# Each entry builds the exact SQL the app runs, with representative params.
+HOT_QUERIES: Dict[str, Callable[[], Tuple[str, List[Any]]]] = {
+    "due_cards": lambda: (DUE_CARDS_SQL, ["2000-01-01"]),
+    "due_card_ids": lambda: (DUE_CARD_IDS_SQL, ["2000-01-01", 0]),
+    "due_count": lambda: (DUE_COUNT_SQL, ["2000-01-01"]),
+    "due_forecast": lambda: (DUE_FORECAST_SQL, ["2000-01-01"]),
+    "cards_page_updated": lambda: cards_query_sql(order_by="updated_desc", limit=19),
+    "cards_page_created": lambda: cards_query_sql(order_by="created_desc", limit=19),
+    "cards_page_due": lambda: cards_query_sql(order_by="due_asc", limit=19),
+    "cards_page_due_next": lambda: cards_query_sql(order_by="due_asc", after=("2000-01-01", 1), limit=19),
+    "cards_page_front": lambda: cards_query_sql(order_by="front_asc", limit=19),
+    "cards_page_notes": lambda: cards_query_sql(limit=26, with_notes=True),
+    "cards_count_tags_all": lambda: cards_count_sql(tag="a, b"),
+    "cards_count_tags_any": lambda: cards_count_sql(tag="a, b", tag_mode="any"),
+    "cards_count_due": lambda: cards_count_sql(bucket="due"),
+    "cards_count_bucket": lambda: cards_count_sql(bucket="meh"),
+    "cards_created_on": lambda: (CARDS_CREATED_ON_SQL, ["2000-01-01", "2000-01-02"]),
+    "tag_counts": lambda: (TAG_COUNTS_SQL, []),
+    "bucket_counts": lambda: (REVIEW_QUALITY_COUNTS_SQL, []),
+    "lookup_cache_lru": lambda: (LOOKUP_CACHE_LRU_SQL, [10]),
+    "dict_entries": lambda: (DICT_ENTRIES_SQL, ["fr", "a", 8]),
+    "dict_forms": lambda: (DICT_FORMS_SQL, ["fr", "a", 8]),
+    "review_log_replay": lambda: (REVIEW_LOG_REPLAY_SQL, []),
+    "card_front_keys": lambda: (card_front_keys_sql(3), ["fr", "a", "b", "c"]),
+}
+
+def explain_hot_queries() -> List[Dict[str, Any]]:
+    """EXPLAIN QUERY PLAN each hot query; `ok` is False if it scans a table or sorts in a temp B-tree."""
+    out: List[Dict[str, Any]] = []
+    with db_conn() as conn:
+        for name, build in HOT_QUERIES.items():
+            sql, params = build()
+            plan = [str(r[-1]) for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+            bad = [p for p in plan if "TEMP B-TREE" in p or (p.startswith("SCAN") and "INDEX" not in p)]
+            out.append({"query": name, "ok": not bad, "plan": " | ".join(plan)})
+    return out
+
 
 
 
+@rerun_cached
 def get_user_state() -> Dict[str, Any]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT xp, streak, last_xp_date FROM user_state WHERE id=1;")
-    row = cur.fetchone()
-    conn.close()
+    with db_conn() as conn:
+        row = conn.execute("SELECT xp, streak, last_xp_date FROM user_state WHERE id=1;").fetchone()
     if not row:
         return {"xp": 0, "streak": 1, "last_xp_date": iso_date(today_utc_date())}
     xp, streak, last_xp_date = row
@@ -712,27 +1170,21 @@ def set_user_state(xp: int, streak: int, last_xp_date: str) -> None:
     last_err: Optional[Exception] = None
     for _ in range(3):
         try:
-            conn = db()
-            conn.execute(
-                """
-                INSERT INTO user_state(id, xp, streak, last_xp_date)
-                VALUES(1, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    xp=excluded.xp,
-                    streak=excluded.streak,
-                    last_xp_date=excluded.last_xp_date;
-                """,
-                (xp_i, streak_i, last_s),
-            )
-            conn.commit()
-            conn.close()
+            with db_tx() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO user_state(id, xp, streak, last_xp_date)
+                    VALUES(1, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        xp=excluded.xp,
+                        streak=excluded.streak,
+                        last_xp_date=excluded.last_xp_date;
+                    """,
+                    (xp_i, streak_i, last_s),
+                )
             return
         except Exception as e:
             last_err = e
-            try:
-                conn.close()
-            except Exception:
-                pass
             import time as _time
             _time.sleep(0.05)
     if last_err:
@@ -753,19 +1205,13 @@ def sync_session_from_db() -> None:
         st.session_state.streak = db_streak
     st.session_state.last_xp_date = db_last
 
+@rerun_cached
 def count_cards_db() -> int:
     try:
-        conn = db()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM cards;")
-        n = cur.fetchone()[0]
-        conn.close()
+        with db_conn() as conn:
+            n = conn.execute("SELECT COUNT(*) FROM cards;").fetchone()[0]
         return int(n or 0)
     except Exception:
-        try:
-            conn.close()
-        except Exception:
-            pass
         return 0
 
 def reconcile_carrots_with_cards() -> None:
@@ -786,307 +1232,1842 @@ def reconcile_carrots_with_cards() -> None:
     except Exception:
         pass
 
+def sync_card_tags(card_id: int, tags: str) -> None:
+    """Rewrite the card_tags rows of one card from its comma-separated tag string."""
+    with db_tx() as conn:
+        conn.execute("DELETE FROM card_tags WHERE card_id=?;", (int(card_id),))
+        conn.executemany(
+            "INSERT OR IGNORE INTO card_tags(card_id, tag) VALUES(?, ?);",
+            [(int(card_id), t) for t in split_tags(tags)],
+        )
+
 def upsert_review_defaults(card_id: int) -> None:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT card_id FROM reviews WHERE card_id=?", (card_id,))
-    row = cur.fetchone()
-    if row is None:
-        cur.execute(
+    with db_tx() as conn:
+        conn.execute(
             """
-            INSERT INTO reviews(card_id, due_date, interval_days, repetitions, ease, last_reviewed_at)
+            INSERT OR IGNORE INTO reviews(card_id, due_date, interval_days, repetitions, ease, last_reviewed_at)
             VALUES(?, ?, 0, 0, 2.5, NULL)
             """,
             (card_id, iso_date(today_utc_date())),
         )
-    conn.commit()
-    conn.close()
 
 def create_card(language: str, front: str, back: str, tags: str, example: str, notes: str) -> int:
     now = datetime.utcnow().isoformat(timespec="seconds")
-    conn = db()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO cards(language, front, back, tags, example, notes, created_at, updated_at)
-        VALUES(?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (norm_text(language), norm_text(front), norm_text(back), norm_text(tags),
-         norm_text(example), norm_text(notes), now, now),
-    )
-    card_id = int(cur.lastrowid)
-    conn.commit()
-    conn.close()
-    upsert_review_defaults(card_id)
+    with db_tx() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO cards(language, front, back, tags, example, notes, created_at, updated_at, front_key)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (norm_text(language), norm_text(front), norm_text(back), norm_text(tags),
+             norm_text(example), norm_text(notes), now, now, norm_word(front)),
+        )
+        card_id = int(cur.lastrowid)
+        sync_card_tags(card_id, norm_text(tags))
+        upsert_review_defaults(card_id)
     return card_id
 
 def update_card(card_id: int, language: str, front: str, back: str, tags: str, example: str, notes: str) -> None:
     now = datetime.utcnow().isoformat(timespec="seconds")
-    conn = db()
-    conn.execute(
+    with db_tx() as conn:
+        conn.execute(
+            """
+            UPDATE cards
+            SET language=?, front=?, back=?, tags=?, example=?, notes=?, updated_at=?, front_key=?
+            WHERE id=?
+            """,
+            (norm_text(language), norm_text(front), norm_text(back), norm_text(tags),
+             norm_text(example), norm_text(notes), now, norm_word(front), card_id),
+        )
+        sync_card_tags(card_id, norm_text(tags))
+        upsert_review_defaults(card_id)
+
+def delete_card(card_id: int) -> None:
+    with db_tx() as conn:
+        conn.execute("DELETE FROM cards WHERE id=?", (card_id,))
+
+CARD_IMPORT_FIELDS = ["language", "front", "back", "tags", "example", "notes"]
+IMPORT_BATCH_ROWS = 1000
+
+def card_import_values(row: Dict[str, Any]) -> Tuple[str, str, str, str, str, str]:
+    """Normalize one import row to (language, front, back, tags, example, notes); ValueError if unusable."""
+    if row.get("_error"):
+        raise ValueError(row["_error"])
+    language = norm_text(row.get("language") or "fr") or "fr"
+    front = norm_text(row.get("front") or "")
+    back = norm_text(row.get("back") or "")
+    if not front or not back:
+        raise ValueError("missing front" if not front else "missing back")
+    return (language, front, back, norm_text(row.get("tags") or ""), norm_text(row.get("example") or ""), norm_text(row.get("notes") or ""))
+
+def iter_csv_rows(fh: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """Lazily parse a binary UTF-8 CSV stream into row dicts, one physical line at a time.
+
+    Each row carries `_line` (its first line number in the file). Lines that are not valid
+    UTF-8 are decoded with replacement characters and their row gets `_error` set instead
+    of aborting the whole import.
+    """
+    bad_lines: set = set()
+
+    def lines() -> Iterator[str]:
+        for n, raw in enumerate(fh, start=1):
+            if n == 1 and raw.startswith(codecs.BOM_UTF8):
+                raw = raw[len(codecs.BOM_UTF8):]
+            try:
+                yield raw.decode("utf-8")
+            except UnicodeDecodeError:
+                bad_lines.add(n)
+                yield raw.decode("utf-8", errors="replace")
+
+    reader = csv.DictReader(lines())
+    if reader.fieldnames is None:  # empty file
+        return
+    prev = reader.line_num
+    for row in reader:
+        first, prev = prev + 1, reader.line_num
+        out: Dict[str, Any] = dict(row)
+        out["_line"] = first
+        hit = sorted(n for n in bad_lines if first <= n <= prev)
+        if hit:
+            out["_error"] = f"invalid UTF-8 on line {hit[0]}"
+            bad_lines.difference_update(hit)
+        yield out
+
+class ImportRejects:
+    """Collects rejected import rows as a CSV (line, error, original fields) for download."""
+
+    FIELDS = ["line", "error"] + CARD_IMPORT_FIELDS
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._buf = io.StringIO()
+        self._w = csv.DictWriter(self._buf, fieldnames=self.FIELDS, extrasaction="ignore")
+        self._w.writeheader()
+
+    def add(self, row: Dict[str, Any], reason: str) -> None:
+        self.count += 1
+        self._w.writerow({**{k: v for k, v in row.items() if isinstance(k, str)}, "line": row.get("_line", ""), "error": reason})
+
+    def csv_bytes(self) -> bytes:
+        return self._buf.getvalue().encode("utf-8")
+
+REVIEW_EXPORT_FIELDS = ["due_date", "interval_days", "repetitions", "ease", "last_quality", "last_reviewed_at"]
+
+# format -> (label, file extension, mime, include review state)
+EXPORT_FORMATS: Dict[str, Tuple[str, str, str, bool]] = {
+    "csv": ("CSV (cards)", "csv", "text/csv", False),
+    "jsonl": ("JSONL (cards + review state)", "jsonl", "application/jsonl", True),
+    "review_csv": ("CSV (cards + review state)", "csv", "text/csv", True),
+    "apkg": ("Anki deck (.apkg)", "apkg", "application/octet-stream", True),
+}
+EXPORT_BATCH_ROWS = 1000
+
+def iter_export_rows(include_reviews: bool = False, batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[Dict[str, Any]]:
+    """Stream every card (oldest first) from one cursor, batch_size rows at a time."""
+    cols = ", ".join(f"c.{f}" for f in CARD_IMPORT_FIELDS) + ", c.created_at, c.updated_at"
+    if include_reviews:
+        cols += ", " + ", ".join(f"r.{f}" for f in REVIEW_EXPORT_FIELDS)
+    with db_conn() as conn:
+        cur = conn.execute(f"SELECT {cols} FROM cards c LEFT JOIN reviews r ON r.card_id = c.id ORDER BY c.id;")
+        names = [d[0] for d in cur.description]
+        while True:
+            chunk = cur.fetchmany(batch_size)
+            if not chunk:
+                break
+            for row in chunk:
+                yield dict(zip(names, row))
+
+def write_cards_export(fmt: str, fh: IO[bytes]) -> int:
+    """Write the export in format fmt (see EXPORT_FORMATS) to a binary stream; returns the row count."""
+    _label, _ext, _mime, include_reviews = EXPORT_FORMATS[fmt]
+    if fmt == "apkg":
+        return write_apkg(fh)
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="", write_through=False)
+    n = 0
+    try:
+        rows = iter_export_rows(include_reviews)
+        if fmt == "jsonl":
+            for row in rows:
+                text.write(json.dumps(row, ensure_ascii=False) + "\n")
+                n += 1
+        else:
+            fields = CARD_IMPORT_FIELDS + (["created_at", "updated_at"] + REVIEW_EXPORT_FIELDS if include_reviews else [])
+            w = csv.DictWriter(text, fieldnames=fields, extrasaction="ignore")
+            w.writeheader()
+            for row in rows:
+                w.writerow(row)
+                n += 1
+        text.flush()
+    finally:
+        text.detach()
+    return n
+
+def export_cards_file(fmt: str) -> bytes:
+    """The export as bytes, for st.download_button (which accepts bytes, not arbitrary file objects).
+
+    Rows are written to a temp file one batch at a time, so only the finished file is held in memory.
+    """
+    with tempfile.TemporaryFile() as fh:
+        write_cards_export(fmt, fh)
+        fh.seek(0)
+        return fh.read()
+
+ReviewState = Tuple[str, int, int, float, Optional[int], Optional[str]]  # REVIEW_EXPORT_FIELDS order
+ReviewHistory = List[Tuple[str, int, str, int, int, float]]  # review_log rows minus card_id (see _anki_review_history)
+
+def review_import_values(row: Dict[str, Any]) -> Optional[ReviewState]:
+    """Scheduling state carried by an import row (review-state CSV/JSONL, Anki), or None for a new card."""
+    due = norm_text(str(row.get("due_date") or ""))
+    if not due:
+        return None
+    try:
+        due = date.fromisoformat(due).isoformat()  # stored as YYYY-MM-DD: the due indexes compare text
+        interval = max(0, int(float(row.get("interval_days") or 0)))
+        reps = max(0, int(float(row.get("repetitions") or 0)))
+        ease = max(1.3, float(row.get("ease") or 2.5))
+        q = row.get("last_quality")
+        last_quality = None if q in (None, "") else clamp_int(int(float(q)), 1, 5)
+    except (TypeError, ValueError):
+        raise ValueError("bad review state")
+    return (due, interval, reps, ease, last_quality, norm_text(str(row.get("last_reviewed_at") or "")) or None)
+
+def _insert_card_batch(
+    conn: sqlite3.Connection,
+    batch: List[Tuple[Tuple[str, str, str, str, str, str], Optional[ReviewState], ReviewHistory]],
+    now: str,
+    due: str,
+) -> None:
+    """Insert cards plus their card_tags / reviews / review_log rows. Caller holds the write transaction.
+
+    Each batch item is (card values, review state, review history); cards without a state get the
+    defaults (due today). History rows are logged before the imported state's snapshot.
+    """
+    # Under BEGIN IMMEDIATE nobody else can insert, and AUTOINCREMENT ids only grow,
+    # so the new rows are exactly those above the current max, in insertion order.
+    start = int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM cards;").fetchone()[0])
+    conn.executemany(
         """
-        UPDATE cards
-        SET language=?, front=?, back=?, tags=?, example=?, notes=?, updated_at=?
-        WHERE id=?
+        INSERT INTO cards(language, front, back, tags, example, notes, created_at, updated_at, front_key)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
-        (norm_text(language), norm_text(front), norm_text(back), norm_text(tags),
-         norm_text(example), norm_text(notes), now, card_id),
+        [v + (now, now, norm_word(v[1])) for v, _review, _history in batch],
+    )
+    ids = [int(r[0]) for r in conn.execute("SELECT id FROM cards WHERE id > ? ORDER BY id;", (start,))]
+    conn.executemany(
+        "INSERT OR IGNORE INTO card_tags(card_id, tag) VALUES(?, ?);",
+        [(cid, t) for cid, (v, _review, _history) in zip(ids, batch) for t in split_tags(v[3])],
+    )
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO reviews(card_id, due_date, interval_days, repetitions, ease, last_quality, last_reviewed_at)
+        VALUES(?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(cid,) + (review or (due, 0, 0, 2.5, None, None)) for cid, (_v, review, _history) in zip(ids, batch)],
+    )
+    log_review_events(conn, [(cid,) + h for cid, (_v, _review, history) in zip(ids, batch) for h in history])
+    log_review_events(
+        conn,
+        [(cid, now, None, review[0], review[1], review[2], review[3]) for cid, (_v, review, _history) in zip(ids, batch) if review],
     )
-    conn.commit()
-    conn.close()
-    upsert_review_defaults(card_id)
 
-def delete_card(card_id: int) -> None:
-    conn = db()
-    conn.execute("DELETE FROM cards WHERE id=?", (card_id,))
-    conn.commit()
-    conn.close()
+def bulk_import_cards(
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = IMPORT_BATCH_ROWS,
+    progress: Optional[Callable[[int, int], None]] = None,
+    on_reject: Optional[Callable[[Dict[str, Any], str], None]] = None,
+) -> Dict[str, int]:
+    """Import card rows (dicts keyed by CARD_IMPORT_FIELDS) in one transaction.
+
+    rows may be a lazy iterator (see iter_csv_rows); only one batch is held at a time.
+    Rows that also carry REVIEW_EXPORT_FIELDS keep that scheduling state instead of becoming due today,
+    and a `_history` list (see iter_apkg_rows) goes to review_log in the same transaction.
+    Rows are normalized with card_import_values and written with executemany in batches of
+    batch_size; unusable rows are skipped and reported to on_reject(row, reason).
+    progress(rows_seen, created) is called after each batch. Returns {"created", "skipped"}.
+    """
+    now = datetime.utcnow().isoformat(timespec="seconds")
+    due = iso_date(today_utc_date())
+    seen = created = skipped = 0
+    batch: List[Tuple[Tuple[str, str, str, str, str, str], Optional[ReviewState], ReviewHistory]] = []
+    with db_tx() as conn:
+        for row in rows:
+            seen += 1
+            history = row.get("_history")
+            try:
+                batch.append((card_import_values(row), review_import_values(row), history if isinstance(history, list) else []))
+            except ValueError as e:
+                skipped += 1
+                if on_reject:
+                    on_reject(row, str(e))
+            if len(batch) >= batch_size:
+                _insert_card_batch(conn, batch, now, due)
+                created += len(batch)
+                batch = []
+                if progress:
+                    progress(seen, created)
+        if batch:
+            _insert_card_batch(conn, batch, now, due)
+            created += len(batch)
+        if progress:
+            progress(seen, created)
+    return {"created": created, "skipped": skipped}
+
+# =========================
+# Anki .apkg (legacy collection schema 11)
+# =========================
+ANKI_DAY_SECONDS = 86400
+# Anki answer button (1 Again .. 4 Easy) <-> our last_quality (1 very easy .. 5 very difficult)
+ANKI_EASE_TO_QUALITY = {1: 5, 2: 3, 3: 2, 4: 1}
+QUALITY_TO_ANKI_EASE = {1: 4, 2: 3, 3: 2, 4: 1, 5: 1}
+ANKI_FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "front": ("front", "word", "expression", "question", "vocab"),
+    "back": ("back", "meaning", "answer", "definition", "translation"),
+    "example": ("example", "sentence", "examples"),
+    "notes": ("notes", "note", "extra", "comments"),
+    "language": ("language", "lang"),
+}
+_ANKI_BREAK_RE = re.compile(r"<\s*(br|/div|/p|/li)\s*/?\s*>", re.IGNORECASE)
+_ANKI_TAG_RE = re.compile(r"<[^>]*>")
+_ANKI_SOUND_RE = re.compile(r"\[sound:[^\]]*\]")
 
-def fetch_cards(filter_text: str = "", tag: str = "", order_by: str = "updated_desc") -> List[Dict[str, Any]]:
+def anki_field_text(s: str) -> str:
+    """Anki field HTML -> plain text (line breaks kept, markup and [sound:] refs dropped)."""
+    s = _ANKI_SOUND_RE.sub("", s or "")
+    s = _ANKI_TAG_RE.sub("", _ANKI_BREAK_RE.sub("\n", s))
+    s = html.unescape(s).replace("\xa0", " ")
+    return "\n".join(line.strip() for line in s.splitlines()).strip()
+
+def anki_field_html(s: str) -> str:
+    return html.escape(s or "", quote=False).replace("\n", "<br>")
+
+@contextmanager
+def apkg_collection(fh: IO[bytes]) -> Iterator[sqlite3.Connection]:
+    """Open the collection inside an .apkg as a read-only SQLite connection.
+
+    Only the collection member is streamed out of the zip (to a temp file); media is never read.
+    """
+    with zipfile.ZipFile(fh) as zf:
+        names = set(zf.namelist())
+        member = next((n for n in ("collection.anki21", "collection.anki2") if n in names), None)
+        if "collection.anki21b" in names:
+            raise ValueError("This deck uses Anki's newer compressed format; re-export it with 'Support older Anki versions' enabled.")
+        if member is None:
+            raise ValueError("Not an Anki package (no collection file).")
+        tmp = tempfile.NamedTemporaryFile(suffix=".anki2", delete=False)
+        try:
+            with tmp, zf.open(member) as src:
+                shutil.copyfileobj(src, tmp, 1024 * 1024)
+            conn = sqlite3.connect(f"file:{tmp.name}?mode=ro", uri=True)
+            try:
+                yield conn
+            finally:
+                conn.close()
+        finally:
+            os.remove(tmp.name)
+
+def _anki_field_names(col: sqlite3.Connection) -> Dict[int, List[str]]:
+    """Note type id -> lower-cased field names in field order."""
+    has_fields = col.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='fields';").fetchone()
+    if has_fields:  # schema 18: note types live in their own tables
+        out: Dict[int, List[str]] = {}
+        for ntid, _ord, name in col.execute("SELECT ntid, ord, name FROM fields ORDER BY ntid, ord;"):
+            out.setdefault(int(ntid), []).append(norm_word(name))
+        return out
+    models = json.loads(col.execute("SELECT models FROM col;").fetchone()[0] or "{}")
+    return {
+        int(mid): [norm_word(f.get("name", "")) for f in sorted(m.get("flds", []), key=lambda f: f.get("ord", 0))]
+        for mid, m in models.items()
+    }
+
+def apkg_note_count(col: sqlite3.Connection) -> int:
+    return int(col.execute("SELECT COUNT(*) FROM notes;").fetchone()[0])
+
+def _anki_review_history(col: sqlite3.Connection, cid: int) -> ReviewHistory:
+    """review_log rows (ts, quality, due_date, interval_days, repetitions, ease) for a card's revlog answers, oldest first.
+
+    Learning steps (negative ivl, in seconds) count as a 0-day interval, repetitions restarts on
+    Again as in sm2_next, and manual reschedules (ease 0) are not answers, so they are skipped.
+    """
+    out: ReviewHistory = []
+    reps, ease = 0, 2.5
+    for rl_id, rl_ease, rl_ivl, rl_factor in col.execute("SELECT id, ease, ivl, factor FROM revlog WHERE cid=? ORDER BY id;", (cid,)):
+        quality = ANKI_EASE_TO_QUALITY.get(int(rl_ease))
+        if quality is None:
+            continue
+        when = datetime.utcfromtimestamp(int(rl_id) / 1000)
+        interval = max(0, int(rl_ivl))
+        reps = 0 if int(rl_ease) == 1 else reps + 1
+        ease = max(1.3, rl_factor / 1000.0) if rl_factor else ease
+        out.append((when.isoformat(timespec="seconds"), quality, iso_date(when.date() + timedelta(days=interval)), interval, reps, ease))
+    return out
+
+def iter_apkg_rows(col: sqlite3.Connection, language: str = "fr") -> Iterator[Dict[str, Any]]:
+    """Yield one import row per Anki note (CARD_IMPORT_FIELDS + REVIEW_EXPORT_FIELDS).
+
+    The note's first card (lowest template ord) supplies the scheduling state:
+    - new / learning cards become new (due today);
+    - review cards keep interval, ease (factor / 1000) and due day; repetitions is
+      approximated as reps - lapses, since Anki counts every answer;
+    - relearning cards are due today with a 1-day interval and zero repetitions, like a lapse in sm2_next.
+    The last revlog entry gives last_reviewed_at and last_quality, and every answer in the card's
+    revlog comes along as `_history` for review_log (see _anki_review_history).
+    """
+    crt = int(col.execute("SELECT crt FROM col;").fetchone()[0])
+    crt_day = datetime.utcfromtimestamp(crt).date()
+    today = today_utc_date()
+    field_names = _anki_field_names(col)
+    cur = col.execute(
+        """
+        SELECT n.id, n.mid, n.tags, n.flds, c.id, c.type, c.due, c.ivl, c.factor, c.reps, c.lapses, c.odue, c.odid,
+               rl.id, rl.ease
+        FROM notes n
+        JOIN cards c ON c.id = (SELECT id FROM cards WHERE nid = n.id ORDER BY ord LIMIT 1)
+        LEFT JOIN revlog rl ON rl.id = (SELECT MAX(id) FROM revlog WHERE cid = c.id)
+        ORDER BY n.id;
+        """
+    )
+    for nid, mid, tags, flds, cid, ctype, due, ivl, factor, reps, lapses, odue, odid, rl_id, rl_ease in cur:
+        values = [anki_field_text(f) for f in (flds or "").split("\x1f")]
+        names = field_names.get(int(mid), [])
+        row: Dict[str, Any] = {"_line": nid, "language": language, "tags": ", ".join((tags or "").split())}
+        used = set()
+        for key, aliases in ANKI_FIELD_ALIASES.items():
+            for i, name in enumerate(names):
+                if name in aliases and i < len(values) and i not in used:
+                    row[key] = values[i]
+                    used.add(i)
+                    break
+        for key, i in (("front", 0), ("back", 1)):
+            if key not in row:
+                i = next((j for j in range(len(values)) if j not in used), None)
+                if i is not None:
+                    row[key] = values[i]
+                    used.add(i)
+        if "notes" not in row:
+            row["notes"] = "\n".join(values[j] for j in range(len(values)) if j not in used and values[j])
+
+        if ctype == 2:
+            day = int(odue if odid else due)
+            row.update(
+                due_date=iso_date(crt_day + timedelta(days=day)),
+                interval_days=max(1, int(ivl)),
+                repetitions=max(1, int(reps) - int(lapses)),
+                ease=(factor or 2500) / 1000.0,
+            )
+        elif ctype == 3:
+            row.update(due_date=iso_date(today), interval_days=1, repetitions=0, ease=(factor or 2500) / 1000.0)
+        if rl_id is not None:
+            row["last_reviewed_at"] = datetime.utcfromtimestamp(int(rl_id) / 1000).isoformat(timespec="seconds")
+            row["last_quality"] = ANKI_EASE_TO_QUALITY.get(int(rl_ease))
+            row.setdefault("due_date", iso_date(today))
+            row["_history"] = _anki_review_history(col, int(cid))
+        yield row
+
+_ANKI_SCHEMA = """
+CREATE TABLE col (id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+    ver integer not null, dty integer not null, usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null, tags text not null);
+CREATE TABLE notes (id integer primary key, guid text not null, mid integer not null, mod integer not null,
+    usn integer not null, tags text not null, flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null);
+CREATE TABLE cards (id integer primary key, nid integer not null, did integer not null, ord integer not null,
+    mod integer not null, usn integer not null, type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null, lapses integer not null,
+    left integer not null, odue integer not null, odid integer not null, flags integer not null, data text not null);
+CREATE TABLE revlog (id integer primary key, cid integer not null, usn integer not null, ease integer not null,
+    ivl integer not null, lastIvl integer not null, factor integer not null, time integer not null, type integer not null);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn ON notes (usn);
+CREATE INDEX ix_cards_usn ON cards (usn);
+CREATE INDEX ix_revlog_usn ON revlog (usn);
+CREATE INDEX ix_cards_nid ON cards (nid);
+CREATE INDEX ix_cards_sched ON cards (did, queue, due);
+CREATE INDEX ix_revlog_cid ON revlog (cid);
+CREATE INDEX ix_notes_csum ON notes (csum);
+"""
+ANKI_EXPORT_FIELDS = ["Front", "Back", "Example", "Notes", "Language"]
+
+def _anki_col_row(crt: int, mid: int, did: int, now: int, next_pos: int) -> Tuple[Any, ...]:
+    model = {
+        "id": mid, "name": "Charlot", "type": 0, "mod": now, "usn": -1, "sortf": 0, "did": did,
+        "tmpls": [{
+            "name": "Card 1", "ord": 0, "qfmt": "{{Front}}", "did": None, "bqfmt": "", "bafmt": "",
+            "afmt": "{{FrontSide}}<hr id=answer>{{Back}}<br><i>{{Example}}</i><br>{{Notes}}",
+        }],
+        "flds": [
+            {"name": n, "ord": i, "sticky": False, "rtl": False, "font": "Arial", "size": 20, "media": []}
+            for i, n in enumerate(ANKI_EXPORT_FIELDS)
+        ],
+        "css": ".card { font-family: arial; font-size: 20px; text-align: center; }",
+        "latexPre": "\\documentclass[12pt]{article}\n\\begin{document}\n", "latexPost": "\\end{document}",
+        "req": [[0, "any", [0]]], "tags": [], "vers": [],
+    }
+    deck = {
+        "name": "Charlot", "extendRev": 50, "usn": -1, "collapsed": False, "newToday": [0, 0], "timeToday": [0, 0],
+        "dyn": 0, "extendNew": 10, "conf": 1, "revToday": [0, 0], "lrnToday": [0, 0], "id": did, "mod": now, "desc": "",
+    }
+    default_deck = dict(deck, name="Default", id=1)
+    dconf = {"1": {
+        "id": 1, "name": "Default", "mod": 0, "usn": 0, "maxTaken": 60, "autoplay": True, "timer": 0, "replayq": True, "dyn": False,
+        "new": {"delays": [1, 10], "ints": [1, 4, 7], "initialFactor": 2500, "order": 1, "perDay": 20, "bury": True, "separate": True},
+        "rev": {"perDay": 200, "ease4": 1.3, "fuzz": 0.05, "ivlFct": 1, "maxIvl": 36500, "bury": True, "minSpace": 1},
+        "lapse": {"delays": [10], "mult": 0, "minInt": 1, "leechFails": 8, "leechAction": 0},
+    }}
+    conf = {
+        "nextPos": next_pos, "estTimes": True, "activeDecks": [did], "sortType": "noteFld", "timeLim": 0,
+        "sortBackwards": False, "addToCur": True, "curDeck": did, "newBury": True, "newSpread": 0,
+        "dueCounts": True, "curModel": str(mid), "collapseTime": 1200,
+    }
+    return (
+        1, crt, now * 1000, now * 1000, 11, 0, 0, 0, json.dumps(conf),
+        json.dumps({str(mid): model}), json.dumps({"1": default_deck, str(did): deck}), json.dumps(dconf), "{}",
+    )
+
+def _anki_note_card(row: Dict[str, Any], nid: int, mid: int, did: int, crt_day: date, now: int, new_pos: int) -> Tuple[Tuple[Any, ...], Tuple[Any, ...], Optional[Tuple[Any, ...]]]:
+    """(notes row, cards row, revlog row or None) for one exported card."""
+    fields = [row.get("front"), row.get("back"), row.get("example"), row.get("notes"), row.get("language")]
+    flds = "\x1f".join(anki_field_html(f or "") for f in fields)
+    sfld = norm_text(row.get("front") or "")
+    csum = int(hashlib.sha1(sfld.encode("utf-8")).hexdigest()[:8], 16)
+    tags = " ".join(t.replace(" ", "_") for t in split_tags(row.get("tags") or ""))
+    guid = hashlib.sha1(f"charlot:{row.get('created_at')}:{sfld}".encode("utf-8")).hexdigest()[:10]
+    note = (nid, guid, mid, now, -1, f" {tags} " if tags else "", flds, sfld, csum, 0, "")
+
+    reps = int(row.get("repetitions") or 0)
+    interval = int(row.get("interval_days") or 0)
+    factor = int(round(float(row.get("ease") or 2.5) * 1000))
+    reviewed = row.get("last_reviewed_at")
+    if reps == 0 and interval == 0 and not reviewed:
+        card = (nid, nid, did, 0, now, -1, 0, 0, new_pos, 0, 0, 0, 0, 0, 0, 0, 0, "")
+    else:
+        due_day = date.fromisoformat(row.get("due_date") or iso_date(today_utc_date()))
+        card = (nid, nid, did, 0, now, -1, 2, 2, (due_day - crt_day).days, max(1, interval), factor, reps, 0, 0, 0, 0, 0, "")
+    revlog = None
+    if reviewed:
+        try:
+            ts = int(datetime.fromisoformat(str(reviewed)).replace(tzinfo=timezone.utc).timestamp() * 1000)
+        except ValueError:
+            ts = None
+        if ts is not None:
+            q = row.get("last_quality")
+            ease = QUALITY_TO_ANKI_EASE.get(int(q), 3) if q is not None else 3
+            revlog = (ts + nid % 1000, nid, -1, ease, max(1, interval), 0, factor, 0, 1)
+    return note, card, revlog
+
+def write_apkg(fh: IO[bytes], batch_size: int = EXPORT_BATCH_ROWS) -> int:
+    """Write all cards with their SM-2 state as an Anki package (collection.anki2, no media). Returns the card count."""
+    with db_conn() as conn:
+        first_day = conn.execute(
+            "SELECT MIN(d) FROM (SELECT MIN(due_date) AS d FROM reviews UNION ALL SELECT MIN(substr(created_at, 1, 10)) FROM cards);"
+        ).fetchone()[0]
+    crt_day = min(today_utc_date(), date.fromisoformat(first_day)) if first_day else today_utc_date()
+    crt = int(datetime(crt_day.year, crt_day.month, crt_day.day, tzinfo=timezone.utc).timestamp())
+    now = int(time.time())
+    mid = did = now * 1000
+    base_id = now * 1000
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".anki2", delete=False)
+    tmp.close()
+    n = 0
+    try:
+        col = sqlite3.connect(tmp.name)
+        try:
+            col.executescript(_ANKI_SCHEMA)
+            notes, cards, revlog = [], [], []
+
+            def flush() -> None:
+                col.executemany("INSERT INTO notes VALUES(?,?,?,?,?,?,?,?,?,?,?);", notes)
+                col.executemany("INSERT INTO cards VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?);", cards)
+                col.executemany("INSERT OR IGNORE INTO revlog VALUES(?,?,?,?,?,?,?,?,?);", revlog)
+                notes.clear()
+                cards.clear()
+                revlog.clear()
+
+            for row in iter_export_rows(include_reviews=True, batch_size=batch_size):
+                note, card, rev = _anki_note_card(row, base_id + n, mid, did, crt_day, now, n + 1)
+                notes.append(note)
+                cards.append(card)
+                if rev:
+                    revlog.append(rev)
+                n += 1
+                if len(notes) >= batch_size:
+                    flush()
+            flush()
+            col.execute("INSERT INTO col VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?);", _anki_col_row(crt, mid, did, now, n + 1))
+            col.commit()
+        finally:
+            col.close()
+        with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.write(tmp.name, "collection.anki2")
+            zf.writestr("media", "{}")
+    finally:
+        os.remove(tmp.name)
+    return n
+
+def tag_filter_sql(tag: str, tag_mode: str = "all") -> Tuple[str, List[Any]]:
+    """SQL predicate on c.id for a comma-separated tag filter.
+
+    tag_mode: "all" (card has every tag) or "any" (card has at least one).
+    """
+    tags = split_tags(tag)
+    if not tags:
+        return "", []
+    marks = ", ".join("?" for _ in tags)
+    if norm_word(tag_mode) == "any" or len(tags) == 1:
+        return f" AND c.id IN (SELECT card_id FROM card_tags WHERE tag IN ({marks}))", list(tags)
+    # One index probe per tag (no GROUP BY sort over the union of their cards).
+    return "".join(" AND c.id IN (SELECT card_id FROM card_tags WHERE tag = ?)" for _ in tags), list(tags)
+
+CARD_COLUMNS = """
+    c.id, c.language, c.front, c.back, c.tags, c.example, c.notes, c.created_at, c.updated_at,
+    r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
+"""
+
+CARD_FROM = "FROM cards c LEFT JOIN reviews r ON r.card_id = c.id"
+
+# order_by -> (sort key expression, direction, tie-break id column, FROM clause).
+# due_asc is driven from reviews (every card has a row, see _migrate_v10_review_rows)
+# so idx_reviews_due(due_date, card_id) already yields the page in order.
+CARD_ORDERS: Dict[str, Tuple[str, str, str, str]] = {
+    "updated_desc": ("c.updated_at", "DESC", "c.id", CARD_FROM),
+    "created_desc": ("c.created_at", "DESC", "c.id", CARD_FROM),
+    "due_asc": ("r.due_date", "ASC", "r.card_id", "FROM reviews r JOIN cards c ON c.id = r.card_id"),
+    "front_asc": ("LOWER(c.front)", "ASC", "c.id", CARD_FROM),
+}
+
+def card_order(order_by: str) -> Tuple[str, str, str, str]:
+    return CARD_ORDERS.get(norm_word(order_by), CARD_ORDERS["updated_desc"])
+
+def bucket_filter_sql(bucket: str) -> Tuple[str, List[Any]]:
+    """SQL predicate on c.id for a Review list: "due" (due today or earlier) or a difficulty_bucket name.
+
+    Mirrors difficulty_bucket on reviews.last_quality (served by idx_reviews_quality).
+    """
+    b = norm_word(bucket)
+    if b == "due":
+        return " AND c.id IN (SELECT card_id FROM reviews WHERE due_date <= ?)", [iso_date(today_utc_date())]
+    if b == "new":
+        return " AND c.id NOT IN (SELECT card_id FROM reviews WHERE last_quality IS NOT NULL)", []
+    quality_sql = {
+        "difficult": "last_quality <= 0 OR last_quality >= 4",
+        "meh": "last_quality = 3",
+        "easy": "last_quality IN (1, 2)",
+    }.get(b)
+    if quality_sql is None:
+        return "", []
+    return f" AND c.id IN (SELECT card_id FROM reviews WHERE {quality_sql})", []
+
+def cards_filter_sql(
+    filter_text: str = "", tag: str = "", tag_mode: str = "all", bucket: str = "", with_notes: bool = False
+) -> Tuple[str, List[Any]]:
+    """WHERE fragment (to append after `WHERE 1=1`) for the free-text, tag and review-bucket filters on `cards c`.
+
+    with_notes keeps only cards that have an example or notes (the Notes page list).
+    """
+    q = ""
+    params: List[Any] = []
+    if norm_text(filter_text):
+        match = fts_query(filter_text)
+        if match:
+            q += " AND c.id IN (SELECT rowid FROM cards_fts WHERE cards_fts MATCH ?)"
+            params.append(match)
+        else:
+            q += " AND (c.front LIKE ? OR c.back LIKE ? OR c.example LIKE ? OR c.notes LIKE ?)"
+            like = f"%{norm_text(filter_text)}%"
+            params.extend([like, like, like, like])
+    if with_notes:
+        q += " AND (c.example <> '' OR c.notes <> '')"
+    tag_sql, tag_params = tag_filter_sql(tag, tag_mode)
+    bucket_sql, bucket_params = bucket_filter_sql(bucket)
+    return q + tag_sql + bucket_sql, params + tag_params + bucket_params
+
+def cards_query_sql(
+    filter_text: str = "",
+    tag: str = "",
+    order_by: str = "updated_desc",
+    tag_mode: str = "all",
+    bucket: str = "",
+    after: Optional[Tuple[Any, int]] = None,
+    limit: Optional[int] = None,
+    with_notes: bool = False,
+) -> Tuple[str, List[Any]]:
+    """(sql, params) behind fetch_cards / fetch_cards_page: CARD_COLUMNS plus `sort_key`.
+
+    `after` is a keyset cursor (sort key, id); `limit` caps the rows (None: no LIMIT).
+    """
+    where, params = cards_filter_sql(filter_text, tag, tag_mode, bucket, with_notes)
+    key, direction, tie, source = card_order(order_by)
+    if after is not None:
+        where += f" AND ({key}, {tie}) {'<' if direction == 'DESC' else '>'} (?, ?)"
+        params = params + [after[0], int(after[1])]
+    q = f"""
+    SELECT {CARD_COLUMNS}, {key} AS sort_key
+    {source}
+    WHERE 1=1 {where}
+    ORDER BY {key} {direction}, {tie} {direction}
+    """
+    if limit is not None:
+        q += "LIMIT ?\n"
+        params = params + [int(limit)]
+    return q, params
+
+@rerun_cached
+def fetch_cards(filter_text: str = "", tag: str = "", order_by: str = "updated_desc", tag_mode: str = "all") -> List[Dict[str, Any]]:
     """Fetch cards with optional free-text filter, tag filter, and stable ordering.
 
+    tag may list several comma-separated tags, combined per tag_mode ("all" / "any").
+
     order_by:
       - updated_desc (default)
       - due_asc
       - created_desc
       - front_asc
     """
-    conn = db()
-    cur = conn.cursor()
-    q = """
-    SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes, c.created_at, c.updated_at,
-           r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
-    FROM cards c
-    LEFT JOIN reviews r ON r.card_id = c.id
-    WHERE 1=1
+    q, params = cards_query_sql(filter_text, tag, order_by, tag_mode)
+    with db_conn() as conn:
+        return row_dicts(conn.execute(q, params))
+
+def cards_count_sql(
+    filter_text: str = "", tag: str = "", tag_mode: str = "all", bucket: str = "", with_notes: bool = False
+) -> Tuple[str, List[Any]]:
+    where, params = cards_filter_sql(filter_text, tag, tag_mode, bucket, with_notes)
+    return f"SELECT COUNT(*) FROM cards c WHERE 1=1 {where};", params
+
+@rerun_cached
+def count_cards(filter_text: str = "", tag: str = "", tag_mode: str = "all", bucket: str = "", with_notes: bool = False) -> int:
+    """Number of cards matching the same filters as fetch_cards_page (no rows materialized)."""
+    q, params = cards_count_sql(filter_text, tag, tag_mode, bucket, with_notes)
+    with db_conn() as conn:
+        n = conn.execute(q, params).fetchone()[0]
+    return int(n or 0)
+
+@rerun_cached
+def fetch_cards_page(
+    filter_text: str = "",
+    tag: str = "",
+    order_by: str = "updated_desc",
+    limit: int = 18,
+    after: Optional[Tuple[Any, int]] = None,
+    tag_mode: str = "all",
+    bucket: str = "",
+    with_notes: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+    """One page of fetch_cards using keyset pagination.
+
+    `after` is the cursor returned with the previous page (None for the first page).
+    `bucket` narrows to a Review list (see bucket_filter_sql); with_notes to cards with an example or notes.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
     """
-    params: List[Any] = []
-    if norm_text(filter_text):
-        q += " AND (c.front LIKE ? OR c.back LIKE ? OR c.example LIKE ? OR c.notes LIKE ?)"
-        like = f"%{norm_text(filter_text)}%"
-        params.extend([like, like, like, like])
-    if norm_text(tag):
-        q += " AND (',' || REPLACE(c.tags,' ', '') || ',') LIKE ?"
-        params.append(f"%,{norm_text(tag).replace(' ', '')},%")
-
-    order_sql = {
-        "updated_desc": "c.updated_at DESC, c.id DESC",
-        "created_desc": "c.created_at DESC, c.id DESC",
-        "due_asc": "date(COALESCE(r.due_date, c.created_at)) ASC, c.id ASC",
-        "front_asc": "LOWER(c.front) ASC, c.id ASC",
-    }.get(norm_word(order_by), "c.updated_at DESC, c.id DESC")
-
-    q += f" ORDER BY {order_sql}"
-    cur.execute(q, params)
-    cols = [d[0] for d in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
-    return rows
-
+    limit = max(1, int(limit))
+    q, params = cards_query_sql(filter_text, tag, order_by, tag_mode, bucket, after, limit + 1, with_notes)
+    with db_conn() as conn:
+        cur = conn.execute(q, params)
+        raw = cur.fetchall()
+        next_cursor = None
+        if len(raw) > limit:
+            raw = raw[:limit]
+            next_cursor = (raw[-1][-1], int(raw[-1][0]))  # (sort_key, id)
+        return row_dicts(cur, raw), next_cursor
+
+
+@rerun_cached
+def search_cards(query: str, limit: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+    """Full-text card search ranked by bm25 (best first). Returns (top `limit` rows, total matches)."""
+    match = fts_query(query)
+    if not match:
+        return [], 0
+    with db_conn() as conn:
+        total = int(conn.execute("SELECT COUNT(*) FROM cards_fts WHERE cards_fts MATCH ?;", (match,)).fetchone()[0] or 0)
+        cur = conn.execute(
+            """
+            SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes, c.created_at, c.updated_at,
+                   r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
+            FROM cards_fts f
+            JOIN cards c ON c.id = f.rowid
+            LEFT JOIN reviews r ON r.card_id = c.id
+            WHERE cards_fts MATCH ?
+            ORDER BY bm25(cards_fts) ASC, c.id DESC
+            LIMIT ?
+            """,
+            (match, max(1, int(limit))),
+        )
+        return row_dicts(cur), total
 
+@rerun_cached
 def fetch_card_by_id(card_id: int) -> Optional[Dict[str, Any]]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes, c.created_at, c.updated_at,
-               r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
-        FROM cards c
-        LEFT JOIN reviews r ON r.card_id = c.id
-        WHERE c.id = ?
-        LIMIT 1
-        """,
-        (card_id,),
-    )
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        return None
-    cols = [d[0] for d in cur.description]
-    conn.close()
-    return dict(zip(cols, row))
+    with db_conn() as conn:
+        cur = conn.execute(
+            """
+            SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes, c.created_at, c.updated_at,
+                   r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
+            FROM cards c
+            LEFT JOIN reviews r ON r.card_id = c.id
+            WHERE c.id = ?
+            LIMIT 1
+            """,
+            (card_id,),
+        )
+        rows = row_dicts(cur, cur.fetchmany(1))
+    return rows[0] if rows else None
+
+CARDS_CREATED_ON_SQL = f"""
+SELECT {CARD_COLUMNS}
+FROM cards c
+LEFT JOIN reviews r ON r.card_id = c.id
+WHERE c.created_at >= ? AND c.created_at < ?
+ORDER BY c.created_at DESC
+"""
 
+@rerun_cached
 def fetch_cards_created_on(d: date) -> List[Dict[str, Any]]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes, c.created_at, c.updated_at,
-               r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
-        FROM cards c
-        LEFT JOIN reviews r ON r.card_id = c.id
-        WHERE substr(c.created_at, 1, 10) = ?
-        ORDER BY c.created_at DESC
-        """,
-        (d.isoformat(),),
-    )
-    cols = [d[0] for d in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with db_conn() as conn:
+        return row_dicts(conn.execute(CARDS_CREATED_ON_SQL, (d.isoformat(), (d + timedelta(days=1)).isoformat())))
+
+DUE_CARDS_SQL = """
+SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes,
+       r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
+FROM cards c
+JOIN reviews r ON r.card_id = c.id
+WHERE r.due_date <= ?
+ORDER BY r.due_date ASC, r.card_id ASC
+"""
+DUE_CARD_IDS_SQL = "SELECT card_id FROM reviews WHERE due_date <= ? AND card_id > ? ORDER BY due_date ASC, card_id ASC;"
 
+@rerun_cached
 def fetch_due_cards(on_date: date) -> List[Dict[str, Any]]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute(
+    with db_conn() as conn:
+        return row_dicts(conn.execute(DUE_CARDS_SQL, (iso_date(on_date),)))
+
+def fetch_due_card_ids(on_date: date, after_id: int = 0) -> List[int]:
+    """Ids of the cards due on on_date, in review order (same order as fetch_due_cards); index-only.
+
+    after_id limits it to cards with a larger id (created after a known max_card_id).
+    """
+    with db_conn() as conn:
+        rows = conn.execute(DUE_CARD_IDS_SQL, (iso_date(on_date), int(after_id))).fetchall()
+    return [int(r[0]) for r in rows]
+
+def max_card_id() -> int:
+    with db_conn() as conn:
+        return int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM cards;").fetchone()[0])
+
+def fetch_cards_by_ids(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Card rows (CARD_COLUMNS) for the given ids, keyed by id; missing ids are absent."""
+    out: Dict[int, Dict[str, Any]] = {}
+    ids = [int(i) for i in ids]
+    with db_conn() as conn:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ", ".join("?" for _ in chunk)
+            cur = conn.execute(
+                f"SELECT {CARD_COLUMNS} FROM cards c LEFT JOIN reviews r ON r.card_id = c.id WHERE c.id IN ({marks});",
+                chunk,
+            )
+            cols = [d[0] for d in cur.description]
+            for row in cur.fetchall():
+                out[int(row[0])] = dict(zip(cols, row))
+    return out
+
+REVIEW_QUALITY_COUNTS_SQL = "SELECT last_quality, COUNT(*) FROM reviews GROUP BY last_quality;"
+DUE_COUNT_SQL = "SELECT COUNT(*) FROM reviews WHERE due_date <= ?;"
+
+@rerun_cached
+def count_due_cards(on_date: date) -> int:
+    """Cards due on or before on_date (a COUNT over idx_reviews_due; no rows loaded)."""
+    with db_conn() as conn:
+        return int(conn.execute(DUE_COUNT_SQL, (iso_date(on_date),)).fetchone()[0])
+
+@rerun_cached
+def review_bucket_counts(on_date: date) -> Dict[str, int]:
+    """Card counts per difficulty_bucket plus "due" (due on or before on_date), without loading cards.
+
+    One GROUP BY over reviews.last_quality (a handful of groups, each mapped through
+    difficulty_bucket); cards without a reviews row count as new.
+    """
+    counts = {"due": 0, "new": 0, "difficult": 0, "meh": 0, "easy": 0}
+    with db_conn() as conn:
+        reviewed = 0
+        for q, n in conn.execute(REVIEW_QUALITY_COUNTS_SQL):
+            counts[difficulty_bucket({"last_quality": q})] += int(n)
+            reviewed += int(n)
+        counts["new"] += int(conn.execute("SELECT COUNT(*) FROM cards;").fetchone()[0]) - reviewed
+    counts["due"] = count_due_cards(on_date)
+    return counts
+
+DUE_FORECAST_SQL = "SELECT due_date, COUNT(*) FROM reviews WHERE due_date < ? GROUP BY due_date;"
+
+@rerun_cached
+def due_forecast(start: date, days: int = 14) -> Dict[str, Any]:
+    """Per-day due counts for [start, start+days) plus an `overdue` bucket (due before start).
+
+    One grouped query regardless of horizon; returns {"overdue": int, "days": [(date, count), ...]}.
+    """
+    days = max(0, int(days))
+    end = start + timedelta(days=days)
+    with db_conn() as conn:
+        cur = conn.execute(DUE_FORECAST_SQL, (iso_date(end),))
+        by_day = {str(d): int(n) for d, n in cur.fetchall() if d}
+    start_s = iso_date(start)
+    overdue = sum(n for d, n in by_day.items() if d < start_s)
+    out = [(start + timedelta(days=i), by_day.get(iso_date(start + timedelta(days=i)), 0)) for i in range(days)]
+    return {"overdue": overdue, "days": out}
+
+ReviewEvent = Tuple[int, str, Optional[int], str, int, int, float]  # review_log column order
+
+def log_review_events(conn: sqlite3.Connection, events: List[ReviewEvent]) -> None:
+    """Append (card_id, ts, quality, due_date, interval_days, repetitions, ease) rows to review_log."""
+    if events:
+        conn.executemany(
+            """
+            INSERT INTO review_log(card_id, ts, quality, due_date, interval_days, repetitions, ease)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            events,
+        )
+
+def update_review_state(card_id: int, due_date: date, interval_days: int, repetitions: int, ease: float, last_quality: Optional[int] = None) -> None:
+    now = datetime.utcnow().isoformat(timespec="seconds")
+    quality = None if last_quality is None else int(last_quality)
+    with db_tx() as conn:
+        conn.execute(
+            """
+            UPDATE reviews
+            SET due_date=?, interval_days=?, repetitions=?, ease=?, last_quality=?, last_reviewed_at=?
+            WHERE card_id=?
+            """,
+            (iso_date(due_date), int(interval_days), int(repetitions), float(ease), quality, now, card_id),
+        )
+        log_review_events(conn, [(int(card_id), now, quality, iso_date(due_date), int(interval_days), int(repetitions), float(ease))])
+
+TAG_COUNTS_SQL = "SELECT tag, COUNT(*) FROM card_tags GROUP BY tag ORDER BY tag;"
+
+def grade_due_card(card_id: int, user_quality: int) -> Optional[Dict[str, Any]]:
+    """Grade one card from the review queue (review-page scale 1..5, SM-2 quality 6 - q).
+
+    The state is re-read inside the write transaction; a card that is no longer due (already
+    graded, e.g. after Back or from another tab) is left alone and None is returned.
+    Otherwise returns the new review fields.
+    """
+    today = today_utc_date()
+    q_user = clamp_int(user_quality, 1, 5)
+    with db_tx() as conn:
+        row = conn.execute(
+            "SELECT due_date, interval_days, repetitions, ease FROM reviews WHERE card_id=?;", (int(card_id),)
+        ).fetchone()
+        if row is None or str(row[0]) > iso_date(today):
+            return None
+        interval, reps, ease = sm2_next({"due_date": row[0], "interval_days": row[1], "repetitions": row[2], "ease": row[3]}, 6 - q_user)
+        next_due = today + timedelta(days=interval)
+        update_review_state(int(card_id), next_due, interval, reps, ease, last_quality=q_user)
+    return {"due_date": iso_date(next_due), "interval_days": interval, "repetitions": reps, "ease": ease, "last_quality": q_user}
+
+@rerun_cached
+def tag_counts() -> List[Tuple[str, int]]:
+    """(tag, number of cards) for every tag, sorted by tag (case-insensitive)."""
+    with db_conn() as conn:
+        rows = conn.execute(TAG_COUNTS_SQL).fetchall()
+    return [(str(t), int(n)) for t, n in rows]
+
+def all_tags() -> List[str]:
+    return [t for t, _ in tag_counts()]
+# =========================
+# PDF blob store (content-addressed files next to the DB)
+# =========================
+def pdf_store_dir() -> str:
+    """Directory holding PDF files, e.g. charlot.sqlite3 -> charlot_pdfs/."""
+    return os.path.splitext(DB_PATH)[0] + "_pdfs"
+
+def pdf_blob_path(sha256: str) -> str:
+    return os.path.join(pdf_store_dir(), sha256[:2], f"{sha256}.pdf")
+
+def pdf_blob_put(data: Any) -> str:
+    """Store bytes (or any buffer) under their SHA-256 and return the hex digest. Idempotent."""
+    sha = hashlib.sha256(data).hexdigest()
+    path = pdf_blob_path(sha)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return sha
+
+@contextmanager
+def pdf_blob_mmap(sha256: str) -> Iterator[mmap.mmap]:
+    """Read-only memory map of a stored PDF (no copy into Python bytes)."""
+    with open(pdf_blob_path(sha256), "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+def pdf_static_link_path(sha256: str) -> str:
+    return os.path.join(APP_STATIC_DIR, "pdf", f"{sha256}.pdf")
+
+def pdf_static_url(sha256: str) -> Optional[str]:
+    """URL of a stored PDF on Streamlit's static route (HTTP Range capable), or None if not servable.
+
+    The blob is exposed by a hard link under static/pdf/. Not a symlink: the static handler
+    resolves real paths and refuses files outside static/. Never a copy either: when the store
+    is on another filesystem the link fails and this returns None, so the caller inlines the
+    PDF instead of duplicating a book of up to STATIC_MAX_BYTES on disk.
+
+    Anyone who can reach the server can read the linked file at /app/static/pdf/<sha256>.pdf
+    without a session; the content hash in the URL is the only handle to it.
+    """
+    try:
+        if not st.get_option("server.enableStaticServing"):
+            return None
+        src = os.path.abspath(pdf_blob_path(sha256))
+        if os.path.getsize(src) > STATIC_MAX_BYTES:
+            return None
+        link = pdf_static_link_path(sha256)
+        if os.path.islink(link):
+            os.remove(link)  # symlink from an older version: never servable
+        if not os.path.exists(link):
+            os.makedirs(os.path.dirname(link), exist_ok=True)
+            tmp = f"{link}.{os.getpid()}.{threading.get_ident()}.tmp"
+            os.link(src, tmp)
+            os.replace(tmp, link)
+    except Exception:
+        return None
+    base = (st.get_option("server.baseUrlPath") or "").strip("/")
+    return "/" + (f"{base}/" if base else "") + f"app/static/pdf/{sha256}.pdf"
+
+def pdf_blob_gc(sha256: str) -> None:
+    """Delete a stored PDF once no book references it.
+
+    While its text ingest is running the delete is deferred; the ingest job runs it when it ends.
+    """
+    if not sha256:
+        return
+    with _PDF_INGEST_LOCK:
+        if sha256 in _PDF_INGEST_INFLIGHT:
+            _PDF_GC_DEFERRED.add(sha256)
+            return
+        _pdf_blob_gc_now(sha256)
+
+def _pdf_blob_gc_now(sha256: str) -> None:
+    with db_conn() as conn:
+        used = conn.execute("SELECT 1 FROM pdf_books WHERE sha256=? LIMIT 1;", (sha256,)).fetchone()
+    if used is None:
+        if fitz is not None:
+            pdf_doc_cache().drop(sha256)
+        with db_tx() as conn:
+            conn.execute("DELETE FROM pdf_pages WHERE sha256=?;", (sha256,))
+            conn.execute("DELETE FROM pdf_text_status WHERE sha256=?;", (sha256,))
+        for path in (pdf_static_link_path(sha256), pdf_blob_path(sha256)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# =========================
+# Notebook PDF helpers
+# =========================
+def pdf_book_upsert(name: str, data: Any) -> int:
+    """Insert a PDF book. If same name exists, replace its data."""
+    name = norm_text(name) or "book.pdf"
+    now = datetime.utcnow().isoformat(timespec="seconds")
+    sha = pdf_blob_put(data)
+    old_sha = ""
+    with db_tx() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, sha256 FROM pdf_books WHERE name=? LIMIT 1;", (name,))
+        row = cur.fetchone()
+        if row:
+            book_id, old_sha = int(row[0]), str(row[1] or "")
+            cur.execute("UPDATE pdf_books SET sha256=?, size=?, uploaded_at=? WHERE id=?;", (sha, len(data), now, book_id))
+        else:
+            cur.execute(
+                "INSERT INTO pdf_books(name, data, sha256, size, uploaded_at) VALUES(?, x'', ?, ?, ?);",
+                (name, sha, len(data), now),
+            )
+            book_id = int(cur.lastrowid)
+    if old_sha and old_sha != sha:
+        pdf_blob_gc(old_sha)
+    pdf_text_ingest_async(sha)
+    return book_id
+
+@rerun_cached
+def pdf_books_list() -> List[Dict[str, Any]]:
+    with db_conn() as conn:
+        cur = conn.execute("SELECT id, name, uploaded_at, sha256, size FROM pdf_books ORDER BY uploaded_at DESC, id DESC;")
+        rows = [
+            {"id": int(r[0]), "name": str(r[1]), "uploaded_at": str(r[2]), "sha256": str(r[3]), "size": int(r[4] or 0)}
+            for r in cur.fetchall()
+        ]
+    return rows
+
+@rerun_cached
+def pdf_book_get(book_id: int) -> Optional[Dict[str, Any]]:
+    """Book metadata; the PDF itself is at `path` (see pdf_blob_mmap) and never loaded here."""
+    with db_conn() as conn:
+        r = conn.execute(
+            "SELECT id, name, uploaded_at, sha256, size FROM pdf_books WHERE id=? LIMIT 1;", (int(book_id),)
+        ).fetchone()
+    if not r:
+        return None
+    sha = str(r[3])
+    return {"id": int(r[0]), "name": str(r[1]), "uploaded_at": str(r[2]), "sha256": sha, "size": int(r[4] or 0), "path": pdf_blob_path(sha)}
+
+def pdf_book_delete(book_id: int) -> None:
+    book = pdf_book_get(book_id)
+    with db_tx() as conn:
+        conn.execute("DELETE FROM pdf_books WHERE id=?;", (int(book_id),))
+    if book:
+        pdf_blob_gc(book["sha256"])
+
+def pdf_vocab_add(book_id: int, word: str, meaning: str, context: str, page: Optional[int]) -> int:
+    now = datetime.utcnow().isoformat(timespec="seconds")
+    with db_tx() as conn:
+        cur = conn.execute(
+            "INSERT INTO pdf_vocab(book_id, word, meaning, context, page, created_at) VALUES(?,?,?,?,?,?);",
+            (int(book_id), norm_text(word), norm_text(meaning), norm_text(context), (None if page is None else int(page)), now),
+        )
+        vid = int(cur.lastrowid)
+    return vid
+
+@rerun_cached
+def pdf_vocab_list(book_id: int, q: str = "") -> List[Dict[str, Any]]:
+    qn = norm_text(q)
+    match = fts_query(qn) if qn else ""
+    params: List[Any] = [int(book_id)]
+    if match:
+        # Ranked full-text search (bm25, best first).
+        sql = """
+        SELECT v.id, v.book_id, v.word, v.meaning, v.context, v.page, v.created_at
+        FROM pdf_vocab_fts f
+        JOIN pdf_vocab v ON v.id = f.rowid
+        WHERE v.book_id=? AND pdf_vocab_fts MATCH ?
+        ORDER BY bm25(pdf_vocab_fts) ASC, v.id DESC
         """
-        SELECT c.id, c.language, c.front, c.back, c.tags, c.example, c.notes,
-               r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality, r.last_reviewed_at
-        FROM cards c
-        JOIN reviews r ON r.card_id = c.id
-        WHERE date(r.due_date) <= date(?)
-        ORDER BY date(r.due_date) ASC, c.id ASC
-        """,
-        (iso_date(on_date),),
-    )
-    cols = [d[0] for d in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
+        params.append(match)
+    else:
+        sql = "SELECT id, book_id, word, meaning, context, page, created_at FROM pdf_vocab WHERE book_id=?"
+        if qn:
+            sql += " AND (word LIKE ? OR meaning LIKE ? OR context LIKE ?)"
+            like = f"%{qn}%"
+            params.extend([like, like, like])
+        sql += " ORDER BY created_at DESC, id DESC"
+    with db_conn() as conn:
+        cur = conn.execute(sql, params)
+        cols = [d[0] for d in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
     return rows
 
-def update_review_state(card_id: int, due_date: date, interval_days: int, repetitions: int, ease: float, last_quality: Optional[int] = None) -> None:
-    conn = db()
-    conn.execute(
-        """
-        UPDATE reviews
-        SET due_date=?, interval_days=?, repetitions=?, ease=?, last_quality=?, last_reviewed_at=?
-        WHERE card_id=?
-        """,
-        (iso_date(due_date), int(interval_days), int(repetitions), float(ease),
-         (None if last_quality is None else int(last_quality)),
-         datetime.utcnow().isoformat(timespec="seconds"), card_id),
-    )
-    conn.commit()
-    conn.close()
+def pdf_vocab_delete(vocab_id: int) -> None:
+    with db_tx() as conn:
+        conn.execute("DELETE FROM pdf_vocab WHERE id=?;", (int(vocab_id),))
+
+PDF_DOC_CACHE_SIZE = 4
+
+class _PdfDoc:
+    """One cached document and the lock serializing its use."""
+
+    __slots__ = ("lock", "doc", "users", "evicted")
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.doc: Any = None
+        self.users = 0
+        self.evicted = False
+
+class PdfDocCache:
+    """Bounded LRU of open PyMuPDF documents keyed by content hash, shared by all sessions.
+
+    A MuPDF document must not be used from two threads at once, so each cached document has
+    its own lock: work on one book never waits behind work on another. Each use is timed per
+    operation ("render", "text", ...) for the Settings page.
+    """
+
+    def __init__(self, max_docs: int = PDF_DOC_CACHE_SIZE) -> None:
+        self.max_docs = max(1, int(max_docs))
+        self._docs: "OrderedDict[str, _PdfDoc]" = OrderedDict()
+        self._lock = threading.Lock()  # guards the LRU and counters only, never held while MuPDF runs
+        self.hits = 0
+        self.opens = 0
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _close(entry: _PdfDoc) -> None:
+        with entry.lock:
+            entry.evicted = True
+            if entry.users == 0 and entry.doc is not None:
+                entry.doc.close()
+                entry.doc = None
+
+    @contextmanager
+    def document(self, sha256: str, op: str) -> Iterator[Any]:
+        t0 = time.perf_counter()
+        evicted: List[_PdfDoc] = []
+        with self._lock:
+            entry = self._docs.get(sha256)
+            if entry is None:
+                entry = self._docs[sha256] = _PdfDoc()
+                while len(self._docs) > self.max_docs:
+                    evicted.append(self._docs.popitem(last=False)[1])
+            else:
+                self._docs.move_to_end(sha256)
+        for old in evicted:
+            self._close(old)
+        with entry.lock:
+            opened = entry.doc is None
+            if opened:
+                entry.doc = fitz.open(pdf_blob_path(sha256), filetype="pdf")
+            entry.users += 1
+            try:
+                yield entry.doc
+            finally:
+                entry.users -= 1
+                if entry.evicted and entry.users == 0:  # dropped from the LRU while in use
+                    entry.doc.close()
+                    entry.doc = None
+                ms = (time.perf_counter() - t0) * 1000.0
+                with self._lock:
+                    if opened:
+                        self.opens += 1
+                    else:
+                        self.hits += 1
+                    t = self.timings.setdefault(op, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+                    t["count"] += 1
+                    t["total_ms"] += ms
+                    t["max_ms"] = max(t["max_ms"], ms)
+                    t["last_ms"] = ms
+
+    def drop(self, sha256: str) -> None:
+        with self._lock:
+            entry = self._docs.pop(sha256, None)
+        if entry is not None:
+            self._close(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"open_docs": len(self._docs), "hits": self.hits, "opens": self.opens,
+                    "timings": {k: dict(v) for k, v in self.timings.items()}}
+
+@st.cache_resource(show_spinner=False)
+def pdf_doc_cache() -> PdfDocCache:
+    return PdfDocCache()
+
+def _render_pdf_page_png(sha256: str, page: int, zoom: int) -> bytes:
+    p = max(1, int(page)) - 1
+    z = max(50, min(300, int(zoom))) / 100.0
+    with pdf_doc_cache().document(sha256, "render") as doc:
+        p = min(p, max(0, doc.page_count - 1))
+        pg = doc.load_page(p)
+        pix = pg.get_pixmap(matrix=fitz.Matrix(z, z), alpha=False)
+        return pix.tobytes("png")
+
+def clean_pdf_text(txt: str) -> str:
+    return re.sub(r"\n{3,}", "\n\n", txt or "").strip()
+
+def _extract_pdf_page_text(sha256: str, page: int) -> str:
+    stored = pdf_page_text_get(sha256, page)
+    if stored is not None:
+        return stored
+    p = max(1, int(page)) - 1
+    with pdf_doc_cache().document(sha256, "text") as doc:
+        p = min(p, max(0, doc.page_count - 1))
+        pg = doc.load_page(p)
+        txt = pg.get_text("text") or ""
+    return clean_pdf_text(txt)
+
+PDF_PREFETCH_WORKERS = 2
+PDF_PREFETCH_RADIUS = 2
+PDF_PREFETCH_KEEP = 48
+PDF_PREFETCH_READERS = 16  # sessions whose current book is remembered
+
+class PdfPrefetcher:
+    """Renders / extracts pages around the one being read on a small background thread pool.
+
+    Results wait in a bounded store until the foreground asks for them (see `get_or_compute`).
+    Each reader (one per session) has a current book; when a reader switches books, work queued
+    for books nobody is reading any more is cancelled. Workers only call PyMuPDF helpers, never
+    Streamlit APIs.
+    """
+
+    def __init__(self, workers: int = PDF_PREFETCH_WORKERS, keep: int = PDF_PREFETCH_KEEP) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="pdf-prefetch")
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[Any, ...], Future] = {}
+        self._done: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self._keep = max(1, int(keep))
+        self._readers: "OrderedDict[str, str]" = OrderedDict()  # reader -> sha256 being read
+        self.served = 0
+        self.cancelled = 0
+
+    def _active(self) -> set:
+        return set(self._readers.values())
+
+    def _run(self, key: Tuple[Any, ...], fn: Any, *args: Any) -> None:
+        try:
+            with self._lock:
+                if key[1] not in self._active():
+                    return  # every reader moved on while this was queued
+            value = fn(*args)
+            with self._lock:
+                self._done[key] = value
+                while len(self._done) > self._keep:
+                    self._done.popitem(last=False)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def schedule(self, reader: str, sha256: str, page: int, zoom: int, page_count: int, render: bool = True) -> None:
+        """Queue pages page±1..±PDF_PREFETCH_RADIUS (nearest first) of the book `reader` is on."""
+        with self._lock:
+            if self._readers.get(reader) != sha256:
+                self._readers[reader] = sha256
+                while len(self._readers) > PDF_PREFETCH_READERS:
+                    self._readers.popitem(last=False)
+                active = self._active()
+                for key, fut in list(self._pending.items()):
+                    if key[1] not in active and fut.cancel():
+                        self._pending.pop(key, None)
+                        self.cancelled += 1
+                for key in [k for k in self._done if k[1] not in active]:
+                    del self._done[key]
+            self._readers.move_to_end(reader)
+            pages = []
+            for d in range(1, PDF_PREFETCH_RADIUS + 1):
+                pages.extend([page + d, page - d])
+            for p in [p for p in pages if 1 <= p <= int(page_count)]:
+                jobs = [(("text", sha256, p), _extract_pdf_page_text, (sha256, p))]
+                if render:
+                    jobs.insert(0, (("png", sha256, p, int(zoom)), _render_pdf_page_png, (sha256, p, int(zoom))))
+                for key, fn, args in jobs:
+                    if key in self._done or key in self._pending:
+                        continue
+                    self._pending[key] = self._pool.submit(self._run, key, fn, *args)
+
+    def get_or_compute(self, key: Tuple[Any, ...], fn: Any, *args: Any) -> Any:
+        """Prefetched value for `key` if ready, the in-flight result if a worker is on it, else compute it now.
+
+        A job still waiting in the queue is cancelled rather than waited for, so the page on screen
+        never queues behind other prefetches.
+        """
+        with self._lock:
+            if key in self._done:
+                self.served += 1
+                return self._done.pop(key)
+            fut = self._pending.get(key)
+            if fut is not None and fut.cancel():
+                self._pending.pop(key, None)
+                fut = None
+        if fut is not None and not fut.cancelled():
+            fut.result()
+            with self._lock:
+                if key in self._done:
+                    self.served += 1
+                    return self._done.pop(key)
+        return fn(*args)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": len(self._pending), "ready": len(self._done), "served": self.served,
+                    "cancelled": self.cancelled, "readers": len(self._readers)}
+
+@st.cache_resource(show_spinner=False)
+def pdf_prefetcher() -> PdfPrefetcher:
+    return PdfPrefetcher()
+
+# =========================
+# Whole-book text index
+# =========================
+PDF_INGEST_BATCH = 50               # pages per extraction task / DB write
+PDF_INGEST_PROCESS_MIN_PAGES = 150  # books at least this long are extracted in a process pool
+PDF_INGEST_PROCESSES = 4
+
+def _extract_pdf_text_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Process-pool worker: [(1-based page, text)] for 0-based pages [start, stop)."""
+    doc = fitz.open(path, filetype="pdf")
+    try:
+        return [(i + 1, clean_pdf_text(doc.load_page(i).get_text("text") or "")) for i in range(start, stop)]
+    finally:
+        doc.close()
+
+def _iter_pdf_text_batches(sha256: str, ranges: List[Tuple[int, int]]) -> Iterator[List[Tuple[int, str]]]:
+    """One [(page, text)] batch per 0-based page range, in order.
+
+    Long books are extracted in a process pool. If the pool cannot start or breaks part-way,
+    only the ranges it has not delivered yet are read from the shared document instead.
+    """
+    todo = list(ranges)
+    if sum(b - a for a, b in todo) >= PDF_INGEST_PROCESS_MIN_PAGES:
+        try:
+            # spawn, not fork: a forked child of the threaded server can inherit locks held by other threads.
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(PDF_INGEST_PROCESSES, os.cpu_count() or 1), mp_context=ctx) as ex:
+                futures = [ex.submit(_extract_pdf_text_range, pdf_blob_path(sha256), a, b) for a, b in todo]
+                for fut in futures:
+                    batch = fut.result()
+                    todo.pop(0)
+                    yield batch
+        except Exception:
+            pass  # pool unavailable or broken: finish the remaining ranges below
+    for a, b in todo:
+        with pdf_doc_cache().document(sha256, "ingest") as doc:
+            yield [(i + 1, clean_pdf_text(doc.load_page(i).get_text("text") or "")) for i in range(a, b)]
+
+def pdf_text_ingest(sha256: str) -> None:
+    """Extract every page of a stored PDF into pdf_pages (FTS-indexed). No-op once done.
 
-def all_tags() -> List[str]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT tags FROM cards")
-    raw = [r[0] for r in cur.fetchall()]
-    conn.close()
-    tags = set()
-    for t in raw:
-        for part in (t or "").split(","):
-            part = part.strip()
-            if part:
-                tags.add(part)
-    return sorted(tags)
-# =========================
-# Notebook PDF helpers
-# =========================
-def pdf_book_upsert(name: str, data: bytes) -> int:
-    """Insert a PDF book. If same name exists, replace its data."""
-    name = norm_text(name) or "book.pdf"
+    Pages already stored (by an earlier run that failed or was interrupted) are kept; only
+    batches with missing pages are extracted again.
+    """
+    status = pdf_text_status(sha256)
+    if status and status["status"] == "done":
+        return
+    page_count = _pdf_page_count(sha256)
+    with db_conn() as conn:
+        have = {int(r[0]) for r in conn.execute("SELECT page FROM pdf_pages WHERE sha256=?;", (sha256,))}
+    ranges = [(a, min(page_count, a + PDF_INGEST_BATCH)) for a in range(0, page_count, PDF_INGEST_BATCH)]
+    ranges = [(a, b) for a, b in ranges if any(p not in have for p in range(a + 1, b + 1))]
+    done = sum(1 for p in have if 1 <= p <= page_count)
     now = datetime.utcnow().isoformat(timespec="seconds")
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM pdf_books WHERE name=? LIMIT 1;", (name,))
-    row = cur.fetchone()
-    if row:
-        book_id = int(row[0])
-        cur.execute("UPDATE pdf_books SET data=?, uploaded_at=? WHERE id=?;", (sqlite3.Binary(data), now, book_id))
-    else:
-        cur.execute("INSERT INTO pdf_books(name, data, uploaded_at) VALUES(?,?,?);", (name, sqlite3.Binary(data), now))
-        book_id = int(cur.lastrowid)
-    conn.commit()
-    conn.close()
-    return book_id
+    with db_tx() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pdf_text_status(sha256, page_count, pages_done, status, updated_at) VALUES(?, ?, ?, 'running', ?);",
+            (sha256, page_count, done, now),
+        )
+    try:
+        for batch in _iter_pdf_text_batches(sha256, ranges):
+            with db_tx() as conn:
+                # OR IGNORE: pages kept from an earlier run stay as they are (and stay indexed once).
+                done += conn.executemany(
+                    "INSERT OR IGNORE INTO pdf_pages(sha256, page, text) VALUES(?, ?, ?);",
+                    [(sha256, p, t) for p, t in batch],
+                ).rowcount
+                conn.execute("UPDATE pdf_text_status SET pages_done=?, updated_at=? WHERE sha256=?;",
+                             (done, datetime.utcnow().isoformat(timespec="seconds"), sha256))
+        final = "done"
+    except Exception:
+        final = "error"
+    with db_tx() as conn:
+        conn.execute("UPDATE pdf_text_status SET status=?, updated_at=? WHERE sha256=?;",
+                     (final, datetime.utcnow().isoformat(timespec="seconds"), sha256))
+
+_PDF_INGEST_INFLIGHT: set = set()
+_PDF_GC_DEFERRED: set = set()  # blobs orphaned while their ingest was running
+_PDF_INGEST_LOCK = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def pdf_ingest_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-ingest")
+
+def pdf_text_ingest_async(sha256: str) -> None:
+    """Queue pdf_text_ingest on the background pool (once per hash at a time)."""
+    if fitz is None or not sha256:
+        return
+    with _PDF_INGEST_LOCK:
+        if sha256 in _PDF_INGEST_INFLIGHT:
+            return
+        _PDF_INGEST_INFLIGHT.add(sha256)
 
-def pdf_books_list() -> List[Dict[str, Any]]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, uploaded_at FROM pdf_books ORDER BY uploaded_at DESC, id DESC;")
-    rows = [{"id": int(r[0]), "name": str(r[1]), "uploaded_at": str(r[2])} for r in cur.fetchall()]
-    conn.close()
-    return rows
+    def _job() -> None:
+        try:
+            pdf_text_ingest(sha256)
+        finally:
+            with _PDF_INGEST_LOCK:
+                _PDF_INGEST_INFLIGHT.discard(sha256)
+                deferred = sha256 in _PDF_GC_DEFERRED
+                _PDF_GC_DEFERRED.discard(sha256)
+            if deferred:
+                pdf_blob_gc(sha256)
 
-def pdf_book_get(book_id: int) -> Optional[Dict[str, Any]]:
-    conn = db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, data, uploaded_at FROM pdf_books WHERE id=? LIMIT 1;", (int(book_id),))
-    r = cur.fetchone()
-    conn.close()
-    if not r:
-        return None
-    return {"id": int(r[0]), "name": str(r[1]), "data": bytes(r[2]), "uploaded_at": str(r[3])}
+    pdf_ingest_pool().submit(_job)
 
-def pdf_book_delete(book_id: int) -> None:
-    conn = db()
-    conn.execute("DELETE FROM pdf_books WHERE id=?;", (int(book_id),))
-    conn.commit()
-    conn.close()
+def pdf_text_ingest_wanted(sha256: str, status: Optional[Dict[str, Any]]) -> bool:
+    """True if the book should be (re)queued automatically: never indexed, or left "running" by a dead job.
 
-def pdf_vocab_add(book_id: int, word: str, meaning: str, context: str, page: Optional[int]) -> int:
-    now = datetime.utcnow().isoformat(timespec="seconds")
-    conn = db()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO pdf_vocab(book_id, word, meaning, context, page, created_at) VALUES(?,?,?,?,?,?);",
-        (int(book_id), norm_text(word), norm_text(meaning), norm_text(context), (None if page is None else int(page)), now),
-    )
-    vid = int(cur.lastrowid)
-    conn.commit()
-    conn.close()
-    return vid
+    A failed ingest ("error") is only retried on request, so one bad file doesn't fail again on every rerun.
+    """
+    if status is None:
+        return True
+    if status["status"] != "running":
+        return False
+    with _PDF_INGEST_LOCK:
+        return sha256 not in _PDF_INGEST_INFLIGHT
+
+def pdf_text_status(sha256: str) -> Optional[Dict[str, Any]]:
+    with db_conn() as conn:
+        r = conn.execute(
+            "SELECT page_count, pages_done, status FROM pdf_text_status WHERE sha256=?;", (sha256,)
+        ).fetchone()
+    if not r:
+        return None
+    return {"page_count": int(r[0]), "pages_done": int(r[1]), "status": str(r[2])}
+
+def pdf_page_text_get(sha256: str, page: int) -> Optional[str]:
+    """Stored text of one page, or None if the book has not been ingested that far."""
+    with db_conn() as conn:
+        r = conn.execute("SELECT text FROM pdf_pages WHERE sha256=? AND page=?;", (sha256, int(page))).fetchone()
+    return None if r is None else str(r[0])
+
+@rerun_cached
+def pdf_book_search(sha256: str, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Pages of one book matching `query`, best (bm25) first, with a short highlighted snippet."""
+    match = fts_query(query)
+    if not match:
+        return []
+    with db_conn() as conn:
+        cur = conn.execute(
+            """
+            SELECT p.page, snippet(pdf_pages_fts, 0, '**', '**', '…', 12)
+            FROM pdf_pages_fts
+            JOIN pdf_pages p ON p.id = pdf_pages_fts.rowid
+            WHERE pdf_pages_fts MATCH ? AND p.sha256 = ?
+            ORDER BY bm25(pdf_pages_fts) ASC, p.page ASC
+            LIMIT ?
+            """,
+            (match, sha256, max(1, int(limit))),
+        )
+        return [{"page": int(r[0]), "snippet": str(r[1])} for r in cur.fetchall()]
 
-def pdf_vocab_list(book_id: int, q: str = "") -> List[Dict[str, Any]]:
-    conn = db()
-    cur = conn.cursor()
-    qn = norm_text(q)
-    sql = "SELECT id, book_id, word, meaning, context, page, created_at FROM pdf_vocab WHERE book_id=?"
-    params: List[Any] = [int(book_id)]
-    if qn:
-        sql += " AND (word LIKE ? OR meaning LIKE ? OR context LIKE ?)"
-        like = f"%{qn}%"
-        params.extend([like, like, like])
-    sql += " ORDER BY created_at DESC, id DESC"
-    cur.execute(sql, params)
-    cols = [d[0] for d in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
-    return rows
+def _pdf_page_count(sha256: str) -> int:
+    with pdf_doc_cache().document(sha256, "open") as doc:
+        return int(doc.page_count)
 
-def pdf_vocab_delete(vocab_id: int) -> None:
-    conn = db()
-    conn.execute("DELETE FROM pdf_vocab WHERE id=?;", (int(vocab_id),))
-    conn.commit()
-    conn.close()
+@st.cache_data(show_spinner=False)
+def pdf_page_count(sha256: str) -> int:
+    if fitz is None:
+        return 0
+    return _pdf_page_count(sha256)
 
 @st.cache_data(show_spinner=False)
-def render_pdf_page_png(pdf_bytes: bytes, page: int, zoom: int) -> bytes:
-    """Render a PDF page to PNG bytes (server-side) using PyMuPDF."""
+def render_pdf_page_png(sha256: str, page: int, zoom: int) -> bytes:
+    """Render a page of a stored PDF (by content hash) to PNG bytes using PyMuPDF."""
     if fitz is None:
         return b""
-    p = max(1, int(page)) - 1
-    z = max(50, min(300, int(zoom))) / 100.0
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    try:
-        p = min(p, max(0, doc.page_count - 1))
-        pg = doc.load_page(p)
-        pix = pg.get_pixmap(matrix=fitz.Matrix(z, z), alpha=False)
-        return pix.tobytes("png")
-    finally:
-        doc.close()
+    return pdf_prefetcher().get_or_compute(("png", sha256, int(page), int(zoom)), _render_pdf_page_png, sha256, page, zoom)
 
 @st.cache_data(show_spinner=False)
-def extract_pdf_page_text(pdf_bytes: bytes, page: int) -> str:
-    """Extract selectable text from one PDF page using PyMuPDF."""
+def extract_pdf_page_text(sha256: str, page: int) -> str:
+    """Extract selectable text from one page of a stored PDF (by content hash) using PyMuPDF."""
     if fitz is None:
         return ""
-    p = max(1, int(page)) - 1
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    return pdf_prefetcher().get_or_compute(("text", sha256, int(page)), _extract_pdf_page_text, sha256, page)
+
+
+# =========================
+# HTTP client (shared pooled session for every outbound call)
+# =========================
+HTTP_POOL_HOSTS = 10          # hosts with a kept-alive pool
+HTTP_POOL_PER_HOST = 8        # max concurrent connections per host (callers wait beyond that)
+HTTP_RETRIES = 2              # extra attempts after a connection error / timeout / retryable status
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_BACKOFF = 0.3            # first retry waits 0.3s (+ up to 0.3s jitter), doubling each time
+HTTP_RETRY_AFTER_MAX = 5.0    # longest Retry-After we sleep through inside one call
+HTTP_MIN_ATTEMPT = 0.5        # never start an attempt with less time than this left before the deadline
+HTTP_BREAKER_FAILURES = 5     # consecutive failures that open a backend's circuit
+HTTP_BREAKER_COOLDOWN = 30.0  # seconds an open circuit rejects calls before a trial call
+
+class HttpCircuitOpen(requests.ConnectionError):
+    """Raised instead of calling a backend whose circuit is open."""
+
+class HttpDeadlineExceeded(requests.Timeout):
+    """Raised instead of starting an attempt the caller's deadline leaves no time for."""
+
+_HTTP_DEADLINE = threading.local()
+
+@contextmanager
+def http_deadline(at: Optional[float]) -> Iterator[None]:
+    """Cap every HttpClient call made by this thread in the block at time.monotonic() `at`.
+
+    Attempt timeouts shrink to the time left and no retry starts that could not finish by then.
+    """
+    prev = getattr(_HTTP_DEADLINE, "at", None)
+    _HTTP_DEADLINE.at = at if prev is None or at is None else min(prev, at)
     try:
-        p = min(p, max(0, doc.page_count - 1))
-        pg = doc.load_page(p)
-        txt = pg.get_text("text") or ""
-        txt = re.sub(r"\n{3,}", "\n\n", txt).strip()
-        return txt
+        yield
     finally:
-        doc.close()
+        _HTTP_DEADLINE.at = prev
+
+class CircuitBreaker:
+    """Per-backend breaker: open after N consecutive failures (or a long 429), half-open after a cooldown."""
+
+    def __init__(self, failures: int = HTTP_BREAKER_FAILURES, cooldown: float = HTTP_BREAKER_COOLDOWN) -> None:
+        self.max_failures = max(1, int(failures))
+        self.cooldown = float(cooldown)
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.open_until == 0.0:
+                return True
+            if time.monotonic() < self.open_until or self._trial:
+                return False
+            self._trial = True  # half-open: let one call through
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._trial = False
+
+    def failure(self, open_for: Optional[float] = None) -> None:
+        with self._lock:
+            self.failures += 1
+            if open_for is not None or self._trial or self.failures >= self.max_failures:
+                self.open_until = time.monotonic() + (self.cooldown if open_for is None else float(open_for))
+                self.trips += 1
+            self._trial = False
+
+    def release(self) -> None:
+        """End a call that says nothing about the backend (e.g. cut short by the caller's deadline)."""
+        with self._lock:
+            self._trial = False
+
+    def state(self) -> str:
+        with self._lock:
+            if self.open_until == 0.0:
+                return "closed"
+            return "open" if time.monotonic() < self.open_until else "half-open"
+
+class HttpClient:
+    """One requests.Session (keep-alive, per-host pool limit, retries with jittered backoff) for all backends.
+
+    Each call names its backend, which has its own circuit breaker and timing counters.
+    Retries run here rather than in urllib3 so they can respect the caller's http_deadline.
+    """
+
+    def __init__(self) -> None:
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_PER_HOST, pool_block=True, max_retries=0)
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def breaker(self, backend: str) -> CircuitBreaker:
+        with self._lock:
+            return self._breakers.setdefault(backend, CircuitBreaker())
+
+    def _record(self, backend: str, ms: float, outcome: str) -> None:
+        with self._lock:
+            t = self.timings.setdefault(
+                backend, {"count": 0, "ok": 0, "errors": 0, "throttled": 0, "rejected": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            t[outcome] += 1
+            if outcome != "rejected":
+                t["count"] += 1
+                t["total_ms"] += ms
+                t["max_ms"] = max(t["max_ms"], ms)
+
+    def _get_with_retries(self, url: str, timeout: float, **kwargs: Any) -> requests.Response:
+        deadline = getattr(_HTTP_DEADLINE, "at", None)
+        attempt = 0
+        while True:
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left < HTTP_MIN_ATTEMPT:
+                raise HttpDeadlineExceeded(f"No time left for {url}")
+            try:
+                r = self.session.get(url, timeout=timeout if left is None else min(timeout, left), **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= HTTP_RETRIES:
+                    raise
+                r = None
+            if r is not None and (r.status_code not in HTTP_RETRY_STATUSES or attempt >= HTTP_RETRIES):
+                return r
+            pause = HTTP_BACKOFF * (2 ** attempt) + random.uniform(0.0, HTTP_BACKOFF)
+            if r is not None:
+                try:
+                    pause = min(float(r.headers.get("Retry-After", "")), HTTP_RETRY_AFTER_MAX)
+                except ValueError:
+                    pass
+            if deadline is not None and deadline - time.monotonic() - pause < HTTP_MIN_ATTEMPT:
+                if r is None:
+                    raise HttpDeadlineExceeded(f"No time left to retry {url}")
+                return r  # no time for another try: report the last answer
+            if r is not None:
+                r.close()
+            time.sleep(pause)
+            attempt += 1
+
+    def get(self, backend: str, url: str, timeout: float = 10.0, **kwargs: Any) -> requests.Response:
+        breaker = self.breaker(backend)
+        if not breaker.allow():
+            self._record(backend, 0.0, "rejected")
+            raise HttpCircuitOpen(f"{backend} is unavailable (circuit open)")
+        t0 = time.perf_counter()
+        try:
+            r = self._get_with_retries(url, float(timeout), **kwargs)
+        except HttpDeadlineExceeded:
+            breaker.release()
+            self._record(backend, (time.perf_counter() - t0) * 1000.0, "errors")
+            raise
+        except requests.RequestException:
+            breaker.failure()
+            self._record(backend, (time.perf_counter() - t0) * 1000.0, "errors")
+            raise
+        ms = (time.perf_counter() - t0) * 1000.0
+        if r.status_code == 429:
+            # Still throttled after retries: back off for as long as the server asks (at least the cooldown).
+            try:
+                after = float(r.headers.get("Retry-After", ""))
+            except ValueError:
+                after = 0.0
+            breaker.failure(open_for=max(HTTP_BREAKER_COOLDOWN, after))
+            self._record(backend, ms, "throttled")
+        elif r.status_code >= 500:
+            breaker.failure()
+            self._record(backend, ms, "errors")
+        else:
+            breaker.success()
+            self._record(backend, ms, "ok")
+        return r
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {k: dict(v) for k, v in self.timings.items()}
+            breakers = dict(self._breakers)
+        for name, b in breakers.items():
+            out.setdefault(name, {"count": 0, "ok": 0, "errors": 0, "throttled": 0, "rejected": 0, "total_ms": 0.0, "max_ms": 0.0})
+            out[name].update(state=b.state(), trips=b.trips)
+        return out
 
+@st.cache_resource(show_spinner=False)
+def http_client() -> HttpClient:
+    return HttpClient()
 
-@st.cache_data(show_spinner=False)
+# =========================
+# Lookup cache (dictionary / translation backends)
+# =========================
+LOOKUP_TTL_HIT = 30 * 86400       # successful lookups
+LOOKUP_TTL_MISS = 86400           # definite misses (404 / not found); transient errors are not cached
+LOOKUP_CACHE_MAX_ROWS = 50000
+LOOKUP_PRUNE_EVERY = 500          # stores between size checks
+LOOKUP_TOUCH_AFTER = 3600         # refresh last_hit_at (LRU order) at most this often per entry
+LOOKUP_CACHE_STATS = {"hits": 0, "negative_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_LOOKUP_STATS_LOCK = threading.Lock()
+
+def _lookup_stat(name: str, n: int = 1) -> None:
+    with _LOOKUP_STATS_LOCK:
+        LOOKUP_CACHE_STATS[name] += n
+
+def lookup_key(text: str) -> str:
+    """Cache key for a looked-up word/text: NFC, trimmed, inner whitespace collapsed (case kept)."""
+    return unicodedata.normalize("NFC", " ".join((text or "").split()))
+
+def lookup_cache_get(backend: str, lang: str, key: str) -> Optional[Tuple[bool, Any]]:
+    """(ok, value) of a live entry, or None if absent / expired."""
+    now = time.time()
+    with db_conn() as conn:
+        row = conn.execute(
+            "SELECT ok, value, expires_at, last_hit_at FROM lookup_cache WHERE backend=? AND lang=? AND key=?;",
+            (backend, lang, key),
+        ).fetchone()
+    if row is None or float(row[2]) <= now:
+        return None
+    if now - float(row[3]) > LOOKUP_TOUCH_AFTER:
+        with db_tx() as conn:
+            conn.execute(
+                "UPDATE lookup_cache SET last_hit_at=? WHERE backend=? AND lang=? AND key=?;",
+                (now, backend, lang, key),
+            )
+    return bool(row[0]), json.loads(row[1])
+
+def lookup_cache_put(backend: str, lang: str, key: str, value: Any, ok: bool) -> None:
+    now = time.time()
+    with db_tx() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO lookup_cache(backend, lang, key, ok, value, created_at, expires_at, last_hit_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (backend, lang, key, int(ok), json.dumps(value, ensure_ascii=False), now,
+             now + (LOOKUP_TTL_HIT if ok else LOOKUP_TTL_MISS), now),
+        )
+    with _LOOKUP_STATS_LOCK:
+        LOOKUP_CACHE_STATS["stores"] += 1
+        due_prune = LOOKUP_CACHE_STATS["stores"] % LOOKUP_PRUNE_EVERY == 0
+    if due_prune:
+        lookup_cache_prune()
+
+LOOKUP_CACHE_LRU_SQL = "SELECT rowid FROM lookup_cache ORDER BY last_hit_at ASC LIMIT ?"
+
+def lookup_cache_prune(max_rows: int = LOOKUP_CACHE_MAX_ROWS) -> int:
+    """Drop expired entries, then the least recently hit ones beyond max_rows. Returns rows removed."""
+    with db_tx() as conn:
+        n = conn.execute("DELETE FROM lookup_cache WHERE expires_at <= ?;", (time.time(),)).rowcount
+        extra = int(conn.execute("SELECT COUNT(*) FROM lookup_cache;").fetchone()[0]) - int(max_rows)
+        if extra > 0:
+            n += conn.execute(f"DELETE FROM lookup_cache WHERE rowid IN ({LOOKUP_CACHE_LRU_SQL});", (extra,)).rowcount
+    _lookup_stat("evictions", max(0, n))
+    return n
+
+def lookup_cache_clear() -> None:
+    with db_tx() as conn:
+        conn.execute("DELETE FROM lookup_cache;")
+
+def lookup_cache_stats() -> Dict[str, Any]:
+    with db_conn() as conn:
+        rows, negative = conn.execute("SELECT COUNT(*), COALESCE(SUM(ok = 0), 0) FROM lookup_cache;").fetchone()
+    with _LOOKUP_STATS_LOCK:
+        out: Dict[str, Any] = dict(LOOKUP_CACHE_STATS)
+    served = out["hits"] + out["negative_hits"]
+    out.update(rows=int(rows), negative_rows=int(negative), hit_rate=served / max(1, served + out["misses"]))
+    return out
+
+def lookup_cached(backend: str, key_fn: Callable[..., Tuple[str, str]], outcome_fn: Callable[[Any], Optional[bool]]):
+    """Cache a backend call in lookup_cache, keyed by (backend, *key_fn(*args)) -> (lang, key).
+
+    outcome_fn(result) says how to cache a fresh result: True (hit, LOOKUP_TTL_HIT),
+    False (definite miss, LOOKUP_TTL_MISS) or None (transient failure: not cached).
+    Tuple results come back as tuples. Cache errors never break the lookup itself.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            lang, key = key_fn(*args, **kwargs)
+            if not key:
+                return fn(*args, **kwargs)
+            try:
+                cached = lookup_cache_get(backend, lang, key)
+            except sqlite3.Error:
+                cached = None
+            if cached is not None:
+                ok, stored = cached
+                _lookup_stat("hits" if ok else "negative_hits")
+                return tuple(stored["v"]) if stored["tuple"] else stored["v"]
+            _lookup_stat("misses")
+            result = fn(*args, **kwargs)
+            outcome = outcome_fn(result)
+            if outcome is not None:
+                try:
+                    lookup_cache_put(backend, lang, key, {"tuple": isinstance(result, tuple), "v": result}, bool(outcome))
+                except sqlite3.Error:
+                    pass
+            return result
+        return wrapper
+    return deco
+
+def _word_key(lang: str, word: str) -> Tuple[str, str]:
+    """Dictionary lookups are case-insensitive: "Maison" and "maison" share one entry."""
+    return norm_word(lang), norm_word(lookup_key(word))
+
+def _wiki_outcome(result: Tuple[bool, Dict[str, Any]]) -> Optional[bool]:
+    ok, data = result
+    if ok:
+        return True
+    return False if data.get("error") in ("HTTP 404", "Not found", "Empty extract") else None
+
+@lookup_cached(
+    "google_translate",
+    lambda text, source_lang="fr", target_lang="en": (f"{norm_word(source_lang) or 'auto'}>{norm_word(target_lang) or 'en'}", lookup_key(text)),
+    lambda out: True if out else None,
+)
 def google_translate(text: str, source_lang: str = "fr", target_lang: str = "en") -> str:
     """Translate text using a lightweight Google Translate endpoint.
 
@@ -1099,7 +3080,8 @@ def google_translate(text: str, source_lang: str = "fr", target_lang: str = "en"
     sl = norm_word(source_lang) or "auto"
     tl = norm_word(target_lang) or "en"
     try:
-        r = requests.get(
+        r = http_client().get(
+            "google_translate",
             "https://translate.googleapis.com/translate_a/single",
             params={
                 "client": "gtx",
@@ -1108,7 +3090,6 @@ def google_translate(text: str, source_lang: str = "fr", target_lang: str = "en"
                 "dt": "t",
                 "q": text,
             },
-            headers=HTTP_HEADERS,
             timeout=10,
         )
         if r.status_code != 200:
@@ -1152,8 +3133,178 @@ def sm2_next(review: Dict[str, Any], quality: int) -> Tuple[int, int, float]:
     ease = max(1.3, ease)
     return interval, reps, ease
 
+def sm2_next_batch(repetitions: Any, interval_days: Any, ease: Any, quality: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized sm2_next over equal-length arrays; returns (interval, repetitions, ease) arrays.
+
+    Same float64 operations in the same order (np.rint rounds half to even like round()),
+    so every element matches sm2_next exactly.
+    """
+    q = np.clip(np.asarray(quality, dtype=np.int64), 0, 5)
+    reps = np.asarray(repetitions, dtype=np.int64)
+    interval = np.asarray(interval_days, dtype=np.int64)
+    e = np.asarray(ease, dtype=np.float64)
+    e = np.where(e == 0, 2.5, e)  # sm2_next reads a falsy ease as the default
+
+    passed = q >= 3
+    new_reps = np.where(passed, reps + 1, 0)
+    grown = np.where(interval > 0, np.rint(interval * e), np.rint(6 * e)).astype(np.int64)
+    new_interval = np.where(~passed | (new_reps == 1), 1, np.where(new_reps == 2, 6, grown))
+    d = (5 - q).astype(np.float64)
+    new_ease = np.maximum(1.3, e + (0.1 - d * (0.08 + d * 0.02)))
+    return new_interval, new_reps, new_ease
+
+def grade_cards(card_ids: List[int], qualities: List[int], reviewed_at: Optional[List[str]] = None) -> int:
+    """Apply many grades at once and write the resulting review states in one transaction.
+
+    qualities use the review page's scale (1 = very easy .. 5 = very difficult), stored as
+    last_quality and fed to SM-2 as 6 - q. reviewed_at (ISO timestamps, default now) sets
+    last_reviewed_at and the day the new interval counts from. A card graded several times
+    is advanced once per grade, in list order. Returns the number of grades applied
+    (grades for cards without a reviews row are ignored).
+    """
+    if len(card_ids) != len(qualities) or (reviewed_at is not None and len(reviewed_at) != len(card_ids)):
+        raise ValueError("card_ids, qualities and reviewed_at must have the same length")
+    if not card_ids:
+        return 0
+    now = datetime.utcnow().isoformat(timespec="seconds")
+    stamps = list(reviewed_at) if reviewed_at is not None else [now] * len(card_ids)
+    user_q = np.clip(np.asarray(qualities, dtype=np.int64), 1, 5)
+
+    with db_tx() as conn:
+        uniq = sorted(set(int(c) for c in card_ids))
+        state: Dict[int, Tuple[int, int, float]] = {}
+        for i in range(0, len(uniq), 500):
+            chunk = uniq[i:i + 500]
+            marks = ", ".join("?" for _ in chunk)
+            for cid, reps, interval, ease in conn.execute(
+                f"SELECT card_id, repetitions, interval_days, ease FROM reviews WHERE card_id IN ({marks});", chunk
+            ):
+                state[int(cid)] = (int(reps or 0), int(interval or 0), float(ease or 2.5))
+        known = [c for c in uniq if c in state]
+        if not known:
+            return 0
+        pos = {c: i for i, c in enumerate(known)}
+        reps = np.array([state[c][0] for c in known], dtype=np.int64)
+        interval = np.array([state[c][1] for c in known], dtype=np.int64)
+        ease = np.array([state[c][2] for c in known], dtype=np.float64)
+        last = np.full(len(known), -1, dtype=np.int64)  # index of each card's latest grade
+
+        # Round k holds every card's k-th grade, so repeated grades of a card apply in order.
+        rounds: List[List[int]] = []
+        seen: Dict[int, int] = {}
+        for g, cid in enumerate(card_ids):
+            if int(cid) not in pos:
+                continue
+            k = seen.get(int(cid), 0)
+            seen[int(cid)] = k + 1
+            if k == len(rounds):
+                rounds.append([])
+            rounds[k].append(g)
+        events: List[ReviewEvent] = []
+        for grades in rounds:
+            g = np.asarray(grades, dtype=np.int64)
+            p = np.array([pos[int(card_ids[i])] for i in grades], dtype=np.int64)
+            interval[p], reps[p], ease[p] = sm2_next_batch(reps[p], interval[p], ease[p], 6 - user_q[g])
+            last[p] = g
+            events.extend(
+                (int(card_ids[gi]), stamps[gi], int(user_q[gi]),
+                 iso_date(date.fromisoformat(stamps[gi][:10]) + timedelta(days=int(interval[pi]))),
+                 int(interval[pi]), int(reps[pi]), float(ease[pi]))
+                for gi, pi in zip(grades, p)
+            )
+
+        conn.executemany(
+            """
+            UPDATE reviews
+            SET due_date=?, interval_days=?, repetitions=?, ease=?, last_quality=?, last_reviewed_at=?
+            WHERE card_id=?
+            """,
+            [
+                (iso_date(date.fromisoformat(stamps[last[i]][:10]) + timedelta(days=int(interval[i]))),
+                 int(interval[i]), int(reps[i]), float(ease[i]), int(user_q[last[i]]), stamps[last[i]], c)
+                for i, c in enumerate(known)
+            ],
+        )
+        log_review_events(conn, events)
+    return len(events)
+
+REVIEW_LOG_REPLAY_SQL = "SELECT card_id, ts, quality, due_date, interval_days, repetitions, ease FROM review_log ORDER BY card_id, ts, id;"
+
+def replay_review_log(write: bool = True) -> Dict[str, int]:
+    """Rebuild every logged card's `reviews` state from review_log.
+
+    Events are read in (card_id, ts) index order; each card starts from the SM-2 defaults,
+    a snapshot row (quality NULL) sets the state outright and a grade advances it with
+    sm2_next_batch. All cards advance together, one vectorized round per event depth.
+    Cards with no log rows are left alone. Returns {"cards", "events", "updated"}.
+    """
+    with db_conn() as conn:
+        rows = conn.execute(REVIEW_LOG_REPLAY_SQL).fetchall()
+    if not rows:
+        return {"cards": 0, "events": 0, "updated": 0}
+    card = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    quality = np.fromiter((-1 if r[2] is None else r[2] for r in rows), dtype=np.int64, count=len(rows))
+    snap_interval = np.fromiter((r[4] for r in rows), dtype=np.int64, count=len(rows))
+    snap_reps = np.fromiter((r[5] for r in rows), dtype=np.int64, count=len(rows))
+    snap_ease = np.fromiter((r[6] for r in rows), dtype=np.float64, count=len(rows))
+
+    starts = np.r_[True, card[1:] != card[:-1]]
+    group = np.cumsum(starts) - 1
+    idx = np.arange(len(rows))
+    rank = idx - np.maximum.accumulate(np.where(starts, idx, 0))
+    n = int(group[-1]) + 1
+    interval = np.zeros(n, dtype=np.int64)
+    reps = np.zeros(n, dtype=np.int64)
+    ease = np.full(n, 2.5)
+    last_event = np.full(n, -1, dtype=np.int64)
+    last_grade = np.full(n, -1, dtype=np.int64)
+
+    by_rank = np.argsort(rank, kind="stable")
+    bounds = np.searchsorted(rank[by_rank], np.arange(int(rank.max()) + 2))
+    for k in range(len(bounds) - 1):
+        ev = by_rank[bounds[k]:bounds[k + 1]]
+        snap, grade = ev[quality[ev] < 0], ev[quality[ev] >= 0]
+        g = group[snap]
+        interval[g], reps[g], ease[g] = snap_interval[snap], snap_reps[snap], snap_ease[snap]
+        g = group[grade]
+        interval[g], reps[g], ease[g] = sm2_next_batch(reps[g], interval[g], ease[g], 6 - np.clip(quality[grade], 1, 5))
+        last_grade[g] = grade
+        last_event[group[ev]] = ev
+
+    updates = []
+    for i in range(n):
+        e = int(last_event[i])
+        cid, ts, q, snap_due = rows[e][0], rows[e][1], rows[e][2], rows[e][3]
+        due = snap_due if q is None else iso_date(date.fromisoformat(ts[:10]) + timedelta(days=int(interval[i])))
+        lg = int(last_grade[i])
+        updates.append((
+            due, int(interval[i]), int(reps[i]), float(ease[i]),
+            None if lg < 0 else rows[lg][2], None if lg < 0 else rows[lg][1], int(cid),
+        ))
+    updated = 0
+    if write:
+        with db_tx() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                """
+                UPDATE reviews
+                SET due_date=?, interval_days=?, repetitions=?, ease=?,
+                    last_quality=COALESCE(?, last_quality), last_reviewed_at=COALESCE(?, last_reviewed_at)
+                WHERE card_id=?
+                """,
+                updates,
+            )
+            updated = conn.total_changes - before
+    return {"cards": n, "events": len(rows), "updated": updated}
+
+
+_pdf_viewer_component = (
+    components.declare_component("pdf_viewer", path=PDF_VIEWER_DIR)
+    if all(os.path.isfile(os.path.join(PDFJS_DIR, f)) for f in ("pdf.min.js", "pdf.worker.min.js"))
+    else None
+)
 
-def pdf_selectable_viewer(pdf_bytes: bytes, page: int = 1, zoom: int = 100, height: int = 820) -> None:
+def pdf_selectable_viewer(sha256: str, page: int = 1, zoom: int = 100, height: int = 820) -> None:
     """
     Render a selectable PDF page inside Streamlit using PDF.js (text layer enabled),
     so the user can highlight/copy text directly from the PDF view.
@@ -1161,9 +3312,18 @@ def pdf_selectable_viewer(pdf_bytes: bytes, page: int = 1, zoom: int = 100, heig
     Notes:
     - Works when the PDF actually contains text (not only scanned images).
     - Uses a JS renderer to avoid Chrome blocking data: PDFs in iframes.
+    - Preferred path: the pdf_viewer component loads the book by URL with range requests
+      and keeps it open across reruns, using the PDF.js build vendored in pdf_viewer/pdfjs/.
+      Without static serving or the vendored build it falls back to inlining the file as base64.
     """
+    url = pdf_static_url(sha256) if _pdf_viewer_component is not None else None
+    if url:
+        _pdf_viewer_component(url=url, page=max(1, int(page)), zoom=max(50, min(300, int(zoom))), height=int(height), key="nb_pdf_viewer", default=None)
+        return
+
     try:
-        b64 = base64.b64encode(pdf_bytes).decode("utf-8")
+        with pdf_blob_mmap(sha256) as mm:
+            b64 = base64.b64encode(mm).decode("utf-8")
     except Exception:
         st.error("Could not load PDF bytes for preview.")
         return
@@ -1301,7 +3461,7 @@ def difficulty_bucket(card_row: Dict[str, Any]) -> str:
 # =========================
 # Dictionary backends
 # =========================
-@st.cache_data(show_spinner=False)
+@lookup_cached("dictapi", _word_key, lambda res: True if res[0] else (False if res[2] == 404 else None))
 def dictapi_lookup(lang: str, word: str) -> Tuple[bool, Any, int]:
     lang = norm_word(lang)
     word = norm_text(word)
@@ -1309,7 +3469,7 @@ def dictapi_lookup(lang: str, word: str) -> Tuple[bool, Any, int]:
         return False, {"error": "Missing lang or word"}, 0
     url = f"{DICTAPI_BASE}/{lang}/{word}"
     try:
-        r = requests.get(url, timeout=10)
+        r = http_client().get("dictapi", url, timeout=10)
         status = r.status_code
         try:
             payload = r.json()
@@ -1342,7 +3502,7 @@ def parse_dictapi_payload(payload: Any) -> Dict[str, Any]:
         out["meanings"].append({"partOfSpeech": m.get("partOfSpeech") or "", "definitions": defs})
     return out
 
-@st.cache_data(show_spinner=False)
+@lookup_cached("wiktionary_summary", _word_key, _wiki_outcome)
 def wiktionary_summary(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
     lang = norm_word(lang)
     word = norm_text(word)
@@ -1352,7 +3512,7 @@ def wiktionary_summary(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
     title_enc = requests.utils.quote(word, safe="")
     url = f"{base}/api/rest_v1/page/summary/{title_enc}"
     try:
-        r = requests.get(url, headers=HTTP_HEADERS, timeout=12)
+        r = http_client().get("wiktionary_summary", url, timeout=12)
         status = r.status_code
         try:
             j = r.json()
@@ -1368,7 +3528,7 @@ def wiktionary_summary(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
     except Exception as e:
         return False, {"error": str(e), "source": url}
 
-@st.cache_data(show_spinner=False)
+@lookup_cached("wiktionary_extract", _word_key, _wiki_outcome)
 def wiktionary_extract(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
     lang = norm_word(lang)
     word = norm_text(word)
@@ -1386,7 +3546,7 @@ def wiktionary_extract(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
         "titles": word,
     }
     try:
-        r = requests.get(api, params=params, headers=HTTP_HEADERS, timeout=12)
+        r = http_client().get("wiktionary_extract", api, params=params, timeout=12)
         status = r.status_code
         try:
             j = r.json()
@@ -1410,6 +3570,170 @@ def wiktionary_extract(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
     except Exception as e:
         return False, {"error": str(e), "source": api}
 
+# =========================
+# Offline dictionary (Kaikki / Wiktextract JSONL)
+# =========================
+DICT_INGEST_BATCH = 2000     # entries per write transaction
+DICT_STAGING_SUFFIX = "~loading"  # lang tag of rows a replacing load writes before swapping them in
+DICT_LOOKUP_LIMIT = 12       # entries returned per lookup
+_KAIKKI_FORM_SKIP_TAGS = {"table-tags", "inflection-template", "class"}
+
+def dict_key(word: str) -> str:
+    """Lookup key for the offline dictionary: NFC, trimmed, lower-cased (accents kept)."""
+    return unicodedata.normalize("NFC", norm_text(word)).lower()
+
+def _kaikki_entry(e: Dict[str, Any]) -> Optional[Tuple[str, str, str, str, List[str]]]:
+    """(word, pos, ipa, senses JSON, inflected forms) from one Kaikki line, or None if it has no glosses."""
+    word = norm_text(e.get("word") or "")
+    senses = []
+    for s in e.get("senses") or []:
+        glosses = s.get("glosses") or s.get("raw_glosses") or []
+        if not glosses:
+            continue
+        examples = [norm_text(x.get("text") or "") for x in s.get("examples") or [] if isinstance(x, dict)]
+        senses.append({"gloss": "; ".join(glosses), "examples": [x for x in examples if x][:3]})
+    if not word or not senses:
+        return None
+    ipa = next((norm_text(x.get("ipa") or "") for x in e.get("sounds") or [] if isinstance(x, dict) and x.get("ipa")), "")
+    forms = [
+        norm_text(f.get("form") or "")
+        for f in e.get("forms") or []
+        if isinstance(f, dict) and not _KAIKKI_FORM_SKIP_TAGS.intersection(f.get("tags") or [])
+    ]
+    return word, norm_text(e.get("pos") or ""), ipa, json.dumps(senses, ensure_ascii=False), [f for f in forms if f and f != word]
+
+def _insert_dict_batch(lang: str, batch: List[Tuple[str, str, str, str, List[str]]]) -> None:
+    with db_tx() as conn:
+        start = int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM dict_entries;").fetchone()[0]) + 1
+        conn.executemany(
+            "INSERT INTO dict_entries(id, lang, word, word_key, pos, ipa, senses) VALUES(?, ?, ?, ?, ?, ?, ?);",
+            [(start + i, lang, w, dict_key(w), pos, ipa, senses) for i, (w, pos, ipa, senses, _forms) in enumerate(batch)],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO dict_forms(lang, form_key, entry_id) VALUES(?, ?, ?);",
+            [(lang, dict_key(f), start + i) for i, rec in enumerate(batch) for f in rec[4]],
+        )
+
+def _delete_dict_lang(conn: sqlite3.Connection, lang: str) -> None:
+    conn.execute("DELETE FROM dict_forms WHERE lang=?;", (lang,))
+    conn.execute("DELETE FROM dict_entries WHERE lang=?;", (lang,))
+
+def dict_ingest_jsonl(
+    path: str,
+    lang: str = "fr",
+    replace: bool = True,
+    progress: Optional[Callable[[float, int], None]] = None,
+) -> Dict[str, int]:
+    """Stream a Kaikki-format JSONL dump (optionally .gz) into dict_entries / dict_forms.
+
+    Lines are parsed one at a time and written DICT_INGEST_BATCH entries per transaction,
+    so memory stays flat on multi-GB dumps. Only entries whose lang_code is `lang` are kept.
+    replace=True loads under a staging lang tag (invisible to lookups) and swaps it for the
+    language's existing rows in one transaction at the end, so a failed or interrupted load
+    leaves the old dictionary in place. progress(fraction of file read, entries written) is
+    called after each batch. Returns {"lines", "entries", "skipped"}.
+    """
+    lang = norm_word(lang)
+    target = lang + DICT_STAGING_SUFFIX if replace else lang
+    if replace:
+        with db_tx() as conn:
+            _delete_dict_lang(conn, target)  # leftovers of an earlier interrupted load
+    try:
+        res = _dict_ingest_stream(path, lang, target, progress)
+    except BaseException:
+        if replace:
+            with db_tx() as conn:
+                _delete_dict_lang(conn, target)
+        raise
+    if replace:
+        with db_tx() as conn:
+            _delete_dict_lang(conn, lang)
+            conn.execute("UPDATE dict_entries SET lang=? WHERE lang=?;", (lang, target))
+            conn.execute("UPDATE dict_forms SET lang=? WHERE lang=?;", (lang, target))
+    if progress:
+        progress(1.0, res["entries"])
+    return res
+
+def _dict_ingest_stream(
+    path: str, lang: str, target: str, progress: Optional[Callable[[float, int], None]]
+) -> Dict[str, int]:
+    """Write `lang` entries from the dump under the lang tag `target` (see dict_ingest_jsonl)."""
+    total = max(1, os.path.getsize(path))
+    lines = entries = skipped = 0
+    batch: List[Tuple[str, str, str, str, List[str]]] = []
+    with open(path, "rb") as raw:
+        stream: IO[bytes] = gzip.GzipFile(fileobj=raw) if path.endswith(".gz") else raw
+        for line in io.TextIOWrapper(stream, encoding="utf-8", errors="replace"):
+            lines += 1
+            try:
+                e = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if not isinstance(e, dict) or e.get("lang_code") != lang:
+                skipped += 1
+                continue
+            rec = _kaikki_entry(e)
+            if rec is None:
+                skipped += 1
+                continue
+            batch.append(rec)
+            if len(batch) >= DICT_INGEST_BATCH:
+                _insert_dict_batch(target, batch)
+                entries += len(batch)
+                batch = []
+                if progress:
+                    progress(min(1.0, raw.tell() / total), entries)
+        if batch:
+            _insert_dict_batch(target, batch)
+            entries += len(batch)
+    return {"lines": lines, "entries": entries, "skipped": skipped}
+
+@rerun_cached
+def dict_offline_counts() -> Dict[str, int]:
+    """Offline dictionary entries per language (a load still in progress is not counted)."""
+    sql = "SELECT lang, COUNT(*) FROM dict_entries WHERE lang NOT LIKE ? GROUP BY lang ORDER BY lang;"
+    with db_conn() as conn:
+        return {str(lang): int(n) for lang, n in conn.execute(sql, ("%" + DICT_STAGING_SUFFIX,))}
+
+DICT_ENTRIES_SQL = "SELECT id, word, pos, ipa, senses FROM dict_entries WHERE lang=? AND word_key=? ORDER BY id LIMIT ?;"
+DICT_FORMS_SQL = """
+SELECT e.id, e.word, e.pos, e.ipa, e.senses
+FROM dict_forms f JOIN dict_entries e ON e.id = f.entry_id
+WHERE f.lang=? AND f.form_key=?
+ORDER BY f.entry_id LIMIT ?;
+"""
+
+def offline_dictionary_lookup(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
+    """Look a word up in the offline dictionary: entries for the word itself, then lemmas listing it as a form.
+
+    Success data has the dictapi shape ({"status", "raw", "parsed"}) so the page renders it the same way.
+    """
+    lang = norm_word(lang)
+    key = dict_key(word)
+    if not lang or not key:
+        return False, {"error": "Missing lang or word"}
+    with db_conn() as conn:
+        rows = conn.execute(DICT_ENTRIES_SQL, (lang, key, DICT_LOOKUP_LIMIT)).fetchall()
+        rows += conn.execute(DICT_FORMS_SQL, (lang, key, DICT_LOOKUP_LIMIT)).fetchall()
+    if not rows:
+        return False, {"error": "Not found"}
+    phonetics: List[Dict[str, Any]] = []
+    meanings: List[Dict[str, Any]] = []
+    for _id, w, pos, ipa, senses in rows:
+        if ipa and all(p["text"] != ipa for p in phonetics):
+            phonetics.append({"text": ipa, "audio": ""})
+        label = pos if dict_key(w) == key else f"{pos} (form of {w})"
+        defs = [
+            {"definition": s.get("gloss") or "", "example": (s.get("examples") or [""])[0], "synonyms": []}
+            for s in json.loads(senses or "[]")
+        ]
+        if defs:
+            meanings.append({"partOfSpeech": label, "definitions": defs})
+    if not meanings:
+        return False, {"error": "Not found"}
+    return True, {"status": 200, "raw": None, "parsed": {"phonetics": phonetics, "meanings": meanings}}
+
 def summarize_extract(extract: str, max_lines: int = 18, max_chars: int = 1400) -> str:
     text = (extract or "").strip()
     if not text:
@@ -1420,30 +3744,170 @@ def summarize_extract(extract: str, max_lines: int = 18, max_chars: int = 1400)
         snippet = snippet[:max_chars].rstrip() + "…"
     return snippet
 
-def best_dictionary_result(lang: str, word: str) -> Tuple[str, Dict[str, Any]]:
-    lang = norm_word(lang)
-    word = norm_text(word)
+DICT_LOOKUP_DEADLINE = 12.0   # seconds for a whole best_dictionary_result call (one backend timeout)
+DICT_BACKEND_STATS: Dict[str, Dict[str, float]] = {}
+_DICT_STATS_LOCK = threading.Lock()
+
+def _dict_stat(backend: str, ms: Optional[float] = None, ok: bool = False, timeout: bool = False) -> None:
+    with _DICT_STATS_LOCK:
+        t = DICT_BACKEND_STATS.setdefault(backend, {"calls": 0, "ok": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0})
+        if timeout:
+            t["timeouts"] += 1
+        if ms is not None:
+            t["calls"] += 1
+            t["ok"] += int(ok)
+            t["total_ms"] += ms
+            t["max_ms"] = max(t["max_ms"], ms)
+
+def _dictapi_backend(lang: str, word: str) -> Tuple[bool, Dict[str, Any]]:
+    ok, payload, status = dictapi_lookup(lang, word)
+    parsed = parse_dictapi_payload(payload) if ok else {"phonetics": [], "meanings": []}
+    if ok and parsed["meanings"]:
+        return True, {"status": status, "raw": payload, "parsed": parsed}
+    return False, {"status": status, "raw": payload}
+
+DICTIONARY_BACKENDS: Dict[str, Callable[[str, str], Tuple[bool, Dict[str, Any]]]] = {
+    "offline": offline_dictionary_lookup,
+    "dictapi": _dictapi_backend,
+    "wiktionary_summary": wiktionary_summary,
+    "wiktionary_extract": wiktionary_extract,
+}
 
-    if lang == "en":
-        ok, payload, status = dictapi_lookup(lang, word)
-        parsed = parse_dictapi_payload(payload) if ok else {"phonetics": [], "meanings": []}
-        if ok and parsed["meanings"]:
-            return "dictapi", {"status": status, "raw": payload, "parsed": parsed}
+def dictionary_backend_order(lang: str) -> List[str]:
+    """Network backends by priority: dictapi leads for English (best structured data), else it is the last resort.
 
-    ok, data = wiktionary_summary(lang, word)
-    if ok:
-        return "wiktionary_summary", data
+    The offline dictionary is not listed: best_dictionary_result asks it first, on its own.
+    """
+    if norm_word(lang) == "en":
+        return ["dictapi", "wiktionary_summary", "wiktionary_extract"]
+    return ["wiktionary_summary", "wiktionary_extract", "dictapi"]
+
+def _timed_backend(name: str, lang: str, word: str, until: Optional[float] = None) -> Tuple[bool, Dict[str, Any]]:
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        with http_deadline(until):
+            ok, data = DICTIONARY_BACKENDS[name](lang, word)
+        return ok, data
+    except Exception as e:
+        return False, {"error": str(e)}
+    finally:
+        _dict_stat(name, (time.perf_counter() - t0) * 1000.0, ok=ok)
+
+@st.cache_resource(show_spinner=False)
+def dictionary_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="dict-lookup")
 
-    ok2, data2 = wiktionary_extract(lang, word)
-    if ok2:
-        return "wiktionary_extract", data2
+def best_dictionary_result(lang: str, word: str, deadline: float = DICT_LOOKUP_DEADLINE) -> Tuple[str, Dict[str, Any]]:
+    """Query every backend at once and return (backend, data) for the highest-priority success.
 
-    ok3, payload3, status3 = dictapi_lookup(lang, word)
-    parsed3 = parse_dictapi_payload(payload3) if ok3 else {"phonetics": [], "meanings": []}
-    if ok3 and parsed3["meanings"]:
-        return "dictapi", {"status": status3, "raw": payload3, "parsed": parsed3}
+    Returns as soon as every backend ranked above a success has failed, or at `deadline`
+    seconds with the best success so far. Each backend's HTTP attempts and retries are
+    bounded by the same deadline, so no pool worker outlives it by more than one read;
+    calls still running then are counted as timeouts.
+    Returns ("none", {"errors": {backend: data}}) when nothing succeeded.
+
+    The local offline dictionary is tried first; a hit there makes no network calls.
+    """
+    lang = norm_word(lang)
+    word = norm_text(word)
+    ok, data = _timed_backend("offline", lang, word)
+    if ok:
+        return "offline", data
+    order = dictionary_backend_order(lang)
+    pool = dictionary_pool()
+    end = time.monotonic() + max(0.0, float(deadline))
+    futures = {name: pool.submit(_timed_backend, name, lang, word, end) for name in order}
+
+    while True:
+        for name in order:
+            fut = futures[name]
+            if not fut.done():
+                break
+            ok, data = fut.result()
+            if ok:
+                for other in futures.values():
+                    other.cancel()
+                return name, data
+        else:
+            break  # everything finished, nothing succeeded
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        wait([f for f in futures.values() if not f.done()], timeout=remaining, return_when=FIRST_COMPLETED)
+
+    errors: Dict[str, Any] = {}
+    for name in order:
+        fut = futures[name]
+        if fut.done() and not fut.cancelled():
+            ok, data = fut.result()
+            if ok:
+                return name, data
+            errors[name] = data
+        else:
+            fut.cancel()
+            _dict_stat(name, timeout=True)
+            errors[name] = {"error": f"Timed out after {deadline:g}s"}
+    return "none", {"errors": errors}
+
+DICT_BATCH_WORKERS = 6     # words looked up at once (each fans out to its backends)
+DICT_BATCH_MAX_WORDS = 500
+
+def parse_word_list(text: str, limit: int = DICT_BATCH_MAX_WORDS) -> List[str]:
+    """Words from a pasted list (one per line, or comma / semicolon / tab separated), deduplicated case-insensitively."""
+    out: List[str] = []
+    seen = set()
+    for part in re.split(r"[\n,;\t]+", text or ""):
+        w = lookup_key(part)
+        if w and w.lower() not in seen:
+            seen.add(w.lower())
+            out.append(w)
+            if len(out) >= limit:
+                break
+    return out
 
-    return "none", {"errors": {"wiktionary_summary": data, "wiktionary_extract": data2, "dictapi": {"status": status3, "raw": payload3}}}
+def iter_batch_lookups(lang: str, words: List[str], workers: int = DICT_BATCH_WORKERS) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Yield (word, source, data) from best_dictionary_result as each lookup finishes, at most `workers` at a time."""
+    pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="dict-batch")
+    try:
+        futures = {pool.submit(best_dictionary_result, lang, w): w for w in words}
+        for fut in as_completed(futures):
+            word = futures[fut]
+            try:
+                source, data = fut.result()
+            except Exception as e:
+                source, data = "none", {"errors": {"batch": {"error": str(e)}}}
+            yield word, source, data
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def dictionary_card_fields(source: str, data: Dict[str, Any]) -> Dict[str, str]:
+    """Default back / example / notes / tags for a card made from a lookup (as the single-word forms prefill)."""
+    if source in ("dictapi", "offline"):
+        defs = [d for m in data["parsed"]["meanings"] for d in m["definitions"]]
+        first = defs[0] if defs else {"definition": "", "example": ""}
+        return {"back": first["definition"], "example": first["example"], "notes": "", "tags": "dictionary"}
+    if source.startswith("wiktionary"):
+        return {
+            "back": summarize_extract(data.get("extract") or ""),
+            "example": "",
+            "notes": f"Source: {data.get('source', 'Wiktionary')}",
+            "tags": "wiktionary",
+        }
+    return {"back": "", "example": "", "notes": "", "tags": ""}
+
+def card_front_keys_sql(n: int) -> str:
+    return f"SELECT DISTINCT front_key FROM cards WHERE language = ? AND front_key IN ({', '.join('?' for _ in range(n))});"
+
+def existing_card_fronts(lang: str, words: List[str]) -> set:
+    """norm_word keys of `words` that already have a card in `lang` (looked up on idx_cards_front_key)."""
+    keys = sorted({norm_word(w) for w in words} - {""})
+    out: set = set()
+    with db_conn() as conn:
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            out.update(str(k) for (k,) in conn.execute(card_front_keys_sql(len(chunk)), [norm_text(lang)] + chunk))
+    return out
 
 # =========================
 # UI helpers
@@ -1461,7 +3925,6 @@ def app_header(bp: str) -> None:
     streak = int(st.session_state.get("streak", 1))
     level, xp_in, xp_need = level_from_xp(carrots)
     total_cards = count_cards_db()
-    due_today = len(fetch_due_cards(today_utc_date()))
     cigarettes, cig_toward = cigarettes_from_xp(carrots)
 
     # Header
@@ -1488,7 +3951,6 @@ def app_header(bp: str) -> None:
 
 def render_quick_find_results(query: str) -> None:
     q = query.strip()
-    cards = fetch_cards(q.replace("tag:", "").strip() if q.startswith("tag:") else q)
 
     # Special: #id direct open
     if q.startswith("#"):
@@ -1505,13 +3967,16 @@ def render_quick_find_results(query: str) -> None:
     # Tag quick filter
     if q.lower().startswith("tag:"):
         tag = q.split(":", 1)[1].strip()
-        cards = fetch_cards("", tag)
+        total = count_cards("", tag)
+        cards, _ = fetch_cards_page("", tag, limit=8)
+    else:
+        cards, total = search_cards(q, limit=8)
 
     if not cards:
         st.caption("No matches.")
         return
 
-    st.caption(f"Matches: {min(len(cards), 8)} / {len(cards)}")
+    st.caption(f"Matches: {min(total, 8)} / {total}")
     for c in cards[:8]:
         title = (c.get("front") or "").strip() or f"Card #{c['id']}"
         cols = st.columns([1.0, 3.0, 1.0])
@@ -1715,6 +4180,79 @@ def select_card(card_id: int) -> None:
     st.session_state.selected_card_id = int(card_id)
     st.session_state.scroll_to_selected_card = True
 
+# Review session: an ordered list of the day's due ids still to grade (st.session_state.review_queue),
+# the position in st.session_state.review_idx, and a small window of prefetched card rows.
+REVIEW_PREFETCH = 8
+
+def review_queue() -> Dict[str, Any]:
+    """The current review session, rebuilt when missing or when the UTC day changes.
+
+    `max_id` is the largest card id seen when the queue was (re)filled; due cards created or
+    imported since then are appended at the end.
+    """
+    ss = st.session_state
+    today = today_utc_date()
+    q = ss.get("review_queue")
+    if not q or q.get("day") != iso_date(today):
+        q = {"day": iso_date(today), "ids": [], "graded": 0, "max_id": 0}
+        ss.review_queue = q
+        ss.review_idx = 0
+        ss.review_cards = {}
+    top = max_card_id()
+    if top > q["max_id"]:
+        queued = set(q["ids"])
+        q["ids"].extend(i for i in fetch_due_card_ids(today, after_id=q["max_id"]) if i not in queued)
+        q["max_id"] = top
+    return q
+
+def review_queue_grade(idx: int, user_quality: int) -> Optional[Dict[str, Any]]:
+    """Grade the card at queue position idx and take it out of the queue.
+
+    Returns its new review fields, or None if it was no longer due (it is dropped all the same).
+    """
+    ids: List[int] = review_queue()["ids"]
+    card_id = ids.pop(idx)
+    review_queue_forget(card_id)
+    state = grade_due_card(card_id, user_quality)
+    if state is not None:
+        st.session_state.review_queue["graded"] += 1
+    st.session_state.review_idx = idx if idx < len(ids) else 0
+    return state
+
+def review_queue_skip(idx: int) -> None:
+    """Move the card at idx to the end of the queue; the next card takes its place."""
+    ids: List[int] = review_queue()["ids"]
+    ids.append(ids.pop(idx))
+    st.session_state.review_idx = idx if idx < len(ids) - 1 else 0
+
+def review_queue_reset() -> None:
+    st.session_state.review_queue = None
+
+def review_queue_forget(card_id: int) -> None:
+    """Drop a prefetched card row (after an edit/delete) so the queue re-reads it."""
+    st.session_state.get("review_cards", {}).pop(int(card_id), None)
+
+def review_queue_card(idx: int) -> Optional[Dict[str, Any]]:
+    """Card at queue position idx, fetching it with the next few ids in one query when not prefetched.
+
+    Deleted cards are dropped from the queue. Only rows near idx are kept.
+    """
+    ss = st.session_state
+    ids: List[int] = review_queue()["ids"]
+    cache: Dict[int, Dict[str, Any]] = ss.setdefault("review_cards", {})
+    while 0 <= idx < len(ids):
+        if ids[idx] not in cache:
+            cache.update(fetch_cards_by_ids([i for i in ids[idx:idx + REVIEW_PREFETCH] if i not in cache]))
+        if ids[idx] in cache:
+            break
+        ids.pop(idx)
+    if not 0 <= idx < len(ids):
+        return None
+    keep = set(ids[max(0, idx - REVIEW_PREFETCH):idx + REVIEW_PREFETCH])
+    for cid in [c for c in cache if c not in keep]:
+        del cache[cid]
+    return cache[ids[idx]]
+
 def render_selected_card_viewer(title: str = "Selected card") -> None:
     cid = st.session_state.get("selected_card_id")
     if not cid:
@@ -1801,13 +4339,15 @@ def progress_ring_html(pct: int, label: str, sub: str) -> str:
 
 def build_due_calendar_html(days: int = 14) -> str:
     start = today_utc_date()
+    forecast = due_forecast(start, days)
+    # Each cell shows everything due on or before that day (backlog carries forward).
     counts = []
     maxc = 1
-    for i in range(days):
-        d = start + timedelta(days=i)
-        c = len(fetch_due_cards(d))
-        counts.append((d, c))
-        maxc = max(maxc, c)
+    running = forecast["overdue"]
+    for d, n in forecast["days"]:
+        running += n
+        counts.append((d, running))
+        maxc = max(maxc, running)
 
     t = THEMES.get(st.session_state.get("theme", "Dark"), THEMES["Dark"])
 
@@ -1872,7 +4412,7 @@ def home_page() -> None:
     st.markdown("## Home")
 
     cards_total = count_cards_db()
-    due_today = len(fetch_due_cards(today_utc_date()))
+    due_today = count_due_cards(today_utc_date())
     carrots = int(st.session_state.get("xp", 0) or 0)
     cigarettes, cig_toward = cigarettes_from_xp(carrots)
     level, xp_in, xp_need = level_from_xp(carrots)
@@ -1967,10 +4507,83 @@ def home_page() -> None:
             unsafe_allow_html=True,
         )
 
+def dictionary_batch_panel() -> None:
+    """Word-list mode of the Dictionary page: concurrent lookups, review, then one bulk card insert."""
+    ss = st.session_state
+    c1, c2 = st.columns([2.2, 1.0])
+    with c1:
+        origin = st.radio("Words from", ["Pasted list", "Notebook vocabulary"], horizontal=True, key="dict_batch_origin")
+    with c2:
+        lang = st.selectbox("Language", ["fr", "en"], index=0, key="dict_batch_lang")
+
+    if origin == "Pasted list":
+        text = st.text_area("Word list", height=160, placeholder="One word per line (or comma-separated)…", key="dict_batch_text")
+        words = parse_word_list(text)
+    else:
+        books = pdf_books_list()
+        if not books:
+            st.info("No books in the Notebook yet.")
+            return
+        book = st.selectbox("Book", books, format_func=lambda b: b["name"], key="dict_batch_book")
+        words = parse_word_list("\n".join(v["word"] for v in pdf_vocab_list(int(book["id"]))))
+
+    skip_existing = st.checkbox("Skip words that already have a card", value=True, key="dict_batch_skip")
+    if skip_existing and words:
+        have = existing_card_fronts(lang, words)
+        words = [w for w in words if norm_word(w) not in have]
+    st.caption(f"{len(words)} word(s) to look up (max {DICT_BATCH_MAX_WORDS}).")
+
+    if st.button(f"Look up {len(words)} words", type="primary", disabled=not words, use_container_width=True):
+        bar = st.progress(0.0, text="Looking up…")
+        live = st.empty()
+        results: List[Dict[str, Any]] = []
+        for n, (word, source, data) in enumerate(iter_batch_lookups(lang, words), start=1):
+            fields = dictionary_card_fields(source, data)
+            results.append({"add": bool(fields["back"]), "front": word, "source": source, **fields})
+            bar.progress(n / len(words), text=f"{n} / {len(words)} • {word}")
+            if n % 10 == 0 or n == len(words):
+                live.dataframe([{k: r[k] for k in ("front", "source", "back")} for r in results], use_container_width=True, height=260)
+        live.empty()
+        order = {w: i for i, w in enumerate(words)}
+        ss.dict_batch_results = {"lang": lang, "rows": sorted(results, key=lambda r: order[r["front"]])}
+
+    batch = ss.get("dict_batch_results")
+    if not batch:
+        return
+    rows = batch["rows"]
+    found = sum(1 for r in rows if r["back"])
+    st.markdown(f"### Results • {found} / {len(rows)} found")
+    edited = st.data_editor(
+        rows,
+        column_order=["add", "front", "back", "example", "tags", "source"],
+        disabled=["source"],
+        use_container_width=True,
+        hide_index=True,
+        key="dict_batch_editor",
+    )
+    picked = [r for r in edited if r.get("add") and norm_text(r.get("front")) and norm_text(r.get("back"))]
+    b1, b2 = st.columns([1.4, 1.0])
+    with b1:
+        if st.button(f"Create {len(picked)} cards", type="primary", disabled=not picked, use_container_width=True):
+            res = bulk_import_cards([dict(r, language=batch["lang"]) for r in picked])
+            bump_xp(min(80, res["created"]))
+            ss.dict_batch_results = None
+            toast(f"Created {res['created']} cards. (+XP)", icon="🥕")
+            st.rerun()
+    with b2:
+        if st.button("Clear results", use_container_width=True):
+            ss.dict_batch_results = None
+            st.rerun()
+
 def dictionary_page() -> None:
     st.markdown('<div class="page">', unsafe_allow_html=True)
     st.markdown("## Dictionary")
 
+    mode = st.segmented_control("Mode", ["Single word", "Word list"], default="Single word", key="dict_mode")
+    if mode == "Word list":
+        dictionary_batch_panel()
+        return
+
     st.markdown(
         """
 <div class="card">
@@ -2011,9 +4624,9 @@ def dictionary_page() -> None:
         source, data = best_dictionary_result(lang, word)
 
     st.markdown("---")
-    if source == "dictapi":
+    if source in ("dictapi", "offline"):
         parsed = data["parsed"]
-        st.success("Source: dictionaryapi.dev")
+        st.success("Source: offline dictionary" if source == "offline" else "Source: dictionaryapi.dev")
 
         if parsed["phonetics"]:
             st.markdown("### 🔊 Pronunciation")
@@ -2091,38 +4704,46 @@ def review_page() -> None:
     st.markdown('<div class="page">', unsafe_allow_html=True)
     st.markdown("## Review")
 
-    # Which bucket list (if any) the user is browsing in Review.
-    st.session_state.setdefault("review_bucket_view", "")
-
-    allc = fetch_cards()
-    buckets: Dict[str, List[Dict[str, Any]]] = {"new": [], "difficult": [], "meh": [], "easy": []}
-    for row in allc:
-        buckets.setdefault(difficulty_bucket(row), []).append(row)
+    # Which bucket list (if any) the user is browsing in Review; lists load only when picked.
+    st.session_state.setdefault("review_bucket_view", None)
 
+    counts = review_bucket_counts(today_utc_date())
     badge_row([
-        ("🆕", f"New {len(buckets['new'])}"),
-        ("😵", f"Difficult {len(buckets['difficult'])}"),
-        ("😐", f"Meh {len(buckets['meh'])}"),
-        ("😌", f"Easy {len(buckets['easy'])}"),
+        ("🆕", f"New {counts['new']}"),
+        ("😵", f"Difficult {counts['difficult']}"),
+        ("😐", f"Meh {counts['meh']}"),
+        ("😌", f"Easy {counts['easy']}"),
     ])
 
-    
-    # Browse buckets (tabs)
-    due_today = fetch_due_cards(today_utc_date())
-
-    def _render_bucket_list(cards: List[Dict[str, Any]], key_prefix: str, empty_msg: str):
-        q = st.text_input("Find", value="", placeholder="Type to filter…", key=f"{key_prefix}_q")
-        qn = q.strip().lower()
-        shown = 0
-        for r in cards:
+    bucket_labels = {
+        "due": f"All due ({counts['due']})",
+        "new": f"🆕 New ({counts['new']})",
+        "difficult": f"😵 Difficult ({counts['difficult']})",
+        "meh": f"😐 Meh ({counts['meh']})",
+        "easy": f"😌 Easy ({counts['easy']})",
+    }
+    bucket = st.segmented_control("Browse", list(bucket_labels), format_func=bucket_labels.get, key="review_bucket_view")
+
+    def _render_bucket_list(bucket: str, empty_msg: str) -> None:
+        q = st.text_input("Find", value="", placeholder="Type to filter…", key="review_list_q")
+        # Keyset pagination, as on the Cards page; restart when the bucket or filter changes.
+        if st.session_state.get("_review_list_prev") != (bucket, q):
+            st.session_state._review_list_prev = (bucket, q)
+            st.session_state.review_list_cursors = [None]
+            st.session_state.review_list_page = 1
+        page_size = 25
+        total = count_cards(q, bucket=bucket)
+        cursors = st.session_state.review_list_cursors
+        page_no = max(1, min(int(st.session_state.review_list_page), len(cursors)))
+        order = "due_asc" if bucket == "due" else "updated_desc"
+        rows, next_cursor = fetch_cards_page(q, order_by=order, limit=page_size, after=cursors[page_no - 1], bucket=bucket)
+        st.session_state.review_list_cursors = cursors[:page_no] + ([next_cursor] if next_cursor is not None else [])
+
+        for r in rows:
             front = (r.get("front", "") or "").strip()
             back = (r.get("back", "") or "").strip()
             tags = (r.get("tags", "") or "").strip()
             title = front if front else f"Card #{r.get('id')}"
-            hay = f"{front} {back} {tags}".lower()
-            if qn and qn not in hay:
-                continue
-            shown += 1
             cols = st.columns([1.6, 1.0, 0.7])
             with cols[0]:
                 st.markdown(f"**{title}**")
@@ -2131,56 +4752,39 @@ def review_page() -> None:
             with cols[1]:
                 st.caption(f"#{r.get('id')} • {tags or '—'}")
             with cols[2]:
-                if st.button("Open", key=f"{key_prefix}_open_{r.get('id')}", use_container_width=True):
+                if st.button("Open", key=f"tab_{bucket}_open_{r.get('id')}", use_container_width=True):
                     select_card(int(r.get("id")))
                     st.rerun()
             st.divider()
-        if shown == 0:
+        if not rows:
             st.info(empty_msg)
+            return
 
-    tabs = st.tabs([
-        f"All due ({len(due_today)})",
-        f"🆕 New ({len(buckets['new'])})",
-        f"😵 Difficult ({len(buckets['difficult'])})",
-        f"😐 Meh ({len(buckets['meh'])})",
-        f"😌 Easy ({len(buckets['easy'])})",
-    ])
-
-    with tabs[0]:
-        _render_bucket_list(
-            due_today,
-            "tab_due",
-            "No cards are due right now."
-        )
-
-    with tabs[1]:
-        _render_bucket_list(
-            buckets.get("new", []),
-            "tab_new",
-            "No cards in New."
-        )
-
-    with tabs[2]:
-        _render_bucket_list(
-            buckets.get("difficult", []),
-            "tab_diff",
-            "No cards in Difficult."
-        )
-
-    with tabs[3]:
-        _render_bucket_list(
-            buckets.get("meh", []),
-            "tab_meh",
-            "No cards in Meh."
-        )
-
-    with tabs[4]:
-        _render_bucket_list(
-            buckets.get("easy", []),
-            "tab_easy",
-            "No cards in Easy."
-        )
+        p1, p2, p3 = st.columns([1.0, 2.4, 1.0])
+        with p1:
+            if st.button("◀ Prev", key="review_list_prev", use_container_width=True, disabled=page_no <= 1):
+                st.session_state.review_list_page = page_no - 1
+                st.rerun()
+        with p2:
+            first = (page_no - 1) * page_size + 1
+            st.markdown(
+                f"<div class='small' style='text-align:center; padding-top:6px;'>Showing <b>{first}</b>–<b>{first + len(rows) - 1}</b> of <b>{total}</b></div>",
+                unsafe_allow_html=True,
+            )
+        with p3:
+            if st.button("Next ▶", key="review_list_next", use_container_width=True, disabled=next_cursor is None):
+                st.session_state.review_list_page = page_no + 1
+                st.rerun()
 
+    empty_msgs = {
+        "due": "No cards are due right now.",
+        "new": "No cards in New.",
+        "difficult": "No cards in Difficult.",
+        "meh": "No cards in Meh.",
+        "easy": "No cards in Easy.",
+    }
+    if bucket:
+        _render_bucket_list(bucket, empty_msgs[bucket])
 
     st.markdown("")
     colA, colB, colC = st.columns([1.6, 1.0, 1.0])
@@ -2189,7 +4793,7 @@ def review_page() -> None:
     with colB:
         st.write("")
         if st.button("Restart queue", use_container_width=True):
-            st.session_state.review_idx = 0
+            review_queue_reset()
             toast("Review queue restarted.", icon="🔁")
             st.rerun()
     with colC:
@@ -2216,19 +4820,19 @@ def review_page() -> None:
 
     st.markdown("---")
 
-    due = fetch_due_cards(today_utc_date())
-    if not due:
+    queue = review_queue()
+    due = queue["ids"]
+    idx = max(0, min(int(st.session_state.review_idx), len(due) - 1))
+    card = review_queue_card(idx)
+    if card is None:
         st.success("No cards due. 🎉")
         st.caption("Add more words in Dictionary or Cards.")
         return
 
-    idx = int(st.session_state.review_idx)
-    idx = max(0, min(idx, len(due) - 1))
-    card = due[idx]
-
     badge_row([
         ("📌", f"Queue {len(due)}"),
         ("🧾", f"Card {idx+1}/{len(due)}"),
+        ("✅", f"Graded {queue['graded']}"),
         ("⏱️", f"Interval {card.get('interval_days',0)}d"),
         ("⚖️", f"Ease {float(card.get('ease',2.5)):.2f}"),
     ])
@@ -2251,28 +4855,22 @@ def review_page() -> None:
     st.markdown("### 🎯 Grade your recall")
     st.caption("5 = very difficult • 1 = very easy (we convert it internally to SM‑2 quality).")
     q_user = st.radio("Difficulty", [1, 2, 3, 4, 5], index=2, horizontal=True)
-    q_sm2 = 6 - int(q_user)
 
     st.markdown('<div class="sticky-bottom">', unsafe_allow_html=True)
     b1, b2, b3, b4 = st.columns([1.2, 1.1, 1.1, 1.0])
     with b1:
         if st.button("Submit grade", type="primary", use_container_width=True):
-            interval, reps, ease = sm2_next(card, q_sm2)
-            next_due = today_utc_date() + timedelta(days=interval)
-            update_review_state(card["id"], next_due, interval, reps, ease, last_quality=int(q_user))
-            bump_xp(1)
-
-            st.session_state.review_idx = idx + 1
-            if st.session_state.review_idx >= len(due):
-                st.balloons()
-                st.session_state.review_idx = 0
-                toast("Queue complete!", icon="🎉")
+            if review_queue_grade(idx, int(q_user)) is None:
+                toast("That card was already graded.", icon="ℹ️")
+            else:
+                bump_xp(1)
+                if not due:
+                    st.balloons()
+                    toast("Queue complete!", icon="🎉")
             st.rerun()
     with b2:
         if st.button("Skip", use_container_width=True):
-            st.session_state.review_idx = idx + 1
-            if st.session_state.review_idx >= len(due):
-                st.session_state.review_idx = 0
+            review_queue_skip(idx)
             st.rerun()
     with b3:
         if st.button("Back", use_container_width=True):
@@ -2295,7 +4893,8 @@ def manage_cards_page() -> None:
     bp = detect_breakpoint(760)
     is_mobile = (bp == "m")
 
-    tags_list = [""] + all_tags()
+    counts_by_tag = dict(tag_counts())
+    tags_list = [""] + list(counts_by_tag.keys())
     sort_labels = {
         "Recently updated": "updated_desc",
         "Due soon": "due_asc",
@@ -2312,7 +4911,13 @@ def manage_cards_page() -> None:
                 key="cards_search",
             )
         with f2:
-            tag = st.selectbox("Tag", tags_list, index=0, key="cards_tag")
+            tag = st.selectbox(
+                "Tag",
+                tags_list,
+                index=0,
+                key="cards_tag",
+                format_func=lambda t: f"{t} ({counts_by_tag[t]})" if t in counts_by_tag else t,
+            )
         with f3:
             sort_pick = st.selectbox("Sort", list(sort_labels.keys()), index=0, key="cards_sort")
             order_by = sort_labels.get(sort_pick, "updated_desc")
@@ -2337,6 +4942,7 @@ def manage_cards_page() -> None:
     cur = (q, tag, order_by, int(st.session_state.get("cards_page_size", 18)))
     if prev != cur:
         st.session_state.cards_page = 1
+        st.session_state.cards_page_cursors = [None]
         st.session_state._cards_filters_prev = cur
 
     # Quick jump / quick tag filter
@@ -2360,13 +4966,13 @@ def manage_cards_page() -> None:
             tag = tag_from_q
         q_eff = ""
 
-    cards = fetch_cards(q_eff, tag, order_by=order_by)
-    total = len(cards)
+    total = count_cards(q_eff, tag)
 
-    # Pagination
+    # Pagination (keyset): cursors[i] is where page i+1 starts, recorded as pages are visited.
     page_size = int(st.session_state.get("cards_page_size", 18))
     pages = max(1, (total + page_size - 1) // page_size)
-    st.session_state.cards_page = max(1, min(int(st.session_state.get("cards_page", 1)), pages))
+    cursors = st.session_state.get("cards_page_cursors") or [None]
+    st.session_state.cards_page = max(1, min(int(st.session_state.get("cards_page", 1)), pages, len(cursors)))
 
     top_row = st.columns([1.0, 2.4, 1.0])
     with top_row[0]:
@@ -2388,9 +4994,9 @@ def manage_cards_page() -> None:
             st.session_state.cards_page += 1
             st.rerun()
 
-    start = (st.session_state.cards_page - 1) * page_size
-    end = min(total, start + page_size)
-    rows = cards[start:end]
+    page_no = st.session_state.cards_page
+    rows, next_cursor = fetch_cards_page(q_eff, tag, order_by, page_size, after=cursors[page_no - 1])
+    st.session_state.cards_page_cursors = cursors[:page_no] + ([next_cursor] if next_cursor is not None else [])
 
     def editor_panel() -> None:
         editor_anchor_id = "cards_editor_anchor"
@@ -2451,6 +5057,7 @@ def manage_cards_page() -> None:
                         select_card(cid)
                     else:
                         update_card(int(editor_card["id"]), language, front, back, tags, example, notes)
+                        review_queue_forget(int(editor_card["id"]))
                         bump_xp(1)
                         toast("Updated. +1 🥕", icon="🥕")
                         select_card(int(editor_card["id"]))
@@ -2495,6 +5102,7 @@ def manage_cards_page() -> None:
                 with d1:
                     if st.button("Yes, delete", key=f"{key_prefix}confirm_del_{c['id']}", use_container_width=True):
                         delete_card(c["id"])
+                        review_queue_forget(int(c["id"]))
                         st.session_state.delete_confirm_id = None
                         if st.session_state.get("selected_card_id") == c["id"]:
                             st.session_state.selected_card_id = None
@@ -2575,12 +5183,15 @@ def notebook_page() -> None:
         st.caption("Upload a PDF book, read it here, and save vocabulary as you go.")
 
         up = st.file_uploader("Upload a PDF", type=["pdf"], key="nb_pdf_uploader")
-        if up is not None:
-            data = up.read()
-            if data:
+        # The uploader keeps its file across reruns; store each upload only once.
+        up_id = None if up is None else (getattr(up, "file_id", None) or (up.name, up.size))
+        if up is not None and up_id != st.session_state.get("nb_pdf_uploaded_id"):
+            data = up.getbuffer()
+            if len(data):
                 book_id = pdf_book_upsert(up.name, data)
                 st.session_state.nb_pdf_book_id = book_id
                 st.session_state.nb_pdf_page = 1
+                st.session_state.nb_pdf_uploaded_id = up_id
                 toast(f"Saved PDF: {up.name}", icon="📄")
 
         books = pdf_books_list()
@@ -2648,6 +5259,38 @@ def notebook_page() -> None:
                 st.session_state.nb_pdf_text_cache_page = None
                 st.rerun()
 
+        # Find in book (whole-book text index, built in the background after upload)
+        with st.expander("🔎 Find in book", expanded=False):
+            status = pdf_text_status(book["sha256"]) if fitz is not None else None
+            if fitz is None:
+                st.caption("Install PyMuPDF to search inside books: `pip install pymupdf`")
+            elif pdf_text_ingest_wanted(book["sha256"], status):
+                pdf_text_ingest_async(book["sha256"])
+                st.caption("Indexing book text…")
+            elif status["status"] == "error":
+                st.caption(f"Indexing stopped after {status['pages_done']}/{status['page_count']} pages.")
+                if st.button("Retry indexing", key="nb_pdf_reindex", use_container_width=True):
+                    pdf_text_ingest_async(book["sha256"])
+                    st.rerun()
+            else:
+                if status["status"] != "done":
+                    st.caption(f"Indexing book text… {status['pages_done']}/{status['page_count']} pages")
+                find_q = st.text_input("Find", placeholder="word or phrase…", key="nb_pdf_find", label_visibility="collapsed")
+                if find_q.strip():
+                    hits = pdf_book_search(book["sha256"], find_q)
+                    if not hits:
+                        st.caption("No matches.")
+
+                    def _nb_goto(p: int) -> None:
+                        st.session_state.nb_pdf_page = int(p)
+
+                    for h in hits:
+                        r1, r2 = st.columns([0.8, 3.2], gap="small")
+                        with r1:
+                            st.button(f"p. {h['page']}", key=f"nb_find_{h['page']}", on_click=_nb_goto, args=(h["page"],), use_container_width=True)
+                        with r2:
+                            st.markdown(h["snippet"].replace("\n", " "))
+
         # Clamp page after any controls/callbacks
         page = max(1, int(st.session_state.get("nb_pdf_page", 1)))
         # NOTE: do NOT assign to st.session_state.nb_pdf_page here (it is bound to the number_input widget).
@@ -2661,21 +5304,26 @@ def notebook_page() -> None:
         )
 
         if use_native:
-            pdf_selectable_viewer(book["data"], page=page, zoom=zoom, height=820)
+            pdf_selectable_viewer(book["sha256"], page=page, zoom=zoom, height=820)
         else:
-            png = render_pdf_page_png(book["data"], page, zoom)
+            png = render_pdf_page_png(book["sha256"], page, zoom)
             if png:
                 st.image(png, use_container_width=True)
             else:
                 st.warning("PNG preview needs PyMuPDF. Install it with: `pip install pymupdf`")
 
+        # Warm the neighbouring pages while the user reads this one.
+        if fitz is not None:
+            reader = st.session_state.setdefault("nb_pdf_reader", os.urandom(8).hex())
+            pdf_prefetcher().schedule(reader, book["sha256"], page, zoom, pdf_page_count(book["sha256"]), render=not use_native)
+
         st.markdown("### Selectable text (copy)")
         if fitz is None:
             st.caption("Install PyMuPDF to extract text: `pip install pymupdf`")
         else:
             if st.button("Extract text from this page", use_container_width=True):
                 st.session_state.nb_pdf_text_cache_page = page
-                st.session_state.nb_pdf_extracted_text = extract_pdf_page_text(book["data"], page)
+                st.session_state.nb_pdf_extracted_text = extract_pdf_page_text(book["sha256"], page)
 
             extracted = st.session_state.get("nb_pdf_extracted_text", "")
             if extracted and st.session_state.get("nb_pdf_text_cache_page") == page:
@@ -2818,13 +5466,18 @@ def notebook_page() -> None:
         q = st.text_input("Search notebook", placeholder="type anything…", key="nb_search")
         only_with_notes = st.checkbox("Only show items that have example/notes", value=True)
 
-        cards = fetch_cards(q)
-        shown = 0
-        for c in cards[:500]:
-            has_any = bool((c.get("example") or "").strip() or (c.get("notes") or "").strip())
-            if only_with_notes and not has_any:
-                continue
-            shown += 1
+        # Keyset pagination, as on the Cards page; restart when the filter changes.
+        if st.session_state.get("_nb_list_prev") != (q, only_with_notes):
+            st.session_state._nb_list_prev = (q, only_with_notes)
+            st.session_state.nb_list_cursors = [None]
+            st.session_state.nb_list_page = 1
+        page_size = 25
+        total = count_cards(q, with_notes=only_with_notes)
+        cursors = st.session_state.nb_list_cursors
+        page_no = max(1, min(int(st.session_state.nb_list_page), len(cursors)))
+        cards, next_cursor = fetch_cards_page(q, limit=page_size, after=cursors[page_no - 1], with_notes=only_with_notes)
+        st.session_state.nb_list_cursors = cursors[:page_no] + ([next_cursor] if next_cursor is not None else [])
+        for c in cards:
             with st.container(border=True):
                 st.markdown(f"**{c['front']}**")
                 st.caption(f"#{c['id']} • tags: {c.get('tags','')} • due: {c.get('due_date','—')}")
@@ -2842,61 +5495,94 @@ def notebook_page() -> None:
                     st.session_state.nav = "Cards"
                     st.rerun()
 
-        if shown == 0:
+        if not cards:
             st.info("No notebook entries matched your filters.")
+        else:
+            p1, p2, p3 = st.columns([1.0, 2.4, 1.0])
+            with p1:
+                if st.button("◀ Prev", key="nb_list_prev", use_container_width=True, disabled=page_no <= 1):
+                    st.session_state.nb_list_page = page_no - 1
+                    st.rerun()
+            with p2:
+                first = (page_no - 1) * page_size + 1
+                st.markdown(
+                    f"<div class='small' style='text-align:center; padding-top:6px;'>Showing <b>{first}</b>–<b>{first + len(cards) - 1}</b> of <b>{total}</b></div>",
+                    unsafe_allow_html=True,
+                )
+            with p3:
+                if st.button("Next ▶", key="nb_list_next", use_container_width=True, disabled=next_cursor is None):
+                    st.session_state.nb_list_page = page_no + 1
+                    st.rerun()
 
 def import_export_page() -> None:
     st.markdown('<div class="page">', unsafe_allow_html=True)
-    st.markdown("## Import / Export (CSV)")
-    st.caption("CSV columns: language, front, back, tags, example, notes")
+    st.markdown("## Import / Export")
+    st.caption(
+        "CSV columns: language, front, back, tags, example, notes "
+        "(optionally due_date, interval_days, repetitions, ease, last_quality, last_reviewed_at). "
+        "Anki .apkg decks keep their scheduling."
+    )
 
     col1, col2 = st.columns(2, gap="large")
 
     with col1:
         st.markdown("### Export")
-        cards = fetch_cards()
-        if st.button("Generate CSV export", type="primary", use_container_width=True):
-            out = io.StringIO()
-            w = csv.writer(out)
-            w.writerow(["language", "front", "back", "tags", "example", "notes"])
-            for c in cards:
-                w.writerow([c.get("language", "fr"), c["front"], c["back"], c.get("tags", ""), c.get("example", ""), c.get("notes", "")])
-            st.download_button(
-                "Download CSV",
-                data=out.getvalue().encode("utf-8"),
-                file_name="charlot_cards.csv",
-                mime="text/csv",
-                use_container_width=True,
-            )
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=lambda k: EXPORT_FORMATS[k][0], key="export_fmt")
+        _label, ext, mime, _reviews = EXPORT_FORMATS[fmt]
+        # The export is generated only when the button is clicked.
+        st.download_button(
+            "Download export",
+            data=functools.partial(export_cards_file, fmt),
+            file_name=f"charlot_cards.{ext}",
+            mime=mime,
+            type="primary",
+            on_click="ignore",
+            use_container_width=True,
+        )
 
     with col2:
         st.markdown("### Import")
-        up = st.file_uploader("Upload CSV", type=["csv"])
+        up = st.file_uploader("Upload CSV or Anki deck", type=["csv", "apkg"])
         if up is not None:
             try:
-                content = up.read().decode("utf-8")
-                r = csv.DictReader(io.StringIO(content))
-                rows = list(r)
-                st.write(f"Rows detected: {len(rows)}")
+                size = max(1, int(getattr(up, "size", 0) or 0))
+                st.write(f"File size: {size / 1024:,.0f} KB")
                 if st.button("Import now", type="primary", use_container_width=True):
-                    created = 0
-                    for row in rows:
-                        language = norm_text(row.get("language") or "fr") or "fr"
-                        front = norm_text(row.get("front") or "")
-                        back = norm_text(row.get("back") or "")
-                        if not front or not back:
-                            continue
-                        tags = norm_text(row.get("tags") or "")
-                        example = norm_text(row.get("example") or "")
-                        notes = norm_text(row.get("notes") or "")
-                        create_card(language, front, back, tags, example, notes)
-                        created += 1
+                    bar = st.progress(0.0, text="Importing…")
+                    rejects = ImportRejects()
+                    up.seek(0)
+                    if up.name.lower().endswith(".apkg"):
+                        with apkg_collection(up) as col:
+                            total = max(1, apkg_note_count(col))
+                            res = bulk_import_cards(
+                                iter_apkg_rows(col),
+                                progress=lambda seen, created: bar.progress(min(1.0, seen / total), text=f"Imported {created} of {total} notes…"),
+                                on_reject=rejects.add,
+                            )
+                    else:
+                        res = bulk_import_cards(
+                            iter_csv_rows(up),
+                            progress=lambda seen, created: bar.progress(min(1.0, up.tell() / size), text=f"Imported {created} of {seen} rows…"),
+                            on_reject=rejects.add,
+                        )
+                    created = res["created"]
+                    st.session_state.import_rejects = rejects.csv_bytes() if rejects.count else None
                     bump_xp(min(80, created))
-                    toast(f"Imported {created} cards. (+XP)", icon="📥")
+                    toast(f"Imported {created} cards. (+XP)" + (f" Rejected {res['skipped']}." if res["skipped"] else ""), icon="📥")
                     st.rerun()
             except Exception as e:
                 st.error(f"Import failed: {e}")
 
+        if st.session_state.get("import_rejects"):
+            st.warning("Some rows were rejected in the last import.")
+            st.download_button(
+                "Download rejected rows",
+                data=st.session_state.import_rejects,
+                file_name="charlot_import_rejects.csv",
+                mime="text/csv",
+                use_container_width=True,
+            )
+
 def settings_page() -> None:
     st.markdown('<div class="page">', unsafe_allow_html=True)
     st.markdown("## Settings")
@@ -2910,6 +5596,38 @@ def settings_page() -> None:
     st.markdown("---")
     st.markdown("### Database")
     st.write(f"DB file: `{DB_PATH}`")
+    pool = db_pool(DB_PATH).stats()
+    st.caption(f"Connection pool: {pool['hits']} hits • {pool['misses']} misses • {pool['idle']} idle")
+    st.caption(f"Read cache (per rerun): {READ_CACHE_STATS['hits']} hits • {READ_CACHE_STATS['misses']} misses")
+    lc = lookup_cache_stats()
+    st.caption(
+        f"Dictionary cache: {lc['rows']} entries ({lc['negative_rows']} misses) • "
+        f"{lc['hit_rate']:.0%} hit rate • {lc['hits']} hits • {lc['negative_hits']} negative hits • "
+        f"{lc['misses']} fetched • {lc['evictions']} evicted"
+    )
+    if fitz is not None:
+        pdf_stats = pdf_doc_cache().stats()
+        timing = " • ".join(
+            f"{op}: {t['count']:.0f}× avg {t['total_ms'] / max(1, t['count']):.0f} ms (max {t['max_ms']:.0f})"
+            for op, t in pdf_stats["timings"].items()
+        )
+        st.caption(f"PDF documents: {pdf_stats['open_docs']} open • {pdf_stats['opens']} opens • {pdf_stats['hits']} reuses" + (f" • {timing}" if timing else ""))
+        pf = pdf_prefetcher().stats()
+        st.caption(f"PDF prefetch: {pf['served']} served • {pf['ready']} ready • {pf['pending']} pending • {pf['cancelled']} cancelled")
+    http = http_client().stats()
+    if http:
+        st.caption("HTTP: " + " • ".join(
+            f"{name} [{t['state']}]: {t['count']:.0f} requests ({t['errors']:.0f} failed, {t['throttled']:.0f} throttled, "
+            f"{t['rejected']:.0f} rejected) avg {t['total_ms'] / max(1, t['count']):.0f} ms"
+            for name, t in http.items()
+        ))
+    with _DICT_STATS_LOCK:
+        backends = {k: dict(v) for k, v in DICT_BACKEND_STATS.items()}
+    if backends:
+        st.caption("Dictionary backends: " + " • ".join(
+            f"{name}: {t['calls']:.0f} calls ({t['ok']:.0f} ok, {t['timeouts']:.0f} timed out) avg {t['total_ms'] / max(1, t['calls']):.0f} ms (max {t['max_ms']:.0f})"
+            for name, t in backends.items()
+        ))
 
     c1, c2, c3 = st.columns([1, 1, 2])
     with c1:
@@ -2920,9 +5638,49 @@ def settings_page() -> None:
         if st.button("Clear Streamlit cache", use_container_width=True):
             st.cache_data.clear()
             toast("Cache cleared.", icon="🧹")
+        if st.button("Clear dictionary cache", use_container_width=True):
+            lookup_cache_clear()
+            toast("Dictionary cache cleared.", icon="🧹")
     with c3:
         st.info("Tip: DB is local. If you deploy, use persistent storage (volume / cloud DB).")
 
+    if st.button("Rebuild schedules from review log", use_container_width=False):
+        res = replay_review_log()
+        toast(f"Replayed {res['events']} events for {res['cards']} cards.", icon="🔁")
+
+    with st.expander("Query plans (index check)", expanded=False):
+        plans = explain_hot_queries()
+        if all(p["ok"] for p in plans):
+            st.success("All hot queries use an index.")
+        else:
+            st.warning("Some hot queries scan or sort without an index.")
+        st.dataframe(plans, use_container_width=True)
+
+    st.markdown("---")
+    st.markdown("### Offline dictionary")
+    counts = dict_offline_counts()
+    st.caption(
+        ("Entries: " + " • ".join(f"{lang}: {n:,}" for lang, n in counts.items())) if counts
+        else "Empty. Load a Kaikki/Wiktextract JSONL dump (e.g. from kaikki.org) to look words up without network."
+    )
+    o1, o2 = st.columns([3, 1])
+    with o1:
+        dump_path = st.text_input("Dump file on the server (.jsonl or .jsonl.gz)", key="dict_dump_path")
+    with o2:
+        dump_lang = st.selectbox("Language", ["fr", "en"], key="dict_dump_lang")
+    if st.button("Load dump", disabled=not norm_text(dump_path)):
+        if not os.path.isfile(norm_text(dump_path)):
+            st.error("File not found.")
+        else:
+            bar = st.progress(0.0, text="Loading…")
+            res = dict_ingest_jsonl(
+                norm_text(dump_path),
+                dump_lang,
+                progress=lambda frac, n: bar.progress(frac, text=f"{n:,} entries…"),
+            )
+            toast(f"Loaded {res['entries']:,} entries ({res['skipped']:,} lines skipped).", icon="📚")
+            st.rerun()
+
     st.markdown("---")
     st.markdown("### Gamification")
     c4, c5 = st.columns(2)
@@ -2970,6 +5728,7 @@ def about_page() -> None:
 # Main
 # =========================
 def main() -> None:
+    begin_read_cache()
     init_db()
     init_session_state()
     sync_session_from_db()
@@ -0,0 +1,43 @@
+"""Vendor the PDF.js build used by the pdf_viewer component into ./pdfjs/.
+
+Downloads the pinned pdfjs-dist release from the npm registry, checks the tarball against
+the registry's published integrity hash and extracts build/pdf.min.js and
+build/pdf.worker.min.js. Run once after checkout:
+
+    python pdf_viewer/vendor_pdfjs.py
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import urllib.request
+
+PDFJS_VERSION = "3.11.174"
+FILES = ("pdf.min.js", "pdf.worker.min.js")
+DEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdfjs")
+
+
+def main() -> int:
+    with urllib.request.urlopen(f"https://registry.npmjs.org/pdfjs-dist/{PDFJS_VERSION}", timeout=30) as r:
+        dist = json.load(r)["dist"]
+    with urllib.request.urlopen(dist["tarball"], timeout=120) as r:
+        blob = r.read()
+    algo, _, want = dist["integrity"].partition("-")
+    if base64.b64encode(hashlib.new(algo, blob).digest()).decode() != want:
+        print("pdfjs-dist tarball does not match its registry integrity hash", file=sys.stderr)
+        return 1
+    os.makedirs(DEST, exist_ok=True)
+    with tarfile.open(fileobj=io.BytesIO(blob), mode="r:gz") as tar:
+        for name in FILES:
+            data = tar.extractfile(f"package/build/{name}").read()
+            with open(os.path.join(DEST, name), "wb") as f:
+                f.write(data)
+            print(f"{name}: {len(data)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
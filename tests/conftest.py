@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_v7  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """app_v7 bound to a fresh, migrated database in a temp dir."""
+    monkeypatch.setattr(app_v7, "DB_PATH", str(tmp_path / "charlot.sqlite3"))
+    app_v7.init_db()
+    yield app_v7
+    app_v7._READ_CACHE.store = None
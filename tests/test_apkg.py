@@ -0,0 +1,111 @@
+import io
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+
+def _cards(app):
+    with app.db_conn() as conn:
+        cur = conn.execute(
+            "SELECT c.language, c.front, c.back, c.tags, c.example, c.notes, r.due_date, r.interval_days, "
+            "r.repetitions, r.ease, r.last_quality FROM cards c JOIN reviews r ON r.card_id = c.id ORDER BY c.front;"
+        )
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, r)) for r in cur]
+
+
+def test_apkg_round_trip_keeps_cards_and_schedule(app):
+    a = app.create_card("fr", "été", "summer", "saisons, nature", "un été chaud", "<b> & </b>")
+    app.create_card("fr", "œuvre", "work", "", "", "")
+    app.update_review_state(a, app.date(2026, 3, 1), 6, 2, 2.6, 2)
+    before = _cards(app)
+
+    buf = io.BytesIO()
+    assert app.write_apkg(buf, batch_size=1) == 2
+    with app.db_tx() as conn:
+        conn.execute("DELETE FROM cards;")
+    with app.apkg_collection(io.BytesIO(buf.getvalue())) as col:
+        assert app.apkg_note_count(col) == 2
+        res = app.bulk_import_cards(app.iter_apkg_rows(col))
+    assert res == {"created": 2, "skipped": 0}
+
+    after = _cards(app)
+    assert [(c["front"], c["back"], c["tags"], c["example"], c["notes"]) for c in after] == [
+        (c["front"], c["back"], c["tags"], c["example"], c["notes"]) for c in before
+    ]
+    ete = after[0]
+    assert (ete["due_date"], ete["interval_days"], ete["repetitions"], ete["ease"], ete["last_quality"]) == (
+        "2026-03-01", 6, 2, 2.6, 2,
+    )
+    assert after[1]["repetitions"] == 0 and after[1]["last_quality"] is None
+
+
+def test_apkg_rejects_new_format_and_non_decks(app):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("collection.anki21b", b"zstd")
+    with pytest.raises(ValueError, match="newer compressed format"):
+        with app.apkg_collection(io.BytesIO(buf.getvalue())):
+            pass
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("readme.txt", b"hi")
+    with pytest.raises(ValueError, match="Not an Anki package"):
+        with app.apkg_collection(io.BytesIO(buf.getvalue())):
+            pass
+
+
+def _with_revlog(app, data, entries):
+    """The .apkg `data` with extra revlog rows (id ms, ease, ivl, factor) for its only card."""
+    src = zipfile.ZipFile(io.BytesIO(data))
+    tmp = app.tempfile.NamedTemporaryFile(suffix=".anki2", delete=False)
+    with tmp:
+        tmp.write(src.read("collection.anki2"))
+    col = sqlite3.connect(tmp.name)
+    cid = col.execute("SELECT id FROM cards;").fetchone()[0]
+    col.execute("DELETE FROM revlog;")
+    col.executemany("INSERT INTO revlog VALUES(?,?,?,?,?,?,?,?,?);", [(i, cid, -1, e, ivl, 0, f, 0, 1) for i, e, ivl, f in entries])
+    col.commit()
+    col.close()
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as zf:
+        zf.write(tmp.name, "collection.anki2")
+        zf.writestr("media", "{}")
+    os.remove(tmp.name)
+    return out.getvalue()
+
+
+def test_apkg_import_logs_the_whole_review_history(app):
+    cid = app.create_card("fr", "chat", "cat", "", "", "")
+    app.update_review_state(cid, app.date(2026, 3, 1), 6, 2, 2.6, 2)
+    buf = io.BytesIO()
+    app.write_apkg(buf)
+    day = 86400 * 1000
+    t0 = 1767225600000  # 2026-01-01T00:00:00Z
+    data = _with_revlog(app, buf.getvalue(), [
+        (t0, 3, -600, 0),              # Good on a learning step
+        (t0 + day, 3, 1, 2500),        # Good
+        (t0 + 2 * day, 1, -600, 2300),  # Again
+        (t0 + 3 * day, 0, 5, 2300),    # manual reschedule: not an answer
+        (t0 + 4 * day, 4, 6, 2450),    # Easy
+    ])
+    with app.db_tx() as conn:
+        conn.execute("DELETE FROM cards;")
+        conn.execute("DELETE FROM review_log;")
+    with app.apkg_collection(io.BytesIO(data)) as col:
+        assert app.bulk_import_cards(app.iter_apkg_rows(col)) == {"created": 1, "skipped": 0}
+
+    with app.db_conn() as conn:
+        log = conn.execute("SELECT ts, quality, due_date, interval_days, repetitions, ease FROM review_log ORDER BY id;").fetchall()
+    assert [tuple(r) for r in log[:4]] == [
+        ("2026-01-01T00:00:00", 2, "2026-01-01", 0, 1, 2.5),
+        ("2026-01-02T00:00:00", 2, "2026-01-03", 1, 2, 2.5),
+        ("2026-01-03T00:00:00", 5, "2026-01-03", 0, 0, 2.3),
+        ("2026-01-05T00:00:00", 1, "2026-01-11", 6, 1, 2.45),
+    ]
+    assert len(log) == 5 and log[4][1] is None  # the imported state's snapshot comes last
+    before = _cards(app)
+    app.replay_review_log()
+    assert _cards(app) == before
@@ -0,0 +1,37 @@
+def test_existing_fronts_match_non_ascii_case(app):
+    app.create_card("fr", "État", "state", "", "", "")
+    app.create_card("fr", "œuvre", "work", "", "", "")
+    app.create_card("en", "chat", "talk", "", "", "")
+    have = app.existing_card_fronts("fr", ["état", "ŒUVRE", "Chat", " maison "])
+    assert have == {"état", "œuvre"}
+    assert app.existing_card_fronts("en", ["CHAT"]) == {"chat"}
+
+
+def test_front_keys_follow_edits_imports_and_old_rows(app):
+    cid = app.create_card("fr", "chien", "dog", "", "", "")
+    app.update_card(cid, "fr", "Écureuil", "squirrel", "", "", "")
+    app.bulk_import_cards([{"front": "Maison", "back": "house"}])
+    with app.db_tx() as conn:  # a row written before front_key existed
+        conn.execute("INSERT INTO cards(language, front, back, created_at, updated_at) VALUES('fr', 'Été', 'summer', '', '');")
+        conn.execute("PRAGMA user_version = 10;")
+    app.init_db()
+    assert app.existing_card_fronts("fr", ["chien", "écureuil", "MAISON", "été"]) == {"écureuil", "maison", "été"}
+
+
+def test_parse_word_list_dedupes_case_insensitively(app):
+    words = app.parse_word_list("État\nétat, chat;  chat \t maison\n\n", limit=10)
+    assert words == ["État", "chat", "maison"]
+    assert app.parse_word_list("a\nb\nc", limit=2) == ["a", "b"]
+
+
+def test_batch_lookups_yield_every_word(app, monkeypatch):
+    def fake(lang, word):
+        if word == "boom":
+            raise RuntimeError("backend exploded")
+        return "offline", {"word": word, "lang": lang}
+
+    monkeypatch.setattr(app, "best_dictionary_result", fake)
+    out = {w: (src, data) for w, src, data in app.iter_batch_lookups("fr", ["chat", "boom", "chien"], workers=2)}
+    assert out["chat"] == ("offline", {"word": "chat", "lang": "fr"})
+    assert out["boom"][0] == "none" and "backend exploded" in out["boom"][1]["errors"]["batch"]["error"]
+    assert set(out) == {"chat", "boom", "chien"}
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+
+def test_bucket_counts_match_difficulty_bucket(app):
+    today = app.today_utc_date()
+    qualities = [None, None, 1, 2, 3, 4, 5, 3]
+    for i, q in enumerate(qualities):
+        cid = app.create_card("fr", f"w{i}", "b", "", "", "")
+        if q is not None:
+            app.update_review_state(cid, today + timedelta(days=i - 3), 1, 1, 2.5, q)
+    with app.db_tx() as conn:  # a card that somehow lost its reviews row still counts as new
+        cid = app.create_card("fr", "orphan", "b", "", "", "")
+        conn.execute("DELETE FROM reviews WHERE card_id=?;", (cid,))
+
+    counts = app.review_bucket_counts(today)
+    expected = {"due": 0, "new": 0, "difficult": 0, "meh": 0, "easy": 0}
+    for q in qualities + [None]:
+        expected[app.difficulty_bucket({"last_quality": q})] += 1
+    expected["due"] = 2 + sum(1 for i, q in enumerate(qualities) if q is not None and i - 3 <= 0)
+    assert counts == expected
+    for bucket, n in counts.items():
+        assert app.count_cards(bucket=bucket) == n, bucket
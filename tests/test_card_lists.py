@@ -0,0 +1,21 @@
+def test_notes_filter_pages_and_counts_in_sql(app):
+    ids = [app.create_card("fr", f"w{i}", "b", "", "ex" if i % 3 == 0 else "", "n" if i % 5 == 0 else "") for i in range(30)]
+    with_notes = [cid for i, cid in zip(range(30), ids) if i % 3 == 0 or i % 5 == 0]
+    assert app.count_cards(with_notes=True) == len(with_notes)
+    seen, cursor = [], None
+    while True:
+        rows, cursor = app.fetch_cards_page(limit=4, after=cursor, with_notes=True)
+        assert len(rows) <= 4
+        seen += [r["id"] for r in rows]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(with_notes)
+    assert app.count_cards() == 30
+
+
+def test_tag_quick_find_counts_without_loading(app):
+    for i in range(12):
+        app.create_card("fr", f"w{i}", "b", "food" if i % 2 else "", "", "")
+    rows, cursor = app.fetch_cards_page("", "food", limit=8)
+    assert app.count_cards("", "food") == 6
+    assert len(rows) == 6 and cursor is None
@@ -0,0 +1,58 @@
+import csv
+import functools
+import io
+import json
+
+import pytest
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+import app_v7
+
+
+def download_via_button(fmt):
+    """What clicking the deferred "Download export" button does: run the callable, store the bytes."""
+    storage = MemoryMediaFileStorage("/media")
+    mgr = MediaFileManager(storage)
+    _label, ext, mime, _reviews = app_v7.EXPORT_FORMATS[fmt]
+    file_id = mgr.add_deferred(functools.partial(app_v7.export_cards_file, fmt), mime, "export", f"charlot_cards.{ext}")
+    url = mgr.execute_deferred(file_id)
+    return storage.get_file(url.rsplit("/", 1)[-1].split(".")[0]).content
+
+
+@pytest.fixture
+def cards(app):
+    a = app.create_card("fr", "été", "summer", "saisons", "", "")
+    app.create_card("fr", "œuvre", "work", "", "une œuvre", "")
+    app.update_review_state(a, app.date(2026, 3, 1), 6, 2, 2.6, 4)
+    return app
+
+
+@pytest.mark.parametrize("fmt", sorted(app_v7.EXPORT_FORMATS))
+def test_every_format_downloads(cards, fmt):
+    data = download_via_button(fmt)
+    if fmt == "apkg":
+        with app_v7.apkg_collection(io.BytesIO(data)) as col:
+            rows = list(app_v7.iter_apkg_rows(col))
+    elif fmt == "jsonl":
+        rows = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    else:
+        rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+    assert sorted(r["front"] for r in rows) == ["été", "œuvre"]
+    if app_v7.EXPORT_FORMATS[fmt][3]:
+        assert {r["front"]: str(r.get("due_date")) for r in rows}["été"] == "2026-03-01"
+
+
+def _export_buttons():
+    import streamlit as st
+
+    import app_v7
+
+    for fmt in app_v7.EXPORT_FORMATS:
+        st.download_button(fmt, data=app_v7.export_cards_file(fmt), file_name=f"export.{fmt}")
+
+
+def test_export_passes_through_download_button(cards):
+    at = AppTest.from_function(_export_buttons).run()
+    assert not at.exception
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def backends(app, monkeypatch):
+    """Replace every dictionary backend with a fake: {name: (delay, ok)}; records who was called."""
+    called = []
+    lock = threading.Lock()
+
+    def install(spec):
+        for name in app.DICTIONARY_BACKENDS:
+            delay, ok = spec.get(name, (0.0, False))
+
+            def fake(lang, word, name=name, delay=delay, ok=ok):
+                with lock:
+                    called.append(name)
+                time.sleep(delay)
+                return (True, {"from": name}) if ok else (False, {"error": f"{name} failed"})
+
+            monkeypatch.setitem(app.DICTIONARY_BACKENDS, name, fake)
+        return called
+
+    return install
+
+
+def test_offline_hit_skips_the_network(app, backends):
+    called = backends({"offline": (0.0, True), "dictapi": (0.0, True)})
+    assert app.best_dictionary_result("fr", "chat") == ("offline", {"from": "offline"})
+    assert called == ["offline"]
+
+
+def test_priority_wins_over_speed(app, backends):
+    backends({"wiktionary_summary": (0.3, True), "dictapi": (0.0, True)})
+    assert app.best_dictionary_result("fr", "chat", deadline=2.0) == ("wiktionary_summary", {"from": "wiktionary_summary"})
+
+
+def test_returns_lower_priority_success_once_higher_ones_fail(app, backends):
+    backends({"wiktionary_summary": (0.1, False), "wiktionary_extract": (0.0, False), "dictapi": (0.2, True)})
+    t0 = time.monotonic()
+    assert app.best_dictionary_result("fr", "chat", deadline=5.0)[0] == "dictapi"
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_deadline_returns_best_so_far(app, backends):
+    backends({"wiktionary_summary": (1.5, True), "dictapi": (0.0, True)})
+    t0 = time.monotonic()
+    assert app.best_dictionary_result("fr", "chat", deadline=0.5)[0] == "dictapi"
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_nothing_found_reports_every_backend(app, backends):
+    backends({"wiktionary_summary": (1.5, False)})
+    source, data = app.best_dictionary_result("fr", "chat", deadline=0.5)
+    assert source == "none"
+    assert set(data["errors"]) == {"wiktionary_summary", "wiktionary_extract", "dictapi"}
+    assert data["errors"]["wiktionary_summary"]["error"] == "Timed out after 0.5s"
+    assert data["errors"]["dictapi"]["error"] == "dictapi failed"
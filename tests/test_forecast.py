@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+
+def test_due_count_and_forecast_match_the_cards(app):
+    today = app.today_utc_date()
+    offsets = [-5, -1, 0, 0, 2, 13, 14, 30]
+    for i, off in enumerate(offsets):
+        cid = app.create_card("fr", f"w{i}", "b", "", "", "")
+        app.update_review_state(cid, today + timedelta(days=off), 1, 1, 2.5, 2)
+
+    assert app.count_due_cards(today) == 4
+    assert app.count_due_cards(today + timedelta(days=14)) == 7
+
+    forecast = app.due_forecast(today, 14)
+    assert forecast["overdue"] == 2
+    by_day = dict(forecast["days"])
+    assert len(by_day) == 14 and min(by_day) == today
+    assert by_day[today] == 2 and by_day[today + timedelta(days=2)] == 1 and by_day[today + timedelta(days=13)] == 1
+    assert sum(by_day.values()) == 4
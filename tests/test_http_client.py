@@ -0,0 +1,102 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.hits += 1
+            status = srv.statuses.pop(0) if srv.statuses else srv.default_status
+        time.sleep(srv.delay)
+        body = b'{"title": "x", "extract": "y"}'
+        self.send_response(status)
+        if srv.retry_after is not None:
+            self.send_header("Retry-After", str(srv.retry_after))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up at its deadline
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.hits = 0
+    srv.statuses = []
+    srv.default_status = 200
+    srv.delay = 0.0
+    srv.retry_after = None
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_retries_a_503_then_succeeds(app, server):
+    server.statuses = [503]
+    r = app.HttpClient().get("dictapi", server.url + "/a", timeout=5)
+    assert r.status_code == 200
+    assert server.hits == 2
+
+
+def test_slow_backend_stops_at_the_deadline(app, server):
+    server.delay = 3.0
+    client = app.HttpClient()
+    t0 = time.monotonic()
+    with app.http_deadline(t0 + 1.0):
+        with pytest.raises(requests.Timeout):
+            client.get("dictapi", server.url + "/slow", timeout=10)
+    assert time.monotonic() - t0 < 1.8
+    assert server.hits == 1  # no retry was started once the deadline was near
+
+
+def test_retry_after_is_not_slept_past_the_deadline(app, server):
+    server.default_status = 503
+    server.retry_after = 5
+    client = app.HttpClient()
+    t0 = time.monotonic()
+    with app.http_deadline(t0 + 2.0):
+        r = client.get("dictapi", server.url + "/busy", timeout=10)
+    assert r.status_code == 503
+    assert time.monotonic() - t0 < 1.0
+    assert server.hits == 1
+
+
+def test_timed_backend_bounds_the_worker_by_the_fan_out_deadline(app, server, monkeypatch):
+    server.delay = 3.0
+    monkeypatch.setattr(app, "WIKTIONARY_BASE", {"fr": server.url})
+    monkeypatch.setattr(app, "http_client", lambda: client)
+    client = app.HttpClient()
+    t0 = time.monotonic()
+    ok, data = app._timed_backend("wiktionary_summary", "fr", "lent", t0 + 1.0)
+    assert not ok and data.get("error")
+    assert time.monotonic() - t0 < 1.8
+
+
+def test_wiktionary_backends_have_separate_breakers(app, server, monkeypatch):
+    server.default_status = 500
+    monkeypatch.setattr(app, "WIKTIONARY_BASE", {"fr": server.url})
+    monkeypatch.setattr(app, "HTTP_RETRIES", 0)
+    client = app.HttpClient()
+    monkeypatch.setattr(app, "http_client", lambda: client)
+    for i in range(app.HTTP_BREAKER_FAILURES):
+        ok, _ = app.wiktionary_summary("fr", f"mot{i}")
+        assert not ok
+    assert client.breaker("wiktionary_summary").state() == "open"
+    assert client.breaker("wiktionary_extract").state() == "closed"
+    assert client.breaker("wiktionary_extract").allow()
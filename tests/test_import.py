@@ -0,0 +1,76 @@
+import csv
+import io
+
+import pytest
+
+
+def test_bulk_import_is_one_transaction(app):
+    rows = ({"front": f"w{i}", "back": "b"} for i in range(10))
+
+    def progress(seen, created):
+        if seen < 10:
+            raise RuntimeError("stop")
+
+    with pytest.raises(RuntimeError):
+        app.bulk_import_cards(rows, batch_size=3, progress=progress)
+    assert app.count_cards_db() == 0
+    res = app.bulk_import_cards(({"front": f"w{i}", "back": "b", "tags": "x"} for i in range(10)), batch_size=3)
+    assert res == {"created": 10, "skipped": 0}
+    with app.db_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 10
+        assert conn.execute("SELECT COUNT(*) FROM card_tags WHERE tag = 'x';").fetchone()[0] == 10
+
+
+def _rows(app, data):
+    return list(app.iter_csv_rows(io.BytesIO(data)))
+
+
+def test_csv_rows_are_streamed_with_line_numbers(app):
+    data = b'\xef\xbb\xbffront,back,tags\nchat,cat,"animal, nom"\n"deux\nlignes",two lines,\nbad\xff,x,\n'
+    rows = _rows(app, data)
+    assert [r["front"] for r in rows] == ["chat", "deux\nlignes", "bad�"]
+    assert [r["_line"] for r in rows] == [2, 3, 5]
+    assert "_error" not in rows[0] and "_error" not in rows[1]
+    assert rows[2]["_error"] == "invalid UTF-8 on line 5"
+    assert _rows(app, b"") == []
+
+
+def test_bulk_import_skips_and_reports_bad_rows(app):
+    rows = _rows(app, 'front,back,tags\nÉtat,state,"a, b"\n,no front,\nsans dos,,\n'.encode("utf-8") + b"bad\xff,x,\n")
+    rejects = app.ImportRejects()
+    res = app.bulk_import_cards(rows, batch_size=1, on_reject=rejects.add)
+    assert res == {"created": 1, "skipped": 3}
+    got = list(csv.DictReader(io.StringIO(rejects.csv_bytes().decode("utf-8"))))
+    assert [(r["line"], r["error"]) for r in got] == [
+        ("3", "missing front"),
+        ("4", "missing back"),
+        ("5", "invalid UTF-8 on line 5"),
+    ]
+    with app.db_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 1
+        assert [t for (t,) in conn.execute("SELECT tag FROM card_tags ORDER BY tag;")] == ["a", "b"]
+
+
+def test_import_keeps_review_state(app):
+    rows = [
+        {"front": "chat", "back": "cat", "due_date": "2030-01-02", "interval_days": "12", "repetitions": "3", "ease": "2.1", "last_quality": "2"},
+        {"front": "chien", "back": "dog"},
+        {"front": "loup", "back": "wolf", "due_date": "2030-01-02", "ease": "abc"},
+    ]
+    assert app.bulk_import_cards(rows) == {"created": 2, "skipped": 1}
+    with app.db_conn() as conn:
+        got = conn.execute(
+            "SELECT c.front, r.due_date, r.interval_days, r.repetitions, r.ease, r.last_quality "
+            "FROM cards c JOIN reviews r ON r.card_id = c.id ORDER BY c.id;"
+        ).fetchall()
+    assert tuple(got[0]) == ("chat", "2030-01-02", 12, 3, 2.1, 2)
+    assert got[1][1] == app.iso_date(app.today_utc_date()) and got[1][3] == 0
+
+
+def test_import_normalizes_due_dates(app):
+    rows = [{"front": "chat", "back": "cat", "due_date": "20300102"}, {"front": "loup", "back": "wolf", "due_date": "2030-13-01"}]
+    assert app.bulk_import_cards(rows) == {"created": 1, "skipped": 1}
+    with app.db_conn() as conn:
+        assert conn.execute("SELECT due_date FROM reviews;").fetchall() == [("2030-01-02",)]
+        assert conn.execute("SELECT due_date FROM review_log;").fetchall() == [("2030-01-02",)]
+    assert app.count_due_cards(app.date(2030, 1, 1)) == 0 and app.count_due_cards(app.date(2030, 1, 2)) == 1
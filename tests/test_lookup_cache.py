@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def backend(app):
+    calls = []
+
+    @app.lookup_cached("fake", app._word_key, app._wiki_outcome)
+    def lookup(lang, word):
+        calls.append(word)
+        if word.startswith("miss"):
+            return False, {"error": "Not found"}
+        if word.startswith("flaky"):
+            return False, {"error": "HTTP 503"}
+        return True, {"word": word}
+
+    lookup.calls = calls
+    return lookup
+
+
+def test_hits_and_misses_are_cached(app, backend):
+    assert backend("fr", "chat") == (True, {"word": "chat"})
+    assert backend("FR", "  chat ") == (True, {"word": "chat"})
+    assert backend("fr", "miss") == (False, {"error": "Not found"})
+    assert backend("fr", "miss") == (False, {"error": "Not found"})
+    assert backend.calls == ["chat", "miss"]
+    stats = app.lookup_cache_stats()
+    assert stats["rows"] == 2 and stats["negative_rows"] == 1
+
+
+def test_transient_errors_are_not_cached(app, backend):
+    backend("fr", "flaky")
+    backend("fr", "flaky")
+    assert backend.calls == ["flaky", "flaky"]
+    assert app.lookup_cache_stats()["rows"] == 0
+
+
+def test_expired_entries_are_refetched(app, backend, monkeypatch):
+    monkeypatch.setattr(app, "LOOKUP_TTL_MISS", 0)
+    backend("fr", "miss")
+    backend("fr", "miss")
+    assert backend.calls == ["miss", "miss"]
+    assert app.lookup_cache_prune() == 1
+
+
+def test_prune_keeps_the_most_recently_hit(app, backend):
+    for w in ("a", "b", "c"):
+        backend("fr", w)
+    with app.db_tx() as conn:
+        conn.execute("UPDATE lookup_cache SET last_hit_at = 0 WHERE key = 'b';")
+    assert app.lookup_cache_prune(max_rows=2) == 1
+    backend("fr", "a")
+    backend("fr", "c")
+    backend("fr", "b")
+    assert backend.calls == ["a", "b", "c", "b"]
+
+
+def test_words_differing_only_in_case_share_an_entry(app, backend):
+    assert backend("fr", "Maison") == (True, {"word": "Maison"})
+    assert backend("fr", "maison") == (True, {"word": "Maison"})
+    assert backend("fr", " MAISON ") == (True, {"word": "Maison"})
+    assert backend.calls == ["Maison"]
+    assert app.lookup_cache_stats()["rows"] == 1
+
+
+def test_concurrent_stores_prune_exactly_on_schedule(app, monkeypatch):
+    monkeypatch.setattr(app, "LOOKUP_PRUNE_EVERY", 5)
+    monkeypatch.setitem(app.LOOKUP_CACHE_STATS, "stores", 0)
+    prunes = []
+    monkeypatch.setattr(app, "lookup_cache_prune", lambda: prunes.append(1))
+    threads = [
+        threading.Thread(target=lambda i=i: app.lookup_cache_put("fake", "fr", f"w{i}", {"v": i}, True))
+        for i in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert app.LOOKUP_CACHE_STATS["stores"] == 20
+    assert len(prunes) == 4
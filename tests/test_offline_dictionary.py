@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+
+
+def _dump(path, words, lang="fr"):
+    lines = [
+        {
+            "word": w,
+            "lang_code": lang,
+            "pos": "noun",
+            "senses": [{"glosses": [f"gloss of {w}"]}],
+            "forms": [{"form": w + "s", "tags": ["plural"]}],
+        }
+        for w in words
+    ]
+    data = "\n".join(json.dumps(e, ensure_ascii=False) for e in lines) + "\nnot json\n"
+    if str(path).endswith(".gz"):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        path.write_text(data, encoding="utf-8")
+    return str(path)
+
+
+def test_load_and_lookup_by_headword_and_form(app, tmp_path):
+    res = app.dict_ingest_jsonl(_dump(tmp_path / "fr.jsonl.gz", ["chat", "État"]), "fr")
+    assert res == {"lines": 3, "entries": 2, "skipped": 1}
+    assert app.dict_offline_counts() == {"fr": 2}
+    ok, data = app.offline_dictionary_lookup("fr", "état")
+    assert ok and data["parsed"]["meanings"][0]["definitions"][0]["definition"] == "gloss of État"
+    ok, data = app.offline_dictionary_lookup("fr", "chats")
+    assert ok and data["parsed"]["meanings"][0]["partOfSpeech"] == "noun (form of chat)"
+
+
+def test_replace_swaps_the_language(app, tmp_path):
+    app.dict_ingest_jsonl(_dump(tmp_path / "a.jsonl", ["chat", "chien"]), "fr")
+    app.dict_ingest_jsonl(_dump(tmp_path / "b.jsonl", ["maison"]), "fr")
+    assert app.dict_offline_counts() == {"fr": 1}
+    assert not app.offline_dictionary_lookup("fr", "chat")[0]
+    assert not app.offline_dictionary_lookup("fr", "chats")[0]
+    assert app.offline_dictionary_lookup("fr", "maisons")[0]
+
+
+def test_failed_replace_keeps_the_old_dictionary(app, tmp_path, monkeypatch):
+    app.dict_ingest_jsonl(_dump(tmp_path / "old.jsonl", ["chat"]), "fr")
+    monkeypatch.setattr(app, "DICT_INGEST_BATCH", 2)
+
+    def progress(frac, n):
+        if n < 10:
+            raise KeyboardInterrupt  # e.g. the run is stopped mid-load
+
+    with pytest.raises(KeyboardInterrupt):
+        app.dict_ingest_jsonl(_dump(tmp_path / "new.jsonl", [f"mot{i}" for i in range(10)]), "fr", progress=progress)
+    assert app.offline_dictionary_lookup("fr", "chat")[0]
+    assert not app.offline_dictionary_lookup("fr", "mot0")[0]
+    with app.db_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM dict_entries;").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM dict_forms;").fetchone()[0] == 1
+
+
+def test_append_mode_keeps_existing_rows(app, tmp_path):
+    app.dict_ingest_jsonl(_dump(tmp_path / "a.jsonl", ["chat"]), "fr")
+    app.dict_ingest_jsonl(_dump(tmp_path / "b.jsonl", ["chien"]), "fr", replace=False)
+    assert app.dict_offline_counts() == {"fr": 2}
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+import app_v7
+
+fitz = pytest.importorskip("fitz")
+
+
+def make_pdf(pages, label="p"):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"{label} page {i + 1}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_documents_lock_per_book(app):
+    a = app.pdf_blob_put(make_pdf(2, "a"))
+    b = app.pdf_blob_put(make_pdf(2, "b"))
+    cache = app.PdfDocCache(max_docs=4)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold_a():
+        with cache.document(a, "render"):
+            holding.set()
+            release.wait(5)
+
+    t = threading.Thread(target=hold_a)
+    t.start()
+    assert holding.wait(5)
+    done = threading.Event()
+
+    def use_b():
+        with cache.document(b, "render") as doc:
+            assert doc.page_count == 2
+        done.set()
+
+    threading.Thread(target=use_b).start()
+    assert done.wait(2), "book B waited behind book A"
+    release.set()
+    t.join()
+
+
+def test_evicted_document_stays_usable_until_released(app):
+    a = app.pdf_blob_put(make_pdf(3, "a"))
+    b = app.pdf_blob_put(make_pdf(1, "b"))
+    cache = app.PdfDocCache(max_docs=1)
+    with cache.document(a, "text") as doc:
+        with cache.document(b, "text"):
+            pass  # evicts a while it is in use
+        assert "a page 3" in doc.load_page(2).get_text()
+    assert cache.stats()["open_docs"] == 1
+
+
+@pytest.fixture
+def blocked_prefetcher(monkeypatch):
+    gate = threading.Event()
+    started = threading.Event()
+
+    def slow_text(sha, page):
+        started.set()
+        gate.wait(5)
+        return f"{sha}:{page}"
+
+    monkeypatch.setattr(app_v7, "_extract_pdf_page_text", slow_text)
+    pf = app_v7.PdfPrefetcher(workers=1)
+    yield pf, gate, started
+    gate.set()
+
+
+def test_readers_do_not_cancel_each_other(blocked_prefetcher):
+    pf, gate, started = blocked_prefetcher
+    pf.schedule("r1", "A", 10, 100, 50, render=False)
+    assert started.wait(5)
+    pf.schedule("r2", "B", 10, 100, 50, render=False)
+    assert pf.stats()["cancelled"] == 0
+    pf.schedule("r1", "C", 10, 100, 50, render=False)
+    assert pf.stats()["cancelled"] == 3  # A's queued pages; the running one finishes
+
+
+def test_foreground_does_not_wait_for_queued_prefetch(blocked_prefetcher):
+    pf, gate, started = blocked_prefetcher
+    pf.schedule("r1", "A", 10, 100, 50, render=False)
+    assert started.wait(5)
+    got = pf.get_or_compute(("text", "A", 12), lambda sha, p: "now", "A", 12)
+    assert got == "now"
+    gate.set()
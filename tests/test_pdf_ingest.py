@@ -0,0 +1,128 @@
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import app_v7
+
+fitz = pytest.importorskip("fitz")
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page number {i + 1}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def page_rows(app, sha):
+    with app.db_conn() as conn:
+        return [r[0] for r in conn.execute("SELECT page FROM pdf_pages WHERE sha256=? ORDER BY page;", (sha,))]
+
+
+def test_spawned_pool_extracts_every_page(app, monkeypatch):
+    monkeypatch.setattr(app, "PDF_INGEST_PROCESS_MIN_PAGES", 1)
+    sha = app.pdf_blob_put(make_pdf(4))
+    app.pdf_text_ingest(sha)
+    assert app.pdf_text_status(sha) == {"page_count": 4, "pages_done": 4, "status": "done"}
+    assert "page number 3" in app.pdf_page_text_get(sha, 3)
+
+
+class BreaksOnSecondBatch:
+    def __init__(self, *args, **kwargs):
+        self.submitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        fut = Future()
+        if self.submitted == 2:
+            fut.set_exception(BrokenProcessPool("worker died"))
+        else:
+            fut.set_result(fn(*args))
+        return fut
+
+
+def test_broken_pool_resumes_without_rewriting_pages(app, monkeypatch):
+    monkeypatch.setattr(app, "ProcessPoolExecutor", BreaksOnSecondBatch)
+    monkeypatch.setattr(app, "PDF_INGEST_BATCH", 10)
+    monkeypatch.setattr(app, "PDF_INGEST_PROCESS_MIN_PAGES", 1)
+    sha = app.pdf_blob_put(make_pdf(35))
+    seen = []
+    real = app._iter_pdf_text_batches
+
+    def spy(sha256, ranges):
+        for batch in real(sha256, ranges):
+            seen.extend(p for p, _t in batch)
+            yield batch
+
+    monkeypatch.setattr(app, "_iter_pdf_text_batches", spy)
+    app.pdf_text_ingest(sha)
+    assert sorted(seen) == list(range(1, 36))
+    assert app.pdf_text_status(sha)["pages_done"] == 35
+    assert page_rows(app, sha) == list(range(1, 36))
+
+
+def test_failed_ingest_is_not_requeued_and_retry_resumes(app, monkeypatch):
+    monkeypatch.setattr(app, "PDF_INGEST_BATCH", 10)
+    sha = app.pdf_blob_put(make_pdf(25))
+    real = app._iter_pdf_text_batches
+
+    def fail_after_first(sha256, ranges):
+        gen = real(sha256, ranges)
+        yield next(gen)
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(app, "_iter_pdf_text_batches", fail_after_first)
+    app.pdf_text_ingest(sha)
+    status = app.pdf_text_status(sha)
+    assert (status["status"], status["pages_done"]) == ("error", 10)
+    assert not app.pdf_text_ingest_wanted(sha, status)
+
+    asked = []
+
+    def spy(sha256, ranges):
+        asked.extend(ranges)
+        return real(sha256, ranges)
+
+    monkeypatch.setattr(app, "_iter_pdf_text_batches", spy)
+    app.pdf_text_ingest(sha)
+    assert asked == [(10, 20), (20, 25)]
+    assert app.pdf_text_status(sha) == {"page_count": 25, "pages_done": 25, "status": "done"}
+
+
+def test_stale_running_status_is_requeued(app):
+    assert app.pdf_text_ingest_wanted("abc", None)
+    assert app.pdf_text_ingest_wanted("abc", {"status": "running", "pages_done": 3, "page_count": 9})
+    with app._PDF_INGEST_LOCK:
+        app._PDF_INGEST_INFLIGHT.add("abc")
+    try:
+        assert not app.pdf_text_ingest_wanted("abc", {"status": "running", "pages_done": 3, "page_count": 9})
+    finally:
+        app._PDF_INGEST_INFLIGHT.discard("abc")
+
+
+def test_gc_waits_for_running_ingest(app, monkeypatch):
+    sha = app.pdf_blob_put(make_pdf(2))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_ingest(sha256):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(app, "pdf_text_ingest", slow_ingest)
+    app.pdf_text_ingest_async(sha)
+    assert started.wait(5)
+    app.pdf_blob_gc(sha)
+    assert app.os.path.exists(app.pdf_blob_path(sha))
+    release.set()
+    app.pdf_ingest_pool().submit(lambda: None).result(5)
+    assert not app.os.path.exists(app.pdf_blob_path(sha))
@@ -0,0 +1,73 @@
+import asyncio
+import os
+import threading
+
+import pytest
+import requests
+import tornado.httpserver
+import tornado.web
+from streamlit import config
+from streamlit.web.server.app_static_file_handler import AppStaticFileHandler
+from tornado.testing import bind_unused_port
+
+
+@pytest.fixture
+def static_server(app, tmp_path, monkeypatch):
+    """Streamlit's /app/static/ handler serving app.APP_STATIC_DIR on a local port."""
+    root = str(tmp_path / "static")
+    os.makedirs(root)
+    monkeypatch.setattr(app, "APP_STATIC_DIR", root)
+    config._set_option("server.enableStaticServing", True, "test")
+    sock, port = bind_unused_port()
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        application = tornado.web.Application([(r"/app/static/(.*)", AppStaticFileHandler, {"path": root})])
+        server = tornado.httpserver.HTTPServer(application)
+        server.add_sockets([sock])
+        loop.call_soon(ready.set)
+        loop.run_forever()
+        server.stop()
+
+    t = threading.Thread(target=serve, daemon=True)
+    t.start()
+    ready.wait(5)
+    yield f"http://127.0.0.1:{port}"
+    loop.call_soon_threadsafe(loop.stop)
+    t.join(5)
+    config._set_option("server.enableStaticServing", False, "test")
+
+
+def test_static_url_serves_byte_ranges(app, static_server):
+    data = b"%PDF-1.4\n" + os.urandom(4096)
+    sha = app.pdf_blob_put(data)
+    url = app.pdf_static_url(sha)
+    assert url == f"/app/static/pdf/{sha}.pdf"
+    r = requests.get(static_server + url, headers={"Range": "bytes=100-199"}, timeout=5)
+    assert r.status_code == 206
+    assert r.content == data[100:200]
+    assert r.headers["Content-Type"] == "application/pdf"
+
+
+def test_old_symlinks_are_replaced(app, static_server):
+    data = b"%PDF-1.4\n" + os.urandom(512)
+    sha = app.pdf_blob_put(data)
+    link = app.pdf_static_link_path(sha)
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    os.symlink(os.path.abspath(app.pdf_blob_path(sha)), link)
+    url = app.pdf_static_url(sha)
+    assert not os.path.islink(link)
+    assert requests.get(static_server + url, timeout=5).content == data
+
+
+def test_cross_device_store_falls_back_to_inline(app, static_server, monkeypatch):
+    sha = app.pdf_blob_put(b"%PDF-1.4\n" + os.urandom(512))
+
+    def no_link(src, dst):
+        raise OSError(18, "Invalid cross-device link")
+
+    monkeypatch.setattr(app.os, "link", no_link)
+    assert app.pdf_static_url(sha) is None
+    assert os.listdir(os.path.dirname(app.pdf_static_link_path(sha))) == []
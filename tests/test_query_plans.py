@@ -0,0 +1,46 @@
+import pytest
+
+import app_v7
+
+
+@pytest.mark.parametrize("name", sorted(app_v7.HOT_QUERIES))
+def test_hot_query_plan_is_index_driven(app, name):
+    plans = {r["query"]: r for r in app.explain_hot_queries()}
+    assert plans[name]["ok"], plans[name]["plan"]
+
+
+def test_hot_queries_are_the_sql_the_app_runs(app):
+    sql, params = app.cards_query_sql(order_by="due_asc", limit=19)
+    assert (sql, params) == app.HOT_QUERIES["cards_page_due"]()
+    assert "idx_reviews_due" in next(r["plan"] for r in app.explain_hot_queries() if r["query"] == "cards_page_due")
+
+
+def test_due_order_pages_follow_due_date(app):
+    ids = [app.create_card("fr", f"w{i}", "b", "", "", "") for i in range(7)]
+    for i, cid in enumerate(ids):
+        app.update_review_state(cid, app.date(2026, 1, 10 - i % 3), 1, 1, 2.5)
+    seen, cursor = [], None
+    while True:
+        rows, cursor = app.fetch_cards_page(order_by="due_asc", limit=3, after=cursor)
+        seen += [(r["due_date"], r["id"]) for r in rows]
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(seen) == 7
+    assert [r["id"] for r in app.fetch_cards(order_by="due_asc")] == [i for _d, i in seen]
+
+
+def test_all_tags_filter_needs_every_tag(app):
+    a = app.create_card("fr", "a", "b", "x, y", "", "")
+    app.create_card("fr", "b", "b", "x", "", "")
+    assert [r["id"] for r in app.fetch_cards(tag="x, y")] == [a]
+    assert app.count_cards(tag="x, y", tag_mode="any") == 2
+
+
+def test_migration_backfills_missing_review_rows(app):
+    cid = app.create_card("fr", "a", "b", "", "", "")
+    with app.db_tx() as conn:
+        conn.execute("DELETE FROM reviews WHERE card_id=?;", (cid,))
+        conn.execute("PRAGMA user_version = 9;")
+    app.init_db()
+    rows, _ = app.fetch_cards_page(order_by="due_asc")
+    assert [r["id"] for r in rows] == [cid]
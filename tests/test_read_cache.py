@@ -0,0 +1,51 @@
+import copy
+import pickle
+import threading
+
+import pytest
+
+
+def test_cached_results_are_shared_and_read_only(app):
+    app.create_card("fr", "chat", "cat", "animaux", "", "")
+    app.begin_read_cache()
+    try:
+        first = app.fetch_cards()
+        assert app.fetch_cards() is first  # a hit costs no copy
+        with pytest.raises(TypeError):
+            first[0]["front"] = "mutated"
+        with pytest.raises(AttributeError):
+            first.append({"id": -1})
+        assert "sort_key" not in first[0]
+        mine = dict(first[0])
+        mine["front"] = "mine"
+        assert copy.deepcopy(first[0]) == first[0] and pickle.loads(pickle.dumps(first[0])) == first[0]
+        assert [c["front"] for c in app.fetch_cards()] == ["chat"]
+        counts = app.review_bucket_counts(app.today_utc_date())
+        with pytest.raises(TypeError):
+            counts["due"] += 1
+    finally:
+        app._READ_CACHE.store = None
+
+
+def test_stats_counters_survive_concurrent_hits(app):
+    before = dict(app.READ_CACHE_STATS)
+    calls = 2000
+
+    @app.rerun_cached
+    def read(x):
+        return [x]
+
+    def worker():
+        app.begin_read_cache()
+        for _ in range(calls):
+            read(1)
+        app._READ_CACHE.store = None
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    hits = app.READ_CACHE_STATS["hits"] - before["hits"]
+    misses = app.READ_CACHE_STATS["misses"] - before["misses"]
+    assert (hits, misses) == (8 * (calls - 1), 8)
@@ -0,0 +1,36 @@
+def _reviews(app):
+    with app.db_conn() as conn:
+        return conn.execute(
+            "SELECT card_id, due_date, interval_days, repetitions, ease, last_quality, last_reviewed_at FROM reviews ORDER BY card_id;"
+        ).fetchall()
+
+
+def test_replay_rebuilds_reviews_from_the_log(app):
+    ids = [app.create_card("fr", f"w{i}", "b", "", "", "") for i in range(3)]
+    app.update_review_state(ids[2], app.date(2026, 1, 10), 4, 2, 2.2)  # snapshot (quality NULL)
+    stamps = [f"2099-01-{d:02d}T08:00:00" for d in range(11, 17)]
+    app.grade_cards(
+        [ids[0], ids[1], ids[0], ids[2], ids[0], ids[1]],
+        [2, 5, 1, 3, 4, 2],
+        reviewed_at=stamps,
+    )
+    expected = _reviews(app)
+
+    with app.db_tx() as conn:
+        conn.execute("UPDATE reviews SET due_date='2000-01-01', interval_days=0, repetitions=0, ease=2.5;")
+    dry = app.replay_review_log(write=False)
+    assert dry["updated"] == 0 and dry["cards"] == 3
+    assert _reviews(app)[0][1] == "2000-01-01"
+
+    res = app.replay_review_log()
+    assert res["cards"] == 3 and res["updated"] == 3
+    assert [tuple(r) for r in _reviews(app)] == [tuple(r) for r in expected]
+
+
+def test_every_grade_and_import_is_logged(app):
+    cid = app.create_card("fr", "chat", "cat", "", "", "")
+    app.grade_due_card(cid, 2)
+    app.bulk_import_cards([{"front": "chien", "back": "dog", "due_date": "2030-01-02", "interval_days": "3"}])
+    with app.db_conn() as conn:
+        rows = conn.execute("SELECT card_id, quality, interval_days FROM review_log ORDER BY id;").fetchall()
+    assert [tuple(r) for r in rows] == [(cid, 2, 1), (cid + 1, None, 3)]
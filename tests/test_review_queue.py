@@ -0,0 +1,56 @@
+import pytest
+import streamlit as st
+
+
+@pytest.fixture
+def queue_app(app):
+    for key in ("review_queue", "review_idx", "review_cards"):
+        st.session_state.pop(key, None)
+    yield app
+    for key in ("review_queue", "review_idx", "review_cards"):
+        st.session_state.pop(key, None)
+
+
+def make_cards(app, n):
+    return [app.create_card("fr", f"w{i}", "b", "", "", "") for i in range(n)]
+
+
+def test_graded_cards_leave_the_queue(queue_app):
+    app = queue_app
+    ids = make_cards(app, 3)
+    assert app.review_queue()["ids"] == ids
+    assert app.review_queue_grade(0, 2) is not None
+    q = app.review_queue()
+    assert q["ids"] == ids[1:] and q["graded"] == 1
+    assert app.review_queue_card(st.session_state.review_idx)["id"] == ids[1]
+
+
+def test_skip_moves_card_to_the_end(queue_app):
+    app = queue_app
+    ids = make_cards(app, 3)
+    app.review_queue()
+    app.review_queue_skip(0)
+    assert app.review_queue()["ids"] == [ids[1], ids[2], ids[0]]
+    assert st.session_state.review_idx == 0
+    app.review_queue_skip(2)
+    assert st.session_state.review_idx == 0
+
+
+def test_card_that_is_not_due_cannot_be_graded_twice(queue_app):
+    app = queue_app
+    (cid,) = make_cards(app, 1)
+    assert app.grade_due_card(cid, 3) is not None
+    assert app.grade_due_card(cid, 1) is None
+    with app.db_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM review_log WHERE card_id=? AND quality IS NOT NULL;", (cid,)).fetchone()[0] == 1
+
+
+def test_new_cards_join_the_running_queue(queue_app):
+    app = queue_app
+    ids = make_cards(app, 2)
+    app.review_queue()
+    app.review_queue_grade(0, 3)
+    new = app.create_card("fr", "nouveau", "new", "", "", "")
+    app.bulk_import_cards([{"front": "importé", "back": "imported"}])
+    q = app.review_queue()
+    assert q["ids"][:2] == [ids[1], new] and len(q["ids"]) == 3
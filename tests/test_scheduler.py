@@ -0,0 +1,31 @@
+import itertools
+
+import numpy as np
+
+import app_v7
+
+
+def test_batch_matches_scalar_for_every_quality():
+    states = list(itertools.product(
+        range(0, 5),                      # repetitions
+        [0, 1, 2, 6, 15, 40, 365],        # interval_days
+        [0.0, 1.3, 1.7, 2.36, 2.5, 3.1],  # ease (0 reads as the default)
+        range(-1, 7),                     # quality, clamped to 0..5
+    ))
+    reps, interval, ease, quality = (np.array(col) for col in zip(*states))
+    got = app_v7.sm2_next_batch(reps, interval, ease, quality)
+    for i, (r, iv, e, q) in enumerate(states):
+        expected = app_v7.sm2_next({"repetitions": r, "interval_days": iv, "ease": e}, q)
+        assert (int(got[0][i]), int(got[1][i]), float(got[2][i])) == expected, (r, iv, e, q)
+
+
+def test_grade_cards_applies_grades_in_order(app):
+    cid = app.create_card("fr", "chat", "cat", "", "", "")
+    state = {"repetitions": 0, "interval_days": 0, "ease": 2.5}
+    for q in (2, 1, 4):
+        interval, reps, ease = app.sm2_next(state, 6 - q)
+        state = {"repetitions": reps, "interval_days": interval, "ease": ease}
+    assert app.grade_cards([cid, cid, cid], [2, 1, 4]) == 3
+    card = app.fetch_card_by_id(cid)
+    assert (card["repetitions"], card["interval_days"], card["ease"]) == (
+        state["repetitions"], state["interval_days"], state["ease"])